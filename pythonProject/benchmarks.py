@@ -0,0 +1,565 @@
+"""Бенчмарки складу.
+
+Запуск: python benchmarks.py memory --rows 100000
+        python benchmarks.py objects --rows 1000000
+        python benchmarks.py sqlite --rows 100000 --movements 10000
+        python benchmarks.py batch --rows 100000 --movements 10000
+        python benchmarks.py server --rows 10000 --clients 1 4 16 64
+        python benchmarks.py shards --rows 1000000 --shards 1 2 4 8
+        python benchmarks.py parse --rows 1000000 --workers 1 2 4 8 16 32
+        python benchmarks.py startup --rows 100000 --runs 10
+        python benchmarks.py suite --sizes 1000 100000 1000000 --output results.json
+        python benchmarks.py suite --sizes 1000 100000 --baseline results.json
+
+Набір suite вимірює час і піковий об'єм пам'яті основних операцій складу і
+записує їх у JSON; з --baseline результати порівнюються з попереднім запуском.
+Бенчмарк startup міряє холодний запуск: час імпорту main за -X importtime і
+повний час однієї команди термінала (python -m main) проти бюджету
+STARTUP_BUDGET_MS; для порівняння міряється і запуск скрипта python main.py,
+який щоразу компілює main.py з тексту.
+"""
+import argparse
+import asyncio
+import compileall
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+from types import SimpleNamespace
+
+from main import FoodProduct, NonFoodProduct, ProductStore, ColumnarProductStore, SQLiteProductStore, Warehouse, \
+    Dimensions, parse_product_line, _parse_file_chunk, _row_product
+from server import WarehouseServer
+from sharding import ShardedWarehouse
+
+PRODUCERS = ["Farm Fresh", "Organic Farm", "Local Bakery", "Farmers Coop", "Dairy Delight",
+             "Furniture Co.", "Electronics Inc.", "Fashion House", "Italian Imports", "Local Market"]
+PURPOSES = ["Home", "Office", "Personal", "Entertainment", "Communication", "Footwear"]
+
+
+def generate_products(rows, seed=0):
+    """Генерує змішаний набір харчових та непродовольчих продуктів."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        producer = rng.choice(PRODUCERS)
+        if i % 2 == 0:
+            yield FoodProduct(f"Food{i}", round(rng.uniform(0.5, 50), 2), rng.randint(0, 50_000),
+                              producer, rng.randint(0, 60))
+        else:
+            yield NonFoodProduct(f"Item{i}", round(rng.uniform(1, 5000), 2), rng.randint(0, 50_000),
+                                 producer, round(rng.uniform(1, 1000), 1), rng.choice(PURPOSES))
+
+
+def measure_store_memory(store_class, rows):
+    """Повертає кількість байтів на продукт після заповнення сховища."""
+    gc.collect()
+    tracemalloc.start()
+    store = store_class(generate_products(rows))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(store) == rows
+    return {"store": store_class.__name__, "rows": rows, "bytes_per_product": current / rows,
+            "peak_bytes": peak}
+
+
+def bench_memory(rows):
+    """Порівнює пам'ять ProductStore та ColumnarProductStore."""
+    return [measure_store_memory(store_class, rows) for store_class in (ProductStore, ColumnarProductStore)]
+
+
+def generate_product_lines(rows, seed=0):
+    """Генерує рядки файлу продуктів у форматі load_products_from_file."""
+    for product in generate_products(rows, seed):
+        fields = [product.name, product.cost, product.quantity, product.producer]
+        if isinstance(product, FoodProduct):
+            fields.append(product.expiry_date)
+        else:
+            fields += [product.dimensions, product.purpose]
+        yield ','.join(map(str, fields))
+
+
+def parse_product_line_with_dict(line):
+    """Розбирає рядок у продукт зі словником атрибутів і власними копіями рядків, як до __slots__."""
+    fields = line.split(',')
+    product = SimpleNamespace(name=fields[0], cost=float(fields[1]), quantity=int(fields[2]), producer=fields[3])
+    if len(fields) == 5:
+        product.expiry_date = int(fields[4])
+    else:
+        product.dimensions = Dimensions.parse(fields[4])
+        product.purpose = fields[5]
+    return product
+
+
+def measure_parsed_memory(parse, lines):
+    """Повертає кількість байтів на продукт, розібраний з рядків файлу функцією parse."""
+    gc.collect()
+    tracemalloc.start()
+    products = [parse(line) for line in lines]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"representation": parse.__name__, "rows": len(products), "bytes_per_product": current / len(products),
+            "peak_bytes": peak}
+
+
+def bench_objects(rows):
+    """Порівнює пам'ять продуктів зі словником атрибутів та продуктів зі слотами і спільними рядками."""
+    lines = list(generate_product_lines(rows))
+    return [measure_parsed_memory(parse, lines) for parse in (parse_product_line_with_dict, parse_product_line)]
+
+
+def write_product_file(path, rows, seed=0):
+    """Записує згенерований склад у текстовий файл формату load_products_from_file."""
+    with open(path, 'w', encoding='utf-8') as file:
+        for line in generate_product_lines(rows, seed):
+            file.write(line + '\n')
+
+
+def _time_store(store, text_path, lookups, movements):
+    warehouse = Warehouse(store)
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        warehouse.load_products_from_file(text_path)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in lookups:
+        warehouse.get(name)
+    lookup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warehouse.apply_batch([(name, -1) for name in movements])
+    batch_seconds = time.perf_counter() - start
+
+    # Перший запит підсумків будує їх для сховища в пам'яті, тож міряється окремо
+    start = time.perf_counter()
+    warehouse.stock_totals('producer', PRODUCERS[0])
+    first_aggregate_seconds = time.perf_counter() - start
+    queries = [('producer', producer) for producer in PRODUCERS] + [('purpose', purpose) for purpose in PURPOSES]
+    start = time.perf_counter()
+    for dimension, key in queries:
+        warehouse.stock_totals(dimension, key)
+    aggregate_seconds = time.perf_counter() - start
+    return {"store": type(store).__name__, "load_s": load_seconds,
+            "lookup_us": lookup_seconds / len(lookups) * 1e6,
+            "batch_take_us_per_movement": batch_seconds / len(movements) * 1e6,
+            "first_aggregate_ms": first_aggregate_seconds * 1e3,
+            "aggregate_us": aggregate_seconds / len(queries) * 1e6}
+
+
+def bench_sqlite(rows, movements, seed=0):
+    """Порівнює сховище SQLite зі сховищем у пам'яті: завантаження, пошук, пакетне списання і підсумки."""
+    rng = random.Random(seed)
+    in_stock = [product.name for product in generate_products(rows, seed) if product.quantity > 0]
+    lookups = [rng.choice(in_stock) for _ in range(movements)]
+    batch = rng.sample(in_stock, min(movements, len(in_stock)))
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'products.txt')
+        write_product_file(text_path, rows, seed)
+        results = []
+        for store in (ProductStore(), SQLiteProductStore(path=os.path.join(directory, 'warehouse.db'))):
+            result = _time_store(store, text_path, lookups, batch)
+            result["rows"] = rows
+            results.append(result)
+            if isinstance(store, SQLiteProductStore):
+                store.close()
+        return results
+
+
+SUITE_SIZES = (1_000, 100_000, 1_000_000)
+SUITE_LOOKUPS = 1_000  # Кількість назв у вимірах пошуку
+REGRESSION_THRESHOLD = 1.2  # Відношення часу до базового, з якого випадок вважається повільнішим
+
+
+def _measure(case, rows, function, memory=True, setup=None):
+    """Виконує function і повертає час; з memory - ще раз під tracemalloc для пікової пам'яті.
+
+    tracemalloc сповільнює виконання, тож час і пам'ять міряються окремими
+    запусками. setup, якщо задано, перед кожним запуском готує аргумент
+    function (наприклад, свіжий склад) і у вимір не входить.
+    """
+    def prepare():
+        arguments = () if setup is None else (setup(),)
+        gc.collect()
+        return arguments
+
+    arguments = prepare()
+    start = time.perf_counter()
+    function(*arguments)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        arguments = prepare()
+        tracemalloc.start()
+        function(*arguments)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"case": case, "rows": rows, "seconds": seconds, "peak_bytes": peak}
+
+
+def run_suite(sizes=SUITE_SIZES, seed=0, memory=True):
+    """Вимірює основні операції складу на згенерованих складах розміру sizes.
+
+    Випадки, що змінюють склад (сортування, уцінки), щоразу отримують свіжий
+    склад, тож жоден запуск не міряє дані, змінені попереднім.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        for rows in sizes:
+            text_path = os.path.join(directory, f"products_{rows}.txt")
+            write_product_file(text_path, rows, seed)
+            names = [product.name for product in generate_products(rows, seed)]
+            lookups = random.Random(seed).choices(names, k=SUITE_LOOKUPS)
+
+            def load():
+                with redirect_stdout(devnull):
+                    Warehouse().load_products_from_file(text_path)
+
+            warehouse = Warehouse()
+            with redirect_stdout(devnull):
+                warehouse.load_products_from_file(text_path)
+
+            def loaded():
+                return warehouse
+
+            def without_rollups():
+                warehouse.drop_indexes('rollups')
+                return warehouse
+
+            def fresh():
+                return Warehouse(ProductStore(generate_products(rows, seed)))
+
+            def find(target):
+                for name in lookups:
+                    target.find(name)
+
+            def total_quantity(target):
+                for name in lookups:
+                    target.total_quantity(name)
+
+            def total_quantity_with_rollups(target):
+                # Вимір назв будується першим зверненням, далі кількість береться з нього
+                target.stock_groups('name')
+                total_quantity(target)
+
+            def decrease_cost(target):
+                for product in target.products:
+                    product.decrease_cost()
+
+            def show_product_groups(target):
+                with redirect_stdout(devnull):
+                    target.show_product_groups()
+
+            cases = [("load_products_from_file", load, None), ("find", find, loaded),
+                     ("sort_products", lambda target: target.sort("desc"), fresh),
+                     ("total_quantity_by_name", total_quantity, without_rollups),
+                     ("total_quantity_with_rollup_build", total_quantity_with_rollups, without_rollups),
+                     ("decrease_cost", decrease_cost, fresh), ("reprice_all", lambda target: target.reprice_all(), fresh),
+                     ("show_product_groups", show_product_groups, loaded)]
+            # Повідомлення журналу про кожен уцінений продукт не входять у вимір
+            logging.disable(logging.INFO)
+            try:
+                for case, function, setup in cases:
+                    results.append(_measure(case, rows, function, memory, setup))
+            finally:
+                logging.disable(logging.NOTSET)
+    return {"python": platform.python_version(), "platform": platform.platform(), "seed": seed,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+
+
+def compare_runs(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Повертає (випадок, рядків, відношення часу до базового, чи регресія) для спільних випадків."""
+    previous = {(result["case"], result["rows"]): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        base = previous.get((result["case"], result["rows"]))
+        if base and base["seconds"] > 0:
+            ratio = result["seconds"] / base["seconds"]
+            comparison.append((result["case"], result["rows"], ratio, ratio > threshold))
+    return comparison
+
+
+def bench_batch(rows, movements, seed=0, rounds=5):
+    """Порівнює вартість одного руху в apply_batch та в окремих викликах take (найкращий з rounds замірів)."""
+    rng = random.Random(seed)
+    warehouse = Warehouse(ProductStore(generate_products(rows, seed)))
+    names = [product.name for product in warehouse.products]
+    batch = [(rng.choice(names), -1) for _ in range(movements)]
+    single_seconds = batch_seconds = math.inf
+    for _ in range(rounds):
+        for name, _ in batch:
+            warehouse.adjust(name, 1)  # Гарантуємо достатній залишок
+        start = time.perf_counter()
+        for name, delta in batch:
+            warehouse.take(name, -delta)
+        single_seconds = min(single_seconds, time.perf_counter() - start)
+
+        for name, _ in batch:
+            warehouse.adjust(name, 1)
+        start = time.perf_counter()
+        warehouse.apply_batch(batch)
+        batch_seconds = min(batch_seconds, time.perf_counter() - start)
+    return {"rows": rows, "movements": movements,
+            "batch_us_per_movement": batch_seconds / movements * 1e6,
+            "single_us_per_movement": single_seconds / movements * 1e6}
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+async def _run_server_load(warehouse, clients, requests_per_client, seed):
+    server = WarehouseServer(warehouse)
+    await server.start()
+    names = [product.name for product in warehouse.products]
+    latencies = []
+
+    async def client(index):
+        rng = random.Random(seed + index)
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        for i in range(requests_per_client):
+            # Почергово списуємо і повертаємо одиницю, щоб залишки не вичерпувались
+            name = rng.choice(names)
+            for command in (f"TAKE\t{name}\t1", f"ADJUST\t{name}\t1"):
+                start = time.perf_counter()
+                writer.write(command.encode('utf-8') + b'\n')
+                await writer.drain()
+                await reader.readline()
+                latencies.append(time.perf_counter() - start)
+        writer.close()
+        await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(clients)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return {"clients": clients, "requests": len(latencies), "throughput_rps": len(latencies) / elapsed,
+            "p50_ms": _percentile(latencies, 50) * 1e3, "p99_ms": _percentile(latencies, 99) * 1e3}
+
+
+def bench_server(rows, client_counts, requests_per_client=500, seed=0):
+    """Навантажує WarehouseServer зростаючою кількістю клієнтів."""
+    warehouse = Warehouse(ProductStore(
+        product for product in generate_products(rows, seed) if product.quantity > 0))
+    return [asyncio.run(_run_server_load(warehouse, clients, requests_per_client, seed))
+            for clients in client_counts]
+
+
+def bench_shards(rows, shard_counts, lookups=1_000, seed=0):
+    """Завантажує склад у ShardedWarehouse з різною кількістю шардів-процесів і міряє запити до них."""
+    rng = random.Random(seed)
+    names = rng.choices([product.name for product in generate_products(rows, seed)], k=lookups)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'products.txt')
+        write_product_file(text_path, rows, seed)
+        for shards in shard_counts:
+            with ShardedWarehouse(range(shards), partition='hash') as warehouse, redirect_stdout(StringIO()):
+                start = time.perf_counter()
+                warehouse.load_products_from_file(text_path)
+                load = time.perf_counter() - start
+                warehouse.stock_groups('name')  # Підсумки шардів будуються при першому зверненні
+
+                start = time.perf_counter()
+                for name in names:
+                    warehouse.total_quantity(name)
+                lookup = (time.perf_counter() - start) / lookups
+
+                start = time.perf_counter()
+                warehouse.stock_groups('producer')
+                aggregate = time.perf_counter() - start
+                results.append({"shards": shards, "rows": rows, "load_s": load, "lookup_us": lookup * 1e6,
+                                "aggregate_ms": aggregate * 1e3,
+                                "largest_shard_rows": max(warehouse.product_counts().values())})
+    return results
+
+
+def bench_parse(rows, worker_counts, seed=0):
+    """Міряє завантаження файлу load_products_from_file з різною кількістю процесів розбору.
+
+    1 процес - звичайне послідовне завантаження; прискорення рахується відносно нього.
+    Створення продуктів і додавання у склад лишаються в батьківському процесі;
+    їхній час (parent_s) міряється окремо, і відношення базового часу до нього -
+    стеля прискорення за будь-якої кількості процесів.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'products.txt')
+        write_product_file(text_path, rows, seed)
+        parsed, _, _ = _parse_file_chunk((text_path, 0, os.path.getsize(text_path)))
+        warehouse = Warehouse()
+        gc.collect()
+        start = time.perf_counter()
+        warehouse.products.extend([_row_product(row) for row in parsed])
+        parent = time.perf_counter() - start
+        del parsed, warehouse
+        baseline = None
+        for workers in worker_counts:
+            warehouse = Warehouse()
+            gc.collect()
+            with redirect_stdout(StringIO()):
+                start = time.perf_counter()
+                loaded = warehouse.load_products_from_file(text_path, workers=workers)
+                load = time.perf_counter() - start
+            if baseline is None and workers <= 1:
+                baseline = load
+            results.append({"workers": workers, "rows": rows, "loaded": loaded, "load_s": load, "parent_s": parent,
+                            "speedup": baseline / load if baseline else None,
+                            "speedup_ceiling": baseline / parent if baseline else None})
+    return results
+
+
+STARTUP_BUDGET_MS = 100  # Бюджет холодного запуску однієї команди термінала
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output):
+    """Розбирає stderr запуску з -X importtime у словник модуль -> (власний, сумарний час у мкс, глибина).
+
+    Глибина 0 - модуль, імпортований напряму, 1 - його власні імпорти і так далі.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = (int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2)
+    return modules
+
+
+def bench_startup(rows, runs=10, seed=0):
+    """Міряє час імпорту main і повний час однієї команди 'total' над знімком складу в окремих процесах.
+
+    Команда запускається як модуль (python -m main), що бере скомпільований
+    байт-код, і як скрипт, який Python компілює заново при кожному запуску.
+
+    Байт-код модулів проєкту компілюється заздалегідь, як після встановлення.
+    """
+    compileall.compile_dir(PROJECT_DIRECTORY, quiet=1, maxlevels=1)
+    main_path = os.path.join(PROJECT_DIRECTORY, "main.py")
+    imports = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=PROJECT_DIRECTORY,
+                                   capture_output=True, text=True, check=True)
+        imports.append(parse_importtime(completed.stderr))
+    best = min(imports, key=lambda modules: modules["main"][1])
+    # Найдорожчі модулі, імпортовані безпосередньо з main (вкладеність 1)
+    heaviest = sorted(((name, cumulative) for name, (_, cumulative, depth) in best.items() if depth == 1),
+                      key=lambda item: -item[1])[:8]
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "warehouse.snap")
+        warehouse = Warehouse(ProductStore(generate_products(rows, seed)))
+        warehouse.save_snapshot(snapshot_path)
+        name = next(iter(warehouse.products)).name
+        arguments = ["--snapshot", snapshot_path, "total", name]
+        timings = {"module": [], "script": []}
+        for _ in range(runs):
+            for form, command in (("module", [sys.executable, "-m", "main", *arguments]),
+                                  ("script", [sys.executable, main_path, *arguments])):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=PROJECT_DIRECTORY, capture_output=True, check=True)
+                timings[form].append(time.perf_counter() - start)
+        baseline = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+            baseline.append(time.perf_counter() - start)
+    command_ms = statistics.median(timings["module"]) * 1e3
+    return {"rows": rows, "import_main_ms": best["main"][1] / 1e3,
+            "heaviest_imports_ms": {name: cumulative / 1e3 for name, cumulative in heaviest},
+            "interpreter_ms": statistics.median(baseline) * 1e3, "command_ms": command_ms,
+            "script_command_ms": statistics.median(timings["script"]) * 1e3,
+            "budget_ms": STARTUP_BUDGET_MS, "within_budget": command_ms <= STARTUP_BUDGET_MS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse benchmarks")
+    parser.add_argument("benchmark", choices=["memory", "objects", "sqlite", "batch", "server", "suite", "shards", "startup", "parse"])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--movements", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SUITE_SIZES), help="suite inventory sizes")
+    parser.add_argument("--output", help="write suite results to this JSON file")
+    parser.add_argument("--baseline", help="compare suite results with this JSON file")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs in the suite")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="shard process counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="parser process counts")
+    parser.add_argument("--runs", type=int, default=10, help="process launches per startup measurement")
+    args = parser.parse_args()
+
+    if args.benchmark == "memory":
+        for result in bench_memory(args.rows):
+            print(f"{result['store']:<22} {result['rows']:>10} rows  "
+                  f"{result['bytes_per_product']:>8.1f} bytes/product  peak {result['peak_bytes'] / 2**20:.1f} MiB")
+    elif args.benchmark == "objects":
+        for result in bench_objects(args.rows):
+            print(f"{result['representation']:<28} {result['rows']:>10} rows  "
+                  f"{result['bytes_per_product']:>8.1f} bytes/product  peak {result['peak_bytes'] / 2**20:.1f} MiB")
+    elif args.benchmark == "sqlite":
+        for result in bench_sqlite(args.rows, args.movements):
+            print(f"{result['store']:<20} {result['rows']:>10} rows  load {result['load_s']:.2f} s  "
+                  f"lookup {result['lookup_us']:.1f} us  batch take {result['batch_take_us_per_movement']:.1f} us/movement  "
+                  f"aggregate {result['aggregate_us']:.1f} us (first {result['first_aggregate_ms']:.1f} ms)")
+    elif args.benchmark == "batch":
+        result = bench_batch(args.rows, args.movements)
+        print(f"{result['movements']} movements over {result['rows']} rows: "
+              f"apply_batch {result['batch_us_per_movement']:.2f} us/movement, "
+              f"single calls {result['single_us_per_movement']:.2f} us/movement")
+    elif args.benchmark == "suite":
+        run = run_suite(args.sizes, memory=not args.no_memory)
+        for result in run["results"]:
+            peak = "" if result["peak_bytes"] is None else f"  peak {result['peak_bytes'] / 2**20:.1f} MiB"
+            print(f"{result['case']:<34} {result['rows']:>10} rows  {result['seconds'] * 1e3:>10.2f} ms{peak}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(run, file, indent=2)
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as file:
+                baseline = json.load(file)
+            for case, rows, ratio, regressed in compare_runs(run, baseline):
+                print(f"{case:<34} {rows:>10} rows  x{ratio:.2f}{'  REGRESSION' if regressed else ''}")
+    elif args.benchmark == "shards":
+        for result in bench_shards(args.rows, args.shards):
+            print(f"{result['shards']:>3} shards  {result['rows']:>10} rows  load {result['load_s']:.2f} s  "
+                  f"lookup {result['lookup_us']:.1f} us  aggregate {result['aggregate_ms']:.1f} ms  "
+                  f"largest shard {result['largest_shard_rows']} rows")
+    elif args.benchmark == "parse":
+        print(f"{os.cpu_count()} CPUs")
+        for result in bench_parse(args.rows, args.workers):
+            speedup = "" if result["speedup"] is None else f"  x{result['speedup']:.2f}"
+            print(f"{result['workers']:>3} workers  {result['rows']:>10} rows  load {result['load_s']:.2f} s{speedup}")
+        if result["speedup_ceiling"] is not None:
+            # Продукти створюються послідовно в батьківському процесі
+            print(f"building products in the parent: {result['parent_s']:.2f} s, "
+                  f"speedup ceiling x{result['speedup_ceiling']:.2f}")
+    elif args.benchmark == "startup":
+        result = bench_startup(args.rows, args.runs)
+        print(f"import main: {result['import_main_ms']:.1f} ms")
+        for name, milliseconds in result["heaviest_imports_ms"].items():
+            print(f"  {name:<28} {milliseconds:>8.1f} ms")
+        print(f"bare interpreter: {result['interpreter_ms']:.1f} ms")
+        print(f"one-shot 'total' over {result['rows']} rows: {result['command_ms']:.1f} ms "
+              f"(budget {result['budget_ms']} ms, {'OK' if result['within_budget'] else 'OVER BUDGET'})")
+        print(f"  as script (python main.py):  {result['script_command_ms']:.1f} ms")
+    elif args.benchmark == "server":
+        for result in bench_server(args.rows, args.clients, args.requests):
+            print(f"{result['clients']:>4} clients  {result['throughput_rps']:>10.0f} req/s  "
+                  f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
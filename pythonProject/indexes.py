@@ -0,0 +1,364 @@
+"""Вторинні індекси складу, що оновлюються разом зі сховищем продуктів.
+
+Індекси підписуються на сховище (BaseProductStore.subscribe) і отримують
+повідомлення product_added, product_removed та product_changed, тож не
+потребують повного перебудування після кожної зміни.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+import heapq
+from itertools import islice
+import math
+
+# Підсумок групи продуктів: кількість продуктів, загальна кількість одиниць, вартість і об'єм запасу
+RollupTotals = namedtuple('RollupTotals', ['count', 'quantity', 'value', 'volume'])
+
+
+class SortedKeyList:
+    """Відсортований список, поділений на блоки обмеженого розміру.
+
+    Пошук займає O(log n), вставка і видалення - O(log n) плюс зсув у межах
+    одного блоку, а не всього списку.
+    """
+
+    LOAD = 512  # Бажаний розмір блоку
+
+    def __init__(self, values=()):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+        for value in sorted(values):
+            self._append_sorted(value)
+
+    def _append_sorted(self, value):
+        if not self._lists or len(self._lists[-1]) >= self.LOAD:
+            self._lists.append([])
+            self._maxes.append(value)
+        self._lists[-1].append(value)
+        self._maxes[-1] = value
+        self._len += 1
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for values in self._lists:
+            yield from values
+
+    def __reversed__(self):
+        for values in reversed(self._lists):
+            yield from reversed(values)
+
+    def add(self, value):
+        """Додає значення, зберігаючи порядок."""
+        if not self._maxes:
+            self._append_sorted(value)
+            return
+        position = bisect_left(self._maxes, value)
+        if position == len(self._maxes):
+            position -= 1
+            self._lists[position].append(value)
+            self._maxes[position] = value
+        else:
+            insort(self._lists[position], value)
+        self._len += 1
+
+        # Завеликий блок ділимо навпіл
+        values = self._lists[position]
+        if len(values) > 2 * self.LOAD:
+            half = values[self.LOAD:]
+            del values[self.LOAD:]
+            self._lists.insert(position + 1, half)
+            self._maxes.insert(position, values[-1])
+
+    def remove(self, value):
+        """Видаляє значення; ValueError, якщо його немає."""
+        position = bisect_left(self._maxes, value)
+        if position == len(self._maxes):
+            raise ValueError(f"{value!r} not in list")
+        values = self._lists[position]
+        index = bisect_left(values, value)
+        if index == len(values) or values[index] != value:
+            raise ValueError(f"{value!r} not in list")
+        del values[index]
+        self._len -= 1
+        if not values:
+            del self._lists[position]
+            del self._maxes[position]
+        elif index == len(values):
+            self._maxes[position] = values[-1]
+
+    def irange(self, minimum=None, maximum=None, reverse=False):
+        """Перебирає значення з проміжку [minimum, maximum] за O(log n + k)."""
+        if reverse:
+            yield from self._irange_reverse(minimum, maximum)
+            return
+        position = 0 if minimum is None else bisect_left(self._maxes, minimum)
+        for block in range(position, len(self._lists)):
+            values = self._lists[block]
+            start = bisect_left(values, minimum) if minimum is not None and block == position else 0
+            for value in islice(values, start, None):
+                if maximum is not None and value > maximum:
+                    return
+                yield value
+
+    def _irange_reverse(self, minimum, maximum):
+        position = len(self._lists) - 1 if maximum is None else min(bisect_right(self._maxes, maximum),
+                                                                      len(self._lists) - 1)
+        for block in range(position, -1, -1):
+            values = self._lists[block]
+            end = bisect_right(values, maximum) if maximum is not None and block == position else len(values)
+            for index in range(end - 1, -1, -1):
+                value = values[index]
+                if minimum is not None and value < minimum:
+                    return
+                yield value
+
+
+class SortedProductIndex:
+    """Індекс продуктів, відсортованих за значенням поля.
+
+    Продукти без значення поля (або зі значенням None чи NaN) до індексу не
+    потрапляють. Однакові значення впорядковуються у порядку додавання.
+    """
+
+    def __init__(self, field, products=(), aliases=()):
+        self.field = field
+        self.aliases = aliases  # інші поля, зміна яких змінює значення field
+        self._entries = SortedKeyList()  # пари (значення, номер додавання)
+        self._keys = {}  # id(продукту) -> ключ у списку
+        self._by_sequence = {}  # номер додавання -> продукт
+        self._sequence = 0
+        for product in products:
+            self.product_added(product)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return self.range()
+
+    def _value(self, product):
+        value = getattr(product, self.field, None)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        return value
+
+    def product_added(self, product):
+        value = self._value(product)
+        if value is None:
+            return
+        self._sequence += 1
+        key = (value, self._sequence)
+        self._entries.add(key)
+        self._keys[id(product)] = key
+        self._by_sequence[self._sequence] = product
+
+    def product_removed(self, product):
+        key = self._keys.pop(id(product), None)
+        if key is not None:
+            self._entries.remove(key)
+            del self._by_sequence[key[1]]
+
+    def product_changed(self, product, field, old_value):
+        if field == self.field or field in self.aliases:
+            self.product_removed(product)
+            self.product_added(product)
+
+    def range(self, lower=None, upper=None, include_lower=True, include_upper=True, reverse=False):
+        """Перебирає продукти зі значенням поля між lower та upper за O(log n + k)."""
+        # Ключі - пари (значення, номер), тож межі задаються парами з крайніми номерами
+        minimum = None if lower is None else (lower, -math.inf if include_lower else math.inf)
+        maximum = None if upper is None else (upper, math.inf if include_upper else -math.inf)
+        by_sequence = self._by_sequence
+        for _, sequence in self._entries.irange(minimum, maximum, reverse):
+            yield by_sequence[sequence]
+
+    def smallest(self, k):
+        """Повертає k продуктів з найменшим значенням поля."""
+        return list(islice(self.range(), k))
+
+    def largest(self, k):
+        """Повертає k продуктів з найбільшим значенням поля."""
+        return list(islice(self.range(reverse=True), k))
+
+
+class ExpiryQueue:
+    """Черга харчових продуктів за абсолютним днем закінчення терміну придатності.
+
+    Купа з відкладеним видаленням: вилучені чи змінені продукти лишаються у
+    купі, доки не опиняться на її вершині, а купа перебудовується, коли
+    застарілих записів стає більше, ніж актуальних. Кожен продукт видається
+    pop_due один раз, поки його термін придатності не зміниться; продукти з
+    позначкою marked_down (уже уцінені) до черги не потрапляють. clock -
+    годинник складу (ExpiryClock), за яким pop_expiring визначає сьогоднішній день.
+    """
+
+    FIELDS = ('expires_at', 'expiry_date')
+
+    def __init__(self, products=(), clock=None):
+        self.clock = clock
+        self._heap = []  # трійки (день закінчення, номер додавання, продукт)
+        self._live = {}  # id(продукту) -> номер його актуального запису
+        self._sequence = 0
+        for product in products:
+            self._push(product, heapify=False)
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._live)
+
+    def _push(self, product, heapify=True):
+        expires_at = getattr(product, 'expires_at', None)
+        if expires_at is None or expires_at != expires_at or product.marked_down:
+            return
+        self._sequence += 1
+        self._live[id(product)] = self._sequence
+        entry = (expires_at, self._sequence, product)
+        if heapify:
+            heapq.heappush(self._heap, entry)
+        else:
+            self._heap.append(entry)
+
+    def product_added(self, product):
+        self._push(product)
+
+    def product_removed(self, product):
+        self._live.pop(id(product), None)
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [entry for entry in self._heap if self._live.get(id(entry[2])) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def product_changed(self, product, field, old_value):
+        if field in self.FIELDS:
+            self.product_removed(product)
+            self._push(product)
+
+    def peek(self):
+        """Повертає продукт з найближчим терміном придатності або None."""
+        heap = self._heap
+        while heap and self._live.get(id(heap[0][2])) != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def pop_due(self, day):
+        """Вилучає з черги і перебирає продукти з днем закінчення не пізніше day за O(k log n)."""
+        heap = self._heap
+        while heap and heap[0][0] <= day:
+            _, sequence, product = heapq.heappop(heap)
+            if self._live.get(id(product)) == sequence:
+                del self._live[id(product)]
+                yield product
+
+    def pop_expiring(self, days):
+        """Вилучає з черги і перебирає продукти, термін яких спливає не пізніше ніж через days днів."""
+        return self.pop_due(self.clock.today + days)
+
+
+class Rollups:
+    """Поточні підсумки запасів за групами продуктів.
+
+    dimensions - словник вимір -> функція, що повертає групу продукту (None -
+    продукт у вимір не входить). Якщо вимір названо так само, як поле продукту,
+    зміна цього поля переносить продукт в іншу групу. Підсумки оновлюються при
+    кожній зміні, тож запит до групи займає O(1). Об'єм рахується для
+    продуктів з атрибутом volume (об'єм одиниці), зміна якого приходить як зміна поля 'dimensions'.
+
+    Кожен вимір будується проходом по products лише при першому запиті до
+    нього, тож products має бути сховищем (або іншою послідовністю, яку можна
+    перебрати знову), а підсумки за категорією не тягнуть за собою групи
+    кожної назви.
+    """
+
+    def __init__(self, dimensions, products=()):
+        self.dimensions = dimensions
+        self._products = products
+        self._built = {}  # побудовані виміри: вимір -> функція групи
+        self._groups = {}  # вимір -> група -> [к-сть, одиниці, вартість, об'єм]
+
+    def is_built(self, dimension):
+        """Чи вимір уже побудовано, тож запит до нього не перебиратиме продукти."""
+        return dimension in self._built
+
+    def _dimension(self, dimension):
+        """Повертає групи виміру, будуючи їх при першому запиті."""
+        groups = self._groups.get(dimension)
+        if groups is None:
+            key_of = self.dimensions[dimension]
+            groups = self._groups[dimension] = {}
+            for product in self._products:
+                quantity = product.quantity
+                self._add(dimension, key_of(product), 1, quantity, product.cost * quantity,
+                          getattr(product, 'volume', 0.0) * quantity)
+            self._built[dimension] = key_of
+        return groups
+
+    def _add(self, dimension, key, count, quantity, value, volume):
+        if key is None:
+            return
+        groups = self._groups[dimension]
+        entry = groups.get(key)
+        if entry is None:
+            entry = groups[key] = [0, 0, 0.0, 0.0]
+        entry[0] += count
+        entry[1] += quantity
+        entry[2] += value
+        entry[3] += volume
+        if not entry[0]:
+            del groups[key]  # Заодно відкидаємо накопичену похибку сум з плаваючою комою
+
+    def _add_product(self, product, sign):
+        quantity = product.quantity
+        value = product.cost * quantity
+        volume = getattr(product, 'volume', 0.0) * quantity
+        for dimension, key_of in self._built.items():
+            self._add(dimension, key_of(product), sign, sign * quantity, sign * value, sign * volume)
+
+    def product_added(self, product):
+        self._add_product(product, 1)
+
+    def product_removed(self, product):
+        self._add_product(product, -1)
+
+    def product_changed(self, product, field, old_value):
+        if field == 'quantity':
+            delta = product.quantity - old_value
+            volume = getattr(product, 'volume', 0.0) * delta
+            for dimension, key_of in self._built.items():
+                self._add(dimension, key_of(product), 0, delta, product.cost * delta, volume)
+        elif field == 'cost':
+            delta = (product.cost - old_value) * product.quantity
+            for dimension, key_of in self._built.items():
+                self._add(dimension, key_of(product), 0, 0, delta, 0.0)
+        elif field == 'dimensions':
+            delta = (product.volume - old_value.volume) * product.quantity
+            for dimension, key_of in self._built.items():
+                self._add(dimension, key_of(product), 0, 0, 0.0, delta)
+        elif field in self._built:
+            quantity = product.quantity
+            value = product.cost * quantity
+            volume = getattr(product, 'volume', 0.0) * quantity
+            self._add(field, old_value, -1, -quantity, -value, -volume)
+            self._add(field, self._built[field](product), 1, quantity, value, volume)
+
+    def totals(self, dimension, key):
+        """Повертає RollupTotals групи key у вимірі dimension."""
+        entry = self._dimension(dimension).get(key)
+        return RollupTotals(0, 0, 0.0, 0.0) if entry is None else RollupTotals(*entry)
+
+    def groups(self, dimension):
+        """Повертає словник група -> RollupTotals для виміру dimension."""
+        return {key: RollupTotals(*entry) for key, entry in self._dimension(dimension).items()}
+
+    def compare(self, other, rel_tol=1e-9):
+        """Порівнює підсумки з іншими і повертає розбіжності (вимір, група, ці, інші)."""
+        mismatches = []
+        for dimension in self.dimensions:
+            ours, theirs = self._dimension(dimension), other._dimension(dimension)
+            for key in ours.keys() | theirs.keys():
+                mine, expected = self.totals(dimension, key), other.totals(dimension, key)
+                if (mine.count != expected.count or mine.quantity != expected.quantity
+                        or not math.isclose(mine.value, expected.value, rel_tol=rel_tol, abs_tol=1e-6)
+                        or not math.isclose(mine.volume, expected.volume, rel_tol=rel_tol, abs_tol=1e-6)):
+                    mismatches.append((dimension, key, mine, expected))
+        return mismatches
@@ -0,0 +1 @@
+"""Тексти інтерфейсу складу за мовами (див. main.load_translation)."""
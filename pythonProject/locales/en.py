@@ -0,0 +1,43 @@
+"""Англійські тексти інтерфейсу, що завантажуються лише при виборі цієї мови."""
+TRANSLATION = {
+    "menu": {
+        "header": "~~~ Warehouse Management System ~~~",
+        "load_from_file": "Load products from file",
+        "show_groups": "Show product groups",
+        "add_product": "Add new product",
+        "remove_product": "Remove product",
+        "find_product": "Find product by name",
+        "update_product": "Update product",
+        "sort_products": "Sort products",
+        "performance": "Performance statistics",
+        "exit": "Exit"
+    },
+    "performance": {
+        "header": "Performance statistics",
+        "toggle_metrics": "Enable/disable metrics",
+        "show_stats": "Show statistics",
+        "save_stats": "Save statistics to JSON file",
+        "toggle_profile": "Start/stop profiling of menu operations",
+        "reset_stats": "Reset statistics",
+        "back": "Back",
+        "metrics_enabled": "Metrics enabled.",
+        "metrics_disabled": "Metrics disabled.",
+        "profile_started": "Profiling started. Profile is shown when profiling is stopped.",
+        "stats_saved": "Statistics saved.",
+        "stats_reset": "Statistics reset."
+    },
+    "invalid_choice": "Invalid choice. Please enter a number between 1 and 9.",
+    "prompt": {
+        "file_path": "Enter file path: ",
+        "product_name": "Enter product name: ",
+        "product_cost": "Enter product cost: ",
+        "product_quantity": "Enter product quantity: ",
+        "product_producer": "Enter product producer: ",
+        "is_food_product": "Is it a food product? (yes/no): ",
+        "expiry_date": "Enter expiry date (in days): ",
+        "product_dimensions": "Enter product dimensions: ",
+        "product_purpose": "Enter product purpose: ",
+        "change_amount": "Enter quantity change (positive for increase, negative for decrease): ",
+        "taken_quantity": "Enter quantity taken from warehouse: "
+    }
+}
@@ -0,0 +1,43 @@
+"""Українські тексти інтерфейсу, що завантажуються лише при виборі цієї мови."""
+TRANSLATION = {
+    "menu": {
+        "header": "~~~ Система управління складом ~~~",
+        "load_from_file": "Завантажити продукти з файлу",
+        "show_groups": "Показати групи продуктів",
+        "add_product": "Додати новий продукт",
+        "remove_product": "Видалити продукт",
+        "find_product": "Знайти продукт за назвою",
+        "update_product": "Оновити продукт",
+        "sort_products": "Сортувати продукти",
+        "performance": "Статистика продуктивності",
+        "exit": "Вийти"
+    },
+    "performance": {
+        "header": "Статистика продуктивності",
+        "toggle_metrics": "Увімкнути/вимкнути метрики",
+        "show_stats": "Показати статистику",
+        "save_stats": "Зберегти статистику у файл JSON",
+        "toggle_profile": "Почати/зупинити профілювання операцій меню",
+        "reset_stats": "Скинути статистику",
+        "back": "Назад",
+        "metrics_enabled": "Метрики увімкнено.",
+        "metrics_disabled": "Метрики вимкнено.",
+        "profile_started": "Профілювання розпочато. Профіль буде показано після його зупинки.",
+        "stats_saved": "Статистику збережено.",
+        "stats_reset": "Статистику скинуто."
+    },
+    "invalid_choice": "Невірний вибір. Будь ласка, введіть число від 1 до 9.",
+    "prompt": {
+        "file_path": "Введіть шлях до файлу: ",
+        "product_name": "Введіть назву продукту: ",
+        "product_cost": "Введіть вартість продукту: ",
+        "product_quantity": "Введіть кількість продукту: ",
+        "product_producer": "Введіть назву виробника продукту: ",
+        "is_food_product": "Це харчовий продукт? (так/ні): ",
+        "expiry_date": "Введіть термін придатності (в днях): ",
+        "product_dimensions": "Введіть розміри продукту: ",
+        "product_purpose": "Введіть призначення продукту: ",
+        "change_amount": "Введіть зміни в кількості (позитивне для збільшення, негативне для зменшення): ",
+        "taken_quantity": "Введіть кількість, взяту зі складу: "
+    }
+}
@@ -1,123 +1,2463 @@
-from tabulate import tabulate
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import nullcontext
+from itertools import islice
+import importlib
 import logging
+import math
+import os
+import re
+import sys
 
-# Налаштування логування
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Журнал операцій, індекси, пошук, знімки та фонове стиснення журналу
+# імпортують свої модулі при першому використанні, щоб не сповільнювати запуск
+from metrics import metrics
+from validation import Field, FieldError, Schema, compile_field, validate_rows
+
+# Налаштування логування; виконується точками входу (main, server), а не під час імпорту модуля
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(level=logging.INFO):
+    """Налаштовує вивід журналу застосунку."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+# Правила зміни ціни
+EXPIRY_DISCOUNT_DAYS = 0.2  # Термін придатності, з якого діє знижка
+EXPIRY_DISCOUNT_FACTOR = 0.9  # Знижка 10%
+OVERSIZE_LIMIT = 100  # Сума розмірів (см), після якої діє надбавка
+OVERSIZE_SURCHARGE_FACTOR = 1.1  # Надбавка 10%
+
+
+class ExpiryClock:
+    """Лічильник днів складу, відносно якого рахуються терміни придатності.
+
+    Харчові продукти зберігають абсолютний день закінчення терміну за
+    годинником свого складу, тож перехід на наступний день не змінює жодного
+    продукту: expiry_date обчислюється як різниця між цим днем і поточним.
+    Кожне сховище (і склад, що його використовує) має власний годинник.
+    """
+
+    def __init__(self, today=0):
+        self.today = today
+
+    def advance(self, days=1):
+        """Переводить годинник на days днів уперед."""
+        self.today += days
+
+
+# Годинник продуктів, ще не доданих до складу; ніколи не переводиться
+_DETACHED_CLOCK = ExpiryClock()
+
+
+def shared_string(value):
+    """Повертає спільний екземпляр рядка, що повторюється у багатьох продуктах.
+
+    Виробників і призначень лише кілька сотень на мільйони продуктів, тож усі
+    продукти з однаковим значенням посилаються на один рядок.
+    """
+    return sys.intern(value) if type(value) is str else value
 
 
 class Product:
     """Клас, що представляє продукт з основними атрибутами."""
 
+    # Атрибути зберігаються у слотах, без словника на кожен продукт;
+    # _store - сховище, у якому лежить продукт, або None
+    __slots__ = ('name', 'cost', 'quantity', 'producer', '_store')
+
     def __init__(self, name, cost, quantity, producer):
         self.name = name
         self.cost = cost
         self.quantity = quantity
-        self.producer = producer
+        self.producer = shared_string(producer)
+        self._store = None
+
+    def _set_cost(self, cost):
+        # Власні зміни продукту (decrease_cost) повідомляють слухачів сховища,
+        # як і Warehouse._set_field, щоб індекси й підсумки не застарівали
+        old_cost = self.cost
+        self.cost = cost
+        if self._store is not None:
+            self._store.changed(self, 'cost', old_cost)
 
 
 class FoodProduct(Product):
-    """Клас, що представляє харчовий продукт, з додатковим атрибутом для дати терміну придатності."""
+    """Клас, що представляє харчовий продукт, з додатковим атрибутом для дати терміну придатності.
+
+    marked_down - чи продукт уже уцінено за терміном придатності (див.
+    Warehouse.apply_expiry_markdowns); уцінений продукт більше не уцінюється.
+    """
 
-    def __init__(self, name, cost, quantity, producer, expiry_date):
+    __slots__ = ('expires_at', 'clock', 'marked_down')
+
+    def __init__(self, name, cost, quantity, producer, expiry_date, clock=None):
         super().__init__(name, cost, quantity, producer)
+        self.clock = clock if clock is not None else _DETACHED_CLOCK
         self.expiry_date = expiry_date
+        self.marked_down = False
+
+    @property
+    def expiry_date(self):
+        """Кількість днів до закінчення терміну придатності."""
+        return None if self.expires_at is None else self.expires_at - self.clock.today
+
+    @expiry_date.setter
+    def expiry_date(self, value):
+        # Зберігаємо абсолютний день, щоб старіння не вимагало змін продукту
+        self.expires_at = None if value is None else value + self.clock.today
+
+    def use_clock(self, clock):
+        """Переводить продукт на годинник clock, зберігаючи кількість днів до закінчення терміну."""
+        if clock is not self.clock:
+            if self.expires_at is not None:
+                self.expires_at += clock.today - self.clock.today
+            self.clock = clock
 
     def decrease_cost(self):
         """Метод для зменшення вартості продукту, якщо термін придатності майже закінчився."""
         try:
-            if self.expiry_date is not None and self.expiry_date <= 0.2:
-                self.cost *= 0.9  # Зменшуємо вартість на 10%
+            if self.expiry_date is not None and self.expiry_date <= EXPIRY_DISCOUNT_DAYS:
+                self._set_cost(self.cost * EXPIRY_DISCOUNT_FACTOR)  # Зменшуємо вартість на 10%
                 logging.info(f"Ціна на {self.name} зменшена через малий термін придатності.")
         except Exception as e:
             logging.error(f"Помилка при зменшенні ціни: {e}")
 
 
+_DIMENSIONS_SEPARATOR = re.compile(r'\s*[xX×*]\s*')
+
+
+class Dimensions(namedtuple('Dimensions', ['length', 'width', 'height'])):
+    """Розміри продукту в сантиметрах: довжина, ширина та висота."""
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, value):
+        """Створює розміри з рядка "AxBxC", трійки чисел або одного числа.
+
+        Одне число - старий формат, у якому зберігалася лише сума розмірів;
+        воно стає довжиною, а ширина та висота дорівнюють нулю.
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            sides = _DIMENSIONS_SEPARATOR.split(value.strip())
+        elif isinstance(value, (tuple, list)):
+            sides = value
+        else:
+            sides = [value]
+        if len(sides) == 1:
+            sides = [sides[0], 0.0, 0.0]
+        if len(sides) != 3:
+            raise ValueError(f"Invalid dimensions '{value}'. Use LxWxH, for example 40x30x20.")
+        return cls(*map(float, sides))
+
+    def __str__(self):
+        # Скорочений запис для показу; для збереження - encode
+        if not self.width and not self.height:
+            return f"{self.length:g}"
+        return 'x'.join(f"{side:g}" for side in self)
+
+    def encode(self):
+        """Рядок "AxBxC" з повною точністю кожної сторони для журналу операцій і передачі між процесами."""
+        if not self.width and not self.height:
+            return repr(self.length)
+        return 'x'.join(map(repr, self))
+
+    @property
+    def total_size(self):
+        """Сума трьох розмірів."""
+        return self.length + self.width + self.height
+
+    @property
+    def volume(self):
+        """Об'єм у кубічних сантиметрах."""
+        return self.length * self.width * self.height
+
+    @property
+    def girth(self):
+        """Обхват навколо найдовшої сторони: подвоєна сума двох менших сторін."""
+        _, middle, shortest = sorted(self, reverse=True)
+        return 2 * (middle + shortest)
+
+    def fits_in(self, bin_dimensions):
+        """Чи поміщається продукт у контейнер з розмірами bin_dimensions з урахуванням поворотів."""
+        return all(side <= limit for side, limit in zip(sorted(self), sorted(bin_dimensions)))
+
+
 class NonFoodProduct(Product):
     """Клас, що представляє непродовольчий продукт, з додатковими атрибутами для розмірів і призначення."""
 
+    __slots__ = ('purpose', '_dimensions', '_total_size', '_volume', '_girth')
+
     def __init__(self, name, cost, quantity, producer, dimensions, purpose):
         super().__init__(name, cost, quantity, producer)
         self.dimensions = dimensions
-        self.purpose = purpose
+        self.purpose = shared_string(purpose)
+
+    @property
+    def dimensions(self):
+        """Розміри продукту (Dimensions); можна присвоїти рядок "AxBxC", трійку чисел або число."""
+        return self._dimensions
+
+    @dimensions.setter
+    def dimensions(self, value):
+        # Розміри розбираються один раз, похідні величини рахуються одразу
+        dimensions = Dimensions.parse(value)
+        self._dimensions = dimensions
+        self._total_size = dimensions.total_size
+        self._volume = dimensions.volume
+        self._girth = dimensions.girth
+
+    @property
+    def total_size(self):
+        """Сума розмірів продукту."""
+        return self._total_size
+
+    @property
+    def volume(self):
+        """Об'єм продукту."""
+        return self._volume
+
+    @property
+    def girth(self):
+        """Обхват продукту навколо найдовшої сторони."""
+        return self._girth
 
     def decrease_cost(self):
         """Метод для збільшення вартості продукту, якщо загальна сума розмірів перевищує 100 см."""
         try:
-            total_size = sum(map(float, str(self.dimensions).split('x')))
-            if total_size > 100:
-                self.cost *= 1.1  # Додаємо 10% надбавки
+            if self.total_size > OVERSIZE_LIMIT:
+                self._set_cost(self.cost * OVERSIZE_SURCHARGE_FACTOR)  # Додаємо 10% надбавки
                 logging.info(f"Ціна на {self.name} збільшена через великі розміри.")
         except Exception as e:
             logging.error(f"Помилка при зміні ціни товару {self.name}: {e}")
 
 
+RepricingSummary = namedtuple('RepricingSummary', ['checked', 'changed', 'cost_delta', 'value_delta'])
+RepricingSummary.__doc__ = """Підсумок переоцінки: перевірено, змінено, зміна цін за одиницю та вартості запасів."""
+
+
+class RepricingRule:
+    """Правило переоцінки: множник вартості для продуктів, поле яких задовольняє умову."""
+
+    product_class = Product
+    field = None
+
+    def __init__(self, factor):
+        self.factor = factor
+
+    def test(self, value):
+        """Перевіряє значення поля field продукту."""
+        raise NotImplementedError
+
+
+class ExpiryDiscountRule(RepricingRule):
+    """Знижка на харчові продукти з малим терміном придатності."""
+
+    product_class = FoodProduct
+    field = 'expiry_date'
+
+    def __init__(self, days=EXPIRY_DISCOUNT_DAYS, factor=EXPIRY_DISCOUNT_FACTOR):
+        super().__init__(factor)
+        self.days = days
+
+    def test(self, value):
+        return value is not None and value <= self.days
+
+
+class OversizeSurchargeRule(RepricingRule):
+    """Надбавка на непродовольчі продукти з великою сумою розмірів."""
+
+    product_class = NonFoodProduct
+    field = 'total_size'
+
+    def __init__(self, limit=OVERSIZE_LIMIT, factor=OVERSIZE_SURCHARGE_FACTOR):
+        super().__init__(factor)
+        self.limit = limit
+
+    def test(self, value):
+        return value > self.limit
+
+
+DEFAULT_REPRICING_RULES = (ExpiryDiscountRule(), OversizeSurchargeRule())
+
+
+LOAD_BATCH_SIZE = 10_000  # Кількість рядків в одному пакеті завантаження
+SNAPSHOT_NAME_SCANS = 8  # Скільки пошуків за назвою у знімку виконується перебором до побудови індексу
+
+
+class ProductParseError(ValueError):
+    """Помилка розбору рядка файлу продуктів з номером рядка і полем (None - рядок загалом)."""
+
+    def __init__(self, line_number, line, message, field=None):
+        super().__init__(message)
+        self.line_number = line_number
+        self.line = line
+        self.field = field
+
+
+def parse_product_line(line):
+    """Перетворює рядок файлу на харчовий (5 полів) або непродовольчий (6 полів) продукт.
+
+    Поля перевіряються тими ж схемами, що й введення користувача; FieldError
+    (підклас ValueError) вказує поле з невірним значенням.
+    """
+    data = line.split(',')
+    schema = LINE_SCHEMAS.get(len(data))
+    if schema is None:
+        raise ValueError(f"Invalid data format: {data}")  # Невірний формат даних
+    return schema.create(data)
+
+
+def validate_product_rows(rows, start=1):
+    """Перевіряє пакет рядків продуктів (послідовностей полів) і повертає ValidationReport.
+
+    Вірні рядки потрапляють у звіт як продукти, невірні - як RowError з номером
+    рядка (від start), полем, значенням і повідомленням.
+    """
+    return validate_rows(rows, LINE_SCHEMAS, start)
+
+
+def iter_product_batches(file_path, batch_size=LOAD_BATCH_SIZE, on_error=None):
+    """Лінива генерація пакетів продуктів з файлу.
+
+    Повертає пари (пакет, кількість прочитаних рядків). Порожні рядки та
+    коментарі (#) пропускаються. Для невірних рядків викликається
+    on_error(ProductParseError); без обробника помилка пробрасується далі.
+    """
+    batch = []
+    line_number = 0
+    # Рядки діляться лише по '\n', як і діапазони паралельного розбору
+    with open(file_path, 'r', encoding='utf-8', newline='\n') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                batch.append(parse_product_line(line))
+            except ValueError as e:
+                error = ProductParseError(line_number, line, str(e), getattr(e, 'field', None))
+                if on_error is None:
+                    raise error from e
+                on_error(error)
+                continue
+            if len(batch) >= batch_size:
+                yield batch, line_number
+                batch = []
+    if batch:
+        yield batch, line_number
+
+
+def iter_products(file_path, on_error=None):
+    """Лінива генерація продуктів з файлу без створення складу."""
+    for batch, _ in iter_product_batches(file_path, on_error=on_error):
+        yield from batch
+
+
+def split_file_chunks(file_path, chunks):
+    """Ділить файл на діапазони байтів (початок, кінець), вирівняні по межах рядків."""
+    size = os.path.getsize(file_path)
+    step = max(1, size // max(1, chunks))
+    offsets = [0]
+    with open(file_path, 'rb') as file:
+        position = step
+        while position < size:
+            # Зсуваємо межу на початок наступного рядка
+            file.seek(position)
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            offsets.append(position)
+            position += step
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+
+def _parse_row(line):
+    """Перевіряє рядок файлу тими ж схемами, що й parse_product_line, і повертає плаский кортеж значень.
+
+    Розміри непродовольчого продукту розгортаються у три числа: кортеж з
+    рядків і чисел передається між процесами значно дешевше за об'єкти.
+    """
+    data = line.split(',')
+    schema = LINE_SCHEMAS.get(len(data))
+    if schema is None:
+        raise ValueError(f"Invalid data format: {data}")  # Невірний формат даних
+    values = schema.validate(data)
+    if schema is NON_FOOD_SCHEMA:
+        name, cost, quantity, producer, dimensions, purpose = values
+        return name, cost, quantity, producer, *dimensions, purpose
+    return values
+
+
+def _row_product(row):
+    """Створює продукт з кортежу _parse_row; значення вже перевірені."""
+    if len(row) == len(FOOD_SCHEMA):
+        return FoodProduct(*row)
+    name, cost, quantity, producer, length, width, height, purpose = row
+    return NonFoodProduct(name, cost, quantity, producer, Dimensions(length, width, height), purpose)
+
+
+def _parse_file_chunk(chunk):
+    """Розбирає один діапазон файлу в процесі-обробнику.
+
+    Повертає (рядки, помилки, кількість рядків): рядки - кортежі _parse_row,
+    з яких продукти створює батьківський процес, а помилки містять номери
+    рядків відносно початку діапазону.
+    """
+    file_path, start, end = chunk
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    rows = []
+    errors = []
+    # Лише '\n', як у iter_product_batches: splitlines ділив би і по '\r', '\x85' тощо,
+    # і номери рядків розійшлися б з послідовним завантаженням
+    lines = data.decode('utf-8').split('\n')
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            rows.append(_parse_row(line))
+        except ValueError as e:
+            errors.append((line_number, line, str(e), getattr(e, 'field', None)))
+    # Останній рядок файлу може не мати '\n' у кінці
+    return rows, errors, data.count(b'\n') + (not data.endswith(b'\n'))
+
+
+def iter_product_batches_parallel(file_path, workers=None, on_error=None):
+    """Розбирає файл паралельно у пулі процесів.
+
+    Файл ділиться на діапазони байтів, вирівняні по межах рядків; пакети
+    повертаються у порядку файлу як пари (пакет, кількість прочитаних рядків),
+    так само як у iter_product_batches. Обробники перевіряють рядки і
+    повертають прості кортежі значень, а продукти створюються тут, в одному
+    процесі: так не витрачається час на передачу об'єктів між процесами, а
+    спільні рядки (shared_string) спільні для всього складу, а не для обробника.
+
+    Створення продуктів і додавання їх у сховище лишаються послідовними і
+    займають від половини до двох третин часу звичайного завантаження, тому
+    прискорення не перевищує приблизно 1.5-2x за будь-якої кількості процесів
+    (стелю для конкретного файлу виводить benchmarks.py parse).
+    """
+    workers = workers or os.cpu_count() or 1
+    # Кілька діапазонів на процес вирівнюють навантаження між ними
+    chunks = [(file_path, start, end) for start, end in split_file_chunks(file_path, workers * 4)]
+    lines_read = 0
+    # Пул процесів імпортується лише тут: він помітно сповільнює запуск програми
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows, errors, line_count in executor.map(_parse_file_chunk, chunks):
+            for line_number, line, message, field in errors:
+                error = ProductParseError(lines_read + line_number, line, message, field)
+                if on_error is None:
+                    raise error
+                on_error(error)
+            lines_read += line_count
+            yield [_row_product(row) for row in rows], lines_read
+
+
+class BaseProductStore:
+    """Спільний інтерфейс сховищ продуктів складу."""
+
+    _listeners = ()  # слухачі змін, див. subscribe
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def __contains__(self, product):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def append(self, product):
+        """Додає продукт у кінець сховища."""
+        raise NotImplementedError
+
+    def extend(self, products):
+        """Додає продукти у кінець сховища."""
+        for product in products:
+            self.append(product)
+
+    def remove(self, product):
+        """Видаляє продукт зі сховища."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Видаляє всі продукти."""
+        raise NotImplementedError
+
+    def find(self, name):
+        """Повертає всі продукти з вказаною назвою у порядку сховища."""
+        raise NotImplementedError
+
+    def first(self, name):
+        """Повертає перший продукт з вказаною назвою або None."""
+        found = self.find(name)
+        return found[0] if found else None
+
+    def reorder(self, products):
+        """Змінює порядок продуктів; набір продуктів має залишитися тим самим."""
+        raise NotImplementedError
+
+    def use_clock(self, clock):
+        """Переводить сховище на годинник clock, зберігаючи кількість днів до закінчення термінів."""
+        raise NotImplementedError
+
+    def clock_advanced(self):
+        """Викликається складом після переведення годинника; сховище на диску запам'ятовує новий день."""
+
+    def subscribe(self, listener):
+        """Підписує слухача (наприклад, вторинний індекс) на зміни сховища.
+
+        Слухач отримує product_added(продукт), product_removed(продукт) та
+        product_changed(продукт, поле, старе значення).
+        """
+        self._listeners = (*self._listeners, listener)
+
+    def unsubscribe(self, listener):
+        """Відписує слухача від змін сховища."""
+        self._listeners = tuple(other for other in self._listeners if other is not listener)
+
+    def changed(self, product, field, old_value):
+        """Повідомляє слухачів, що поле продукту змінилося."""
+        for listener in self._listeners:
+            listener.product_changed(product, field, old_value)
+
+    def _notify_added(self, product):
+        for listener in self._listeners:
+            listener.product_added(product)
+
+    def _notify_removed(self, product):
+        for listener in self._listeners:
+            listener.product_removed(product)
+
+    def transaction(self):
+        """Контекстний менеджер, що об'єднує зміни в одну транзакцію, якщо сховище їх підтримує."""
+        return nullcontext()
+
+    def native_index(self, key):
+        """Повертає власну заміну вторинного індексу key (див. Warehouse._secondary_index) або None.
+
+        Сховище, що само виконує впорядковані вибірки чи підсумки (наприклад,
+        запитами до бази даних), повертає об'єкт з інтерфейсом відповідного індексу.
+        """
+        return None
+
+    def reprice(self, rules):
+        """Застосовує правила переоцінки до всіх продуктів за один прохід."""
+        checked = changed = 0
+        cost_delta = value_delta = 0.0
+        for product in self:
+            checked += 1
+            factor = 1.0
+            for rule in rules:
+                if not isinstance(product, rule.product_class):
+                    continue
+                try:
+                    if rule.test(getattr(product, rule.field)):
+                        factor *= rule.factor
+                except ValueError as e:
+                    logging.error(f"Помилка при зміні ціни товару {product.name}: {e}")
+            if factor != 1.0:
+                old_cost = product.cost
+                product.cost = old_cost * factor
+                self.changed(product, 'cost', old_cost)
+                changed += 1
+                cost_delta += product.cost - old_cost
+                value_delta += (product.cost - old_cost) * product.quantity
+        return RepricingSummary(checked, changed, cost_delta, value_delta)
+
+
+class ProductStore(BaseProductStore):
+    """Впорядковане сховище продуктів з індексом за назвою.
+
+    Продукти зберігаються у словнику в порядку додавання, тому видалення не
+    зсуває решту елементів, а пошук за назвою виконується за O(1). Назву
+    продукту не слід змінювати, поки він знаходиться у сховищі.
+    Харчові продукти при додаванні переводяться на годинник сховища, а кожен
+    продукт запам'ятовує сховище, щоб зміни ціни через decrease_cost доходили
+    до слухачів. Інші поля змінюються лише через методи складу.
+    """
+
+    def __init__(self, products=(), clock=None):
+        self._items = {}  # id(продукту) -> продукт, у порядку додавання
+        self._by_name = {}  # назва -> {id(продукту): продукт}
+        self.clock = clock if clock is not None else ExpiryClock()
+        self.extend(products)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, product):
+        return id(product) in self._items
+
+    def append(self, product):
+        key = id(product)
+        if key in self._items:
+            raise ValueError(f"Product '{product.name}' is already in the store.")
+        if isinstance(product, FoodProduct):
+            product.use_clock(self.clock)
+        self._items[key] = product
+        self._by_name.setdefault(product.name, {})[key] = product
+        product._store = self
+        if self._listeners:
+            self._notify_added(product)
+
+    def remove(self, product):
+        key = id(product)
+        if self._items.pop(key, None) is None:
+            raise ValueError(f"Product '{product.name}' is not in the store.")
+        group = self._by_name[product.name]
+        del group[key]
+        if not group:
+            del self._by_name[product.name]
+        product._store = None
+        if self._listeners:
+            self._notify_removed(product)
+
+    def clear(self):
+        for product in self._items.values():
+            product._store = None
+            if self._listeners:
+                self._notify_removed(product)
+        self._items.clear()
+        self._by_name.clear()
+
+    def find(self, name):
+        return list(self._by_name.get(name, {}).values())
+
+    def first(self, name):
+        group = self._by_name.get(name)
+        return next(iter(group.values())) if group else None
+
+    def reorder(self, products):
+        products = list(products)
+        if len(products) != len(self._items) or any(id(product) not in self._items for product in products):
+            raise ValueError("Reordered products must match the stored products.")
+        self._items = {id(product): product for product in products}
+        self._by_name = {}
+        for key, product in self._items.items():
+            self._by_name.setdefault(product.name, {})[key] = product
+
+    def use_clock(self, clock):
+        for product in self._items.values():
+            if isinstance(product, FoodProduct):
+                product.use_clock(clock)
+        self.clock = clock
+
+
+_KIND_PRODUCT, _KIND_FOOD, _KIND_NON_FOOD = 0, 1, 2
+
+
+def _view_cache(views=()):
+    """Словник виданих представлень зі слабкими посиланнями: представлення живе, доки його тримають."""
+    import weakref
+    return weakref.WeakValueDictionary(views)
+
+
+def _string_column(column):
+    """Властивість представлення, що читає рядок зі словника сховища."""
+
+    def getter(self):
+        store = self._store
+        code = getattr(store, column)[self._row]
+        return store._strings[code] if code >= 0 else None
+
+    def setter(self, value):
+        store = self._store
+        getattr(store, column)[self._row] = store._encode(value)
+
+    return property(getter, setter)
+
+
+def _numeric_column(column):
+    """Властивість представлення, що читає і записує значення у масив сховища."""
+
+    def getter(self):
+        return getattr(self._store, column)[self._row]
+
+    def setter(self, value):
+        getattr(self._store, column)[self._row] = value
+
+    return property(getter, setter)
+
+
+class _ColumnarView:
+    """Спільні властивості представлень рядків колонкового сховища."""
+
+    __slots__ = ()
+
+    producer = _string_column('_producers')
+    cost = _numeric_column('_costs')
+    quantity = _numeric_column('_quantities')
+
+    @property
+    def name(self):
+        return self._store._names[self._row]
+
+    @name.setter
+    def name(self, value):
+        self._store._rename(self._row, value)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class ColumnarProduct(_ColumnarView, Product):
+    """Представлення звичайного продукту в колонковому сховищі."""
+
+    __slots__ = ('_row', '__weakref__')  # представлення кешуються через слабкі посилання
+
+
+class ColumnarFoodProduct(_ColumnarView, FoodProduct):
+    """Представлення харчового продукту в колонковому сховищі."""
+
+    __slots__ = ('_row', '__weakref__')  # представлення кешуються через слабкі посилання
+
+    @property
+    def expires_at(self):
+        value = self._store._expiry_dates[self._row]
+        if math.isnan(value):
+            return None
+        value += self._store._expiry_epoch
+        return int(value) if value.is_integer() else value
+
+    @expires_at.setter
+    def expires_at(self, value):
+        self._store._expiry_dates[self._row] = math.nan if value is None else value - self._store._expiry_epoch
+
+    @property
+    def clock(self):
+        return self._store.clock
+
+    @property
+    def marked_down(self):
+        return bool(self._store._marked_down[self._row])
+
+    @marked_down.setter
+    def marked_down(self, value):
+        self._store._marked_down[self._row] = bool(value)
+
+
+class ColumnarNonFoodProduct(_ColumnarView, NonFoodProduct):
+    """Представлення непродовольчого продукту в колонковому сховищі."""
+
+    __slots__ = ('_row', '__weakref__')  # представлення кешуються через слабкі посилання
+
+    purpose = _string_column('_purposes')
+
+    @property
+    def dimensions(self):
+        store, row = self._store, self._row
+        return Dimensions(store._lengths[row], store._widths[row], store._heights[row])
+
+    @dimensions.setter
+    def dimensions(self, value):
+        store, row = self._store, self._row
+        store._lengths[row], store._widths[row], store._heights[row] = Dimensions.parse(value)
+
+    @property
+    def total_size(self):
+        store, row = self._store, self._row
+        return store._lengths[row] + store._widths[row] + store._heights[row]
+
+    @property
+    def volume(self):
+        store, row = self._store, self._row
+        return store._lengths[row] * store._widths[row] * store._heights[row]
+
+    @property
+    def girth(self):
+        return self.dimensions.girth
+
+
+_VIEW_CLASSES = {
+    _KIND_PRODUCT: ColumnarProduct,
+    _KIND_FOOD: ColumnarFoodProduct,
+    _KIND_NON_FOOD: ColumnarNonFoodProduct,
+}
+
+
+class ColumnarProductStore(BaseProductStore):
+    """Колонкове сховище: числові поля у типізованих масивах, рядки у словнику.
+
+    Замість окремого об'єкта на кожен продукт зберігаються масиви вартості,
+    кількості, терміну придатності та розмірів, а виробники та призначення,
+    які часто повторюються, кодуються номерами у спільній таблиці рядків.
+    Назви майже завжди унікальні, тому зберігаються списком без кодування.
+    Назовні сховище видає легкі представлення (ColumnarFoodProduct,
+    ColumnarNonFoodProduct), які читають і змінюють дані прямо в масивах.
+    Продукти, додані до сховища, копіюються, тож додавати слід нові об'єкти,
+    а далі працювати з представленнями, які повертає сховище.
+
+    Сховище, відкрите зі знімка (open_snapshot), читає колонки прямо з
+    відображеної у пам'ять копії файлу; при першій зміні структури (додавання,
+    видалення, сортування) колонки копіюються у звичайні масиви.
+    """
+
+    _COLUMNS = ('_kinds', '_alive', '_names', '_producers', '_purposes',
+                '_costs', '_quantities', '_expiry_dates', '_lengths', '_widths', '_heights', '_marked_down')
+
+    def __init__(self, products=(), clock=None):
+        self._kinds = array('b')
+        self._alive = array('b')  # 0 для видалених рядків до ущільнення
+        self._names = []
+        self._producers = array('i')
+        self._purposes = array('i')  # -1, якщо призначення немає
+        self._costs = array('d')
+        self._quantities = array('q')
+        self._expiry_dates = array('d')  # днів від _expiry_epoch; NaN, якщо терміну придатності немає
+        self.clock = clock if clock is not None else ExpiryClock()
+        self._expiry_epoch = self.clock.today
+        self._lengths = array('d')
+        self._widths = array('d')
+        self._heights = array('d')
+        self._marked_down = array('b')  # 1 для харчових продуктів, уже уцінених за терміном придатності
+        self._strings = []
+        self._string_codes = {}
+        self._by_name = {}  # назва -> рядок або список рядків для однакових назв
+        self._size = 0
+        self._views = _view_cache()  # рядок -> видане представлення
+        self._snapshot = None  # відображений у пам'ять файл знімка
+        self._writable = False  # чи пишуться зміни знімка прямо у файл
+        self._name_scans = 0  # пошуки за назвою без індексу у знімку
+        self.extend(products)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        alive = self._alive
+        for row in range(len(alive)):
+            if alive[row]:
+                yield self._view(row)
+
+    def __contains__(self, product):
+        return (isinstance(product, _ColumnarView) and product._store is self
+                and bool(self._alive[product._row]))
+
+    def _encode(self, value):
+        """Повертає код рядка у таблиці рядків, додаючи його за потреби."""
+        if value is None:
+            return -1
+        self._materialize()
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(value)
+            self._string_codes[value] = code
+        return code
+
+    def _view(self, row):
+        view = self._views.get(row)
+        if view is None:
+            view_class = _VIEW_CLASSES[self._kinds[row]]
+            view = view_class.__new__(view_class)
+            view._store = self
+            view._row = row
+            self._views[row] = view
+        return view
+
+    def _rename(self, row, name):
+        self._materialize()
+        if self._alive[row]:
+            self._unindex(row)
+        self._names[row] = name
+        if self._alive[row]:
+            self._index(row)
+
+    def _index(self, row):
+        # Більшість назв унікальні, тому список створюється лише для дублікатів
+        name = self._names[row]
+        group = self._by_name.get(name)
+        if group is None:
+            self._by_name[name] = row
+        elif isinstance(group, list):
+            group.append(row)
+        else:
+            self._by_name[name] = [group, row]
+
+    def _unindex(self, row):
+        name = self._names[row]
+        group = self._by_name[name]
+        if isinstance(group, list):
+            group.remove(row)
+            if len(group) == 1:
+                self._by_name[name] = group[0]
+        else:
+            del self._by_name[name]
+
+    def _rows_named(self, name):
+        if self._by_name is None:
+            # Кілька перших пошуків у знімку обходяться без індексу: запуск на одну команду його не окупає
+            if self._snapshot is not None and self._name_scans < SNAPSHOT_NAME_SCANS:
+                self._name_scans += 1
+                return self._scan_snapshot_names(name)
+            self._build_name_index()
+        group = self._by_name.get(name)
+        if group is None:
+            return []
+        return sorted(group) if isinstance(group, list) else [group]
+
+    def _scan_snapshot_names(self, name):
+        """Знаходить рядки з назвою перебором колонки кодів знімка у C, без побудови індексу назв."""
+        code = self._strings.code_of(name)
+        if code is None:
+            return []
+        codes = self._names.codes()
+        rows = []
+        row = -1
+        while True:
+            try:
+                row = codes.index(code, row + 1)
+            except ValueError:
+                return rows
+            if self._alive[row]:
+                rows.append(row)
+
+    def flush_snapshot(self):
+        """Записує зміни у файл знімка, відкритого з writable=True, і повертає True.
+
+        Повертає False, якщо колонки вже скопійовано з файлу (додавання,
+        видалення, перейменування) - тоді знімок треба зберегти save_snapshot.
+        """
+        if self._snapshot is None or not self._writable:
+            return False
+        self._snapshot.flush()
+        return True
+
+    def _build_name_index(self):
+        self._by_name = {}
+        for row in range(len(self._names)):
+            if self._alive[row]:
+                self._index(row)
+
+    def _materialize(self):
+        """Копіює колонки знімка з відображеної пам'яті у звичайні масиви."""
+        if self._snapshot is None:
+            return
+        for column in self._COLUMNS:
+            values = getattr(self, column)
+            if isinstance(values, memoryview):
+                setattr(self, column, array(values.format, values.tobytes()))
+        self._names = list(self._names)
+        self._strings = list(self._strings)
+        self._string_codes = {value: code for code, value in enumerate(self._strings)}
+        if self._by_name is None:
+            self._build_name_index()
+        self._snapshot = None
+
+    def append(self, product):
+        if product in self:
+            raise ValueError(f"Product '{product.name}' is already in the store.")
+        self._materialize()
+
+        expiry_date, dimensions, purpose, marked_down = math.nan, (0.0, 0.0, 0.0), -1, False
+        if isinstance(product, FoodProduct):
+            kind = _KIND_FOOD
+            if product.expires_at is not None:
+                expiry_date = product.expiry_date + self.clock.today - self._expiry_epoch
+            marked_down = product.marked_down
+        elif isinstance(product, NonFoodProduct):
+            kind = _KIND_NON_FOOD
+            dimensions = product.dimensions
+            purpose = self._encode(product.purpose)
+        else:
+            kind = _KIND_PRODUCT
+
+        row = len(self._kinds)
+        self._kinds.append(kind)
+        self._alive.append(1)
+        self._names.append(product.name)
+        self._producers.append(self._encode(product.producer))
+        self._purposes.append(purpose)
+        self._costs.append(product.cost)
+        self._quantities.append(product.quantity)
+        self._expiry_dates.append(expiry_date)
+        self._lengths.append(dimensions[0])
+        self._widths.append(dimensions[1])
+        self._heights.append(dimensions[2])
+        self._marked_down.append(marked_down)
+        self._index(row)
+        self._size += 1
+        if self._listeners:
+            self._notify_added(self._view(row))
+
+    def remove(self, product):
+        if product not in self:
+            raise ValueError(f"Product '{product.name}' is not in the store.")
+        self._materialize()
+        row = product._row
+        self._alive[row] = 0
+        self._unindex(row)
+        self._size -= 1
+        if self._listeners:
+            self._notify_removed(product)
+
+        self._detach(product)
+
+        # Ущільнюємо масиви, коли видалені рядки займають більшу частину
+        dead = len(self._alive) - self._size
+        if dead > 1024 and dead > self._size:
+            self._rebuild([row for row in range(len(self._alive)) if self._alive[row]])
+
+    def use_clock(self, clock):
+        # Колонка зберігає дні від _expiry_epoch, тож досить зсунути точку відліку
+        self._expiry_epoch += clock.today - self.clock.today
+        self.clock = clock
+
+    def _detach(self, view):
+        """Переносить представлення в окреме сховище, щоб воно залишалося робочим."""
+        self._views.pop(view._row, None)
+        detached = ColumnarProductStore([view], self.clock)
+        view._store = detached
+        view._row = 0
+        detached._views[0] = view
+
+    def clear(self):
+        if self._listeners:
+            for product in self:
+                self._notify_removed(product)
+        for row, view in list(self._views.items()):
+            if self._alive[row]:
+                self._detach(view)
+        self.__init__(clock=self.clock)
+
+    def find(self, name):
+        return [self._view(row) for row in self._rows_named(name)]
+
+    def reorder(self, products):
+        rows = []
+        for product in products:
+            if product not in self:
+                raise ValueError("Reordered products must match the stored products.")
+            rows.append(product._row)
+        if len(rows) != self._size or len(set(rows)) != self._size:
+            raise ValueError("Reordered products must match the stored products.")
+        self._rebuild(rows)
+
+    # Поля продуктів, які правила переоцінки можуть читати прямо з колонок
+    _RULE_COLUMNS = {'expiry_date': '_expiry_dates', 'cost': '_costs', 'quantity': '_quantities'}
+
+    def _rule_values(self, field):
+        """Повертає значення поля для всіх рядків, якщо його можна отримати з колонок, інакше None."""
+        if field == 'total_size':
+            return array('d', map(sum, zip(self._lengths, self._widths, self._heights)))
+        if field == 'volume':
+            return array('d', (length * width * height
+                               for length, width, height in zip(self._lengths, self._widths, self._heights)))
+        column = self._RULE_COLUMNS.get(field)
+        return None if column is None else getattr(self, column)
+
+    def reprice(self, rules):
+        """Застосовує правила переоцінки колонка за колонкою, без створення представлень."""
+        rows = len(self._kinds)
+        kinds, alive = self._kinds, self._alive
+        factors = array('d', [1.0]) * rows
+        for rule in rules:
+            values = self._rule_values(rule.field)
+            matching_kinds = {kind for kind, view_class in _VIEW_CLASSES.items()
+                              if issubclass(view_class, rule.product_class)}
+            if values is None:
+                # Поле без колонки читаємо через представлення
+                for product in self:
+                    if kinds[product._row] in matching_kinds and rule.test(getattr(product, rule.field)):
+                        factors[product._row] *= rule.factor
+                continue
+            test, factor = rule.test, rule.factor
+            # Термін придатності у колонці відраховується від _expiry_epoch, NaN - терміну немає
+            is_expiry = rule.field == 'expiry_date'
+            expiry_offset = self._expiry_epoch - self.clock.today
+            for row in range(rows):
+                if alive[row] and kinds[row] in matching_kinds:
+                    value = values[row]
+                    if is_expiry:
+                        value = None if value != value else value + expiry_offset
+                    if test(value):
+                        factors[row] *= factor
+
+        costs, quantities = self._costs, self._quantities
+        changed = 0
+        cost_delta = value_delta = 0.0
+        for row in range(rows):
+            factor = factors[row]
+            if factor != 1.0:
+                old_cost = costs[row]
+                costs[row] = old_cost * factor
+                if self._listeners:
+                    self.changed(self._view(row), 'cost', old_cost)
+                changed += 1
+                cost_delta += costs[row] - old_cost
+                value_delta += (costs[row] - old_cost) * quantities[row]
+        return RepricingSummary(self._size, changed, cost_delta, value_delta)
+
+    def _rebuild(self, rows):
+        """Переставляє масиви у порядку rows, відкидаючи решту рядків."""
+        self._materialize()
+        for column in self._COLUMNS:
+            values = getattr(self, column)
+            reordered = [values[row] for row in rows]
+            setattr(self, column, array(values.typecode, reordered) if isinstance(values, array) else reordered)
+
+        # Оновлюємо номери рядків у виданих представленнях та індекс назв
+        views = {}
+        for new_row, old_row in enumerate(rows):
+            view = self._views.get(old_row)
+            if view is not None:
+                view._row = new_row
+                views[new_row] = view
+        self._views = _view_cache(views)
+        self._by_name = {}
+        for row in range(len(rows)):
+            self._index(row)
+
+
+SNAPSHOT_MAGIC = b'WHSNAP\0\0'
+SNAPSHOT_VERSION = 3
+# Заголовок: сигнатура, версія, номер останнього врахованого сегмента журналу операцій,
+# кількість рядків, кількість рядків таблиці рядків, день годинника термінів придатності
+_SNAPSHOT_HEADER = '<8sIIQQq'
+# Версії 1 і 2 не зберігали день годинника
+_SNAPSHOT_HEADER_V2 = '<8sIIQQ'
+# Колонки знімка у порядку запису; назви кодуються через таблицю рядків
+_SNAPSHOT_COLUMNS = (('_kinds', 'b'), ('_names', 'i'), ('_producers', 'i'), ('_purposes', 'i'),
+                     ('_costs', 'd'), ('_quantities', 'q'), ('_expiry_dates', 'd'),
+                     ('_lengths', 'd'), ('_widths', 'd'), ('_heights', 'd'), ('_marked_down', 'b'))
+# Версія 2 не мала позначок уцінки, а версія 1 зберігала замість трьох розмірів одне число
+_SNAPSHOT_COLUMNS_V2 = _SNAPSHOT_COLUMNS[:-1]
+_SNAPSHOT_COLUMNS_V1 = _SNAPSHOT_COLUMNS[:7] + (('_lengths', 'd'),)
+
+
+def _padding(size):
+    """Кількість байтів, що вирівнює розділ знімка до 8 байтів."""
+    return -size % 8
+
+
+class _SnapshotStrings:
+    """Таблиця рядків знімка, що декодує рядки з відображеної пам'яті на вимогу."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._bytes = None  # копія рядків для пошуку, створюється при першому code_of
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, code):
+        return str(self._blob[self._offsets[code]:self._offsets[code + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[code] for code in range(len(self)))
+
+    def code_of(self, value):
+        """Повертає код рядка value або None, шукаючи його байти в таблиці без декодування всіх рядків."""
+        data = value.encode('utf-8')
+        if self._bytes is None:
+            self._bytes = bytes(self._blob)
+        blob = self._bytes
+        position = blob.find(data)
+        while position >= 0:
+            # Збіг має займати рівно один рядок таблиці, а не бути частиною іншого
+            code = bisect_left(self._offsets, position)
+            if code < len(self) and self._offsets[code] == position and self._offsets[code + 1] == position + len(data):
+                return code
+            position = blob.find(data, position + 1)
+        return None
+
+
+class _SnapshotNames:
+    """Колонка назв знімка: коди назв, що декодуються через таблицю рядків."""
+
+    def __init__(self, codes, strings):
+        self._codes = codes
+        self._strings = strings
+        self._array = None
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, row):
+        return self._strings[self._codes[row]]
+
+    def codes(self):
+        """Повертає коди назв масивом, у якому можна шукати методом index."""
+        if self._array is None:
+            self._array = array(self._codes.format, self._codes.tobytes())
+        return self._array
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+def save_snapshot(store, path, log_position=0):
+    """Записує сховище у бінарний знімок: колонки фіксованої ширини та таблиця рядків.
+
+    log_position - номер останнього сегмента журналу операцій, врахованого у
+    знімку. Файл спочатку пишеться поруч і лише потім замінює попередній знімок.
+    """
+    if not isinstance(store, ColumnarProductStore):
+        store = ColumnarProductStore(store, getattr(store, 'clock', None))
+    elif len(store._alive) != len(store):
+        store._rebuild([row for row in range(len(store._alive)) if store._alive[row]])
+
+    strings = list(store._strings)
+    codes = {value: code for code, value in enumerate(strings)}
+    name_codes = array('i')
+    for name in store._names:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(strings)
+            strings.append(name)
+        name_codes.append(code)
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = array('q', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    import struct
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(struct.pack(_SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, log_position, len(store),
+                               len(strings), store.clock.today))
+        for column, typecode in _SNAPSHOT_COLUMNS:
+            values = name_codes if column == '_names' else getattr(store, column)
+            if column == '_expiry_dates' and store._expiry_epoch != store.clock.today:
+                # У знімку зберігається залишок днів, тож він не залежить від годинника
+                offset = store._expiry_epoch - store.clock.today
+                values = array('d', (value + offset for value in values))
+            data = values.tobytes()
+            file.write(data + bytes(_padding(len(data))))
+        file.write(offsets.tobytes())
+        file.write(b''.join(encoded))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def open_snapshot(path, writable=False):
+    """Відкриває бінарний знімок як колонкове сховище без розбору даних.
+
+    Файл відображається у пам'ять у режимі копіювання при записі, тож
+    сторінки читаються лише при зверненні, а зміни не потрапляють у файл.
+    З writable зміни числових полів (кількості, вартості) пишуться прямо у
+    відображений файл і зберігаються flush_snapshot без перезапису знімка.
+    """
+    import mmap
+    import struct
+
+    with open(path, 'r+b' if writable else 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY)
+    if len(mapped) < struct.calcsize(_SNAPSHOT_HEADER_V2):
+        raise ValueError(f"'{path}' is not a warehouse snapshot.")
+    magic, version, log_position, rows, string_count = struct.unpack_from(_SNAPSHOT_HEADER_V2, mapped)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"'{path}' is not a warehouse snapshot.")
+    if version not in (1, 2, SNAPSHOT_VERSION):
+        raise ValueError(f"Unsupported snapshot version {version}.")
+    header, today = _SNAPSHOT_HEADER_V2, 0
+    if version == SNAPSHOT_VERSION:
+        header = _SNAPSHOT_HEADER
+        today = struct.unpack_from(header, mapped)[-1]
+
+    buffer = memoryview(mapped)
+    offset = struct.calcsize(header)
+    columns = {}
+    for column, typecode in {1: _SNAPSHOT_COLUMNS_V1, 2: _SNAPSHOT_COLUMNS_V2}.get(version, _SNAPSHOT_COLUMNS):
+        size = rows * struct.calcsize(typecode)
+        columns[column] = buffer[offset:offset + size].cast(typecode)
+        offset += size + _padding(size)
+    offsets = buffer[offset:offset + (string_count + 1) * 8].cast('q')
+    offset += (string_count + 1) * 8
+    strings = _SnapshotStrings(offsets, buffer[offset:offset + offsets[-1]])
+
+    if version == 1:
+        # Число зі знімка версії 1 стає довжиною, як у Dimensions.parse
+        columns['_widths'] = array('d', bytes(8 * rows))
+        columns['_heights'] = array('d', bytes(8 * rows))
+    if version < SNAPSHOT_VERSION:
+        columns['_marked_down'] = array('b', bytes(rows))
+
+    # Залишок днів у знімку відраховується від дня годинника, збереженого в заголовку
+    store = ColumnarProductStore(clock=ExpiryClock(today))
+    for column, values in columns.items():
+        setattr(store, column, values)
+    store._names = _SnapshotNames(columns['_names'], strings)
+    store._alive = array('b', [1]) * rows
+    store._strings = strings
+    store._string_codes = None
+    store._by_name = None  # індекс назв будується при першому пошуку
+    store._size = rows
+    store._snapshot = mapped
+    store._writable = writable
+    store.log_position = log_position
+    return store
+
+
+# Схема сховища SQLite: position задає порядок продуктів, expires_at - абсолютний
+# день за годинником сховища з числовою спорідненістю, тож цілі дні повертаються
+# як int; поточний день годинника зберігається в meta, щоб терміни не
+# відновлювалися після повторного відкриття бази
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    cost REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    producer TEXT,
+    expires_at NUMERIC,
+    length REAL NOT NULL DEFAULT 0,
+    width REAL NOT NULL DEFAULT 0,
+    height REAL NOT NULL DEFAULT 0,
+    purpose TEXT,
+    marked_down INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS products_position ON products (position);
+CREATE INDEX IF NOT EXISTS products_name ON products (name, position);
+CREATE INDEX IF NOT EXISTS products_producer ON products (producer);
+CREATE INDEX IF NOT EXISTS products_expires_at ON products (expires_at);
+"""
+_SQLITE_FIELDS = ('id', 'position', 'kind', 'name', 'cost', 'quantity', 'producer', 'expires_at',
+                  'length', 'width', 'height', 'purpose', 'marked_down')
+_SQLITE_INSERT = f"INSERT INTO products ({', '.join(_SQLITE_FIELDS)}) VALUES ({', '.join('?' * len(_SQLITE_FIELDS))})"
+# Запити для читання та зміни одного поля; sqlite3 кешує їх як підготовлені вирази
+_SQLITE_SELECT = {column: f"SELECT {column} FROM products WHERE id = ?" for column in _SQLITE_FIELDS}
+_SQLITE_UPDATE = {column: f"UPDATE products SET {column} = ? WHERE id = ?" for column in _SQLITE_FIELDS}
+_KIND_CATEGORIES = {_KIND_PRODUCT: 'product', _KIND_FOOD: 'food', _KIND_NON_FOOD: 'non_food'}
+
+
+def _sql_column(column):
+    """Властивість представлення, що читає і записує поле рядка таблиці products."""
+
+    def getter(self):
+        return self._store._connection.execute(_SQLITE_SELECT[column], (self._row,)).fetchone()[0]
+
+    def setter(self, value):
+        self._store._connection.execute(_SQLITE_UPDATE[column], (value, self._row))
+
+    return property(getter, setter)
+
+
+class _SQLiteView:
+    """Спільні властивості представлень рядків сховища SQLite."""
+
+    __slots__ = ()
+
+    name = _sql_column('name')
+    cost = _sql_column('cost')
+    quantity = _sql_column('quantity')
+    producer = _sql_column('producer')
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class SQLiteProduct(_SQLiteView, Product):
+    """Представлення звичайного продукту у сховищі SQLite."""
+
+    __slots__ = ('_row', '__weakref__')
+
+
+class SQLiteFoodProduct(_SQLiteView, FoodProduct):
+    """Представлення харчового продукту у сховищі SQLite."""
+
+    __slots__ = ('_row', '__weakref__')
+
+    expires_at = _sql_column('expires_at')
+
+    @property
+    def clock(self):
+        return self._store.clock
+
+    @property
+    def marked_down(self):
+        return bool(self._store._connection.execute(_SQLITE_SELECT['marked_down'], (self._row,)).fetchone()[0])
+
+    @marked_down.setter
+    def marked_down(self, value):
+        self._store._connection.execute(_SQLITE_UPDATE['marked_down'], (bool(value), self._row))
+
+
+class SQLiteNonFoodProduct(_SQLiteView, NonFoodProduct):
+    """Представлення непродовольчого продукту у сховищі SQLite."""
+
+    __slots__ = ('_row', '__weakref__')
+
+    purpose = _sql_column('purpose')
+
+    @property
+    def dimensions(self):
+        return Dimensions(*self._store._connection.execute(
+            "SELECT length, width, height FROM products WHERE id = ?", (self._row,)).fetchone())
+
+    @dimensions.setter
+    def dimensions(self, value):
+        self._store._connection.execute("UPDATE products SET length = ?, width = ?, height = ? WHERE id = ?",
+                                        (*Dimensions.parse(value), self._row))
+
+    @property
+    def total_size(self):
+        return self.dimensions.total_size
+
+    @property
+    def volume(self):
+        return self.dimensions.volume
+
+    @property
+    def girth(self):
+        return self.dimensions.girth
+
+
+_SQLITE_VIEW_CLASSES = {
+    _KIND_PRODUCT: SQLiteProduct,
+    _KIND_FOOD: SQLiteFoodProduct,
+    _KIND_NON_FOOD: SQLiteNonFoodProduct,
+}
+
+
+class SQLiteProductStore(BaseProductStore):
+    """Сховище продуктів у локальній базі SQLite з індексами за назвою, виробником і терміном придатності.
+
+    Як і ColumnarProductStore, сховище повертає представлення (SQLiteFoodProduct,
+    SQLiteNonFoodProduct), кожне поле яких читається і змінюється окремим
+    підготовленим запитом, тож обсяг складу обмежений диском, а не пам'яттю.
+    Пакетне завантаження (extend) вставляє рядки через executemany в одній
+    транзакції, а впорядковані вибірки та підсумки виконуються запитами SQL
+    (див. native_index). path=':memory:' створює базу в пам'яті.
+    """
+
+    LOAD_BATCH_SIZE = 10_000  # Рядків в одному executemany
+
+    def __init__(self, products=(), path=':memory:', clock=None):
+        import sqlite3  # Модуль потрібен лише цьому сховищу, тож не сповільнює запуск програми
+        # Кожна зміна - окрема транзакція; пакетні операції відкривають транзакцію явно
+        self._connection = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+        if path != ':memory:':
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(_SQLITE_SCHEMA)
+        if 'marked_down' not in {column for _, column, *_ in self._connection.execute("PRAGMA table_info(products)")}:
+            # Бази, створені до появи позначки уцінки
+            self._connection.execute("ALTER TABLE products ADD COLUMN marked_down INTEGER NOT NULL DEFAULT 0")
+        last_id, = self._connection.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()
+        self._next_id = last_id + 1  # id і початкова позиція нових продуктів
+        self._views = _view_cache()  # id рядка -> видане представлення
+        self.path = path
+        self.clock = ExpiryClock()
+        today = self._connection.execute("SELECT value FROM meta WHERE key = 'today'").fetchone()
+        if today is not None:
+            self.clock.today = today[0]
+        if clock is not None:
+            self.use_clock(clock)
+        self.extend(products)
+
+    def close(self):
+        """Закриває з'єднання з базою."""
+        self._connection.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def __iter__(self):
+        for row, kind in self._connection.execute("SELECT id, kind FROM products ORDER BY position").fetchall():
+            yield self._view(row, kind)
+
+    def __contains__(self, product):
+        return (isinstance(product, _SQLiteView) and product._store is self and self._connection.execute(
+            "SELECT 1 FROM products WHERE id = ?", (product._row,)).fetchone() is not None)
+
+    def _view(self, row, kind):
+        view = self._views.get(row)
+        if view is None:
+            view_class = _SQLITE_VIEW_CLASSES[kind]
+            view = view_class.__new__(view_class)
+            view._store = self
+            view._row = row
+            self._views[row] = view
+        return view
+
+    def transaction(self):
+        """Контекстний менеджер, що об'єднує зміни в одну транзакцію."""
+        return _SQLiteTransaction(self._connection)
+
+    def _row_values(self, product):
+        row = self._next_id
+        self._next_id += 1
+        expires_at, dimensions, purpose, marked_down = None, (0.0, 0.0, 0.0), None, False
+        if isinstance(product, FoodProduct):
+            kind = _KIND_FOOD
+            if product.expires_at is not None:
+                expires_at = product.expiry_date + self.clock.today
+            marked_down = product.marked_down
+        elif isinstance(product, NonFoodProduct):
+            kind = _KIND_NON_FOOD
+            dimensions = product.dimensions
+            purpose = product.purpose
+        else:
+            kind = _KIND_PRODUCT
+        return (row, row, kind, product.name, product.cost, product.quantity, product.producer, expires_at,
+                *dimensions, purpose, marked_down)
+
+    def append(self, product):
+        if product in self:
+            raise ValueError(f"Product '{product.name}' is already in the store.")
+        values = self._row_values(product)
+        self._connection.execute(_SQLITE_INSERT, values)
+        if self._listeners:
+            self._notify_added(self._view(values[0], values[2]))
+
+    def extend(self, products):
+        """Додає продукти пакетами executemany в одній транзакції."""
+        if self._listeners:
+            # Слухачам потрібні представлення кожного доданого продукту
+            with self.transaction():
+                super().extend(products)
+            return
+        with self.transaction():
+            rows = []
+            for product in products:
+                rows.append(self._row_values(product))
+                if len(rows) >= self.LOAD_BATCH_SIZE:
+                    self._connection.executemany(_SQLITE_INSERT, rows)
+                    rows.clear()
+            self._connection.executemany(_SQLITE_INSERT, rows)
+
+    def remove(self, product):
+        if product not in self:
+            raise ValueError(f"Product '{product.name}' is not in the store.")
+        if self._listeners:
+            self._notify_removed(product)
+        self._detach(product)
+
+    def _detach(self, view):
+        """Переносить рядок представлення в окрему базу в пам'яті, щоб воно залишалося робочим."""
+        values = self._connection.execute(f"SELECT {', '.join(_SQLITE_FIELDS)} FROM products WHERE id = ?",
+                                          (view._row,)).fetchone()
+        self._connection.execute("DELETE FROM products WHERE id = ?", (view._row,))
+        self._views.pop(view._row, None)
+        detached = SQLiteProductStore(clock=self.clock)
+        detached._connection.execute(_SQLITE_INSERT, values)
+        detached._views[view._row] = view
+        view._store = detached
+
+    def clear(self):
+        if self._listeners:
+            for product in self:
+                self._notify_removed(product)
+        with self.transaction():
+            for view in list(self._views.values()):
+                self._detach(view)
+            self._connection.execute("DELETE FROM products")
+
+    def find(self, name):
+        return [self._view(row, kind) for row, kind in self._connection.execute(
+            "SELECT id, kind FROM products WHERE name = ? ORDER BY position", (name,))]
+
+    def first(self, name):
+        found = self._connection.execute("SELECT id, kind FROM products WHERE name = ? ORDER BY position LIMIT 1",
+                                         (name,)).fetchone()
+        return None if found is None else self._view(*found)
+
+    def reorder(self, products):
+        rows = []
+        for product in products:
+            if not isinstance(product, _SQLiteView) or product._store is not self:
+                raise ValueError("Reordered products must match the stored products.")
+            rows.append(product._row)
+        if len(rows) != len(self) or len(set(rows)) != len(rows):
+            raise ValueError("Reordered products must match the stored products.")
+        with self.transaction():
+            self._connection.executemany("UPDATE products SET position = ? WHERE id = ?",
+                                         ((position, row) for position, row in enumerate(rows)))
+
+    def use_clock(self, clock):
+        with self.transaction():
+            if clock.today != self.clock.today:
+                self._connection.execute(
+                    "UPDATE products SET expires_at = expires_at + ? WHERE expires_at IS NOT NULL",
+                    (clock.today - self.clock.today,))
+            self.clock = clock
+            self.clock_advanced()
+
+    def clock_advanced(self):
+        self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('today', ?)", (self.clock.today,))
+
+    def reprice(self, rules):
+        """Застосовує правила переоцінки за один прохід таблицею і записує зміни одним executemany."""
+        checked = 0
+        changes = []  # (нова вартість, id, вид, стара вартість)
+        value_delta = 0.0
+        for row, kind, cost, quantity, expires_at, length, width, height in self._connection.execute(
+                "SELECT id, kind, cost, quantity, expires_at, length, width, height FROM products").fetchall():
+            checked += 1
+            view_class = _SQLITE_VIEW_CLASSES[kind]
+            dimensions = Dimensions(length, width, height)
+            fields = {'cost': cost, 'quantity': quantity, 'dimensions': dimensions,
+                      'expiry_date': None if expires_at is None else expires_at - self.clock.today,
+                      'total_size': dimensions.total_size, 'volume': dimensions.volume}
+            factor = 1.0
+            for rule in rules:
+                if not issubclass(view_class, rule.product_class):
+                    continue
+                value = fields[rule.field] if rule.field in fields else getattr(self._view(row, kind), rule.field)
+                try:
+                    if rule.test(value):
+                        factor *= rule.factor
+                except ValueError as e:
+                    logging.error(f"Помилка при зміні ціни товару {self._view(row, kind).name}: {e}")
+            if factor != 1.0:
+                changes.append((cost * factor, row, kind, cost))
+                value_delta += (cost * factor - cost) * quantity
+        with self.transaction():
+            self._connection.executemany("UPDATE products SET cost = ? WHERE id = ?",
+                                         ((cost, row) for cost, row, _, _ in changes))
+        if self._listeners:
+            for _, row, kind, old_cost in changes:
+                self.changed(self._view(row, kind), 'cost', old_cost)
+        return RepricingSummary(checked, len(changes), sum(new - old for new, _, _, old in changes), value_delta)
+
+    def native_index(self, key):
+        if key == 'rollups':
+            return _SQLiteRollups(self)
+        if isinstance(key, tuple) and key[0] == 'sorted' and key[1] in _SQLiteSortedIndex.EXPRESSIONS:
+            return _SQLiteSortedIndex(self, key[1])
+        return None
+
+
+class _SQLiteTransaction:
+    """Транзакція SQLite; вкладені транзакції стають частиною зовнішньої."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._outer = False
+
+    def __enter__(self):
+        if not self._connection.in_transaction:
+            self._connection.execute("BEGIN")
+            self._outer = True
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._outer:
+            self._connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+class _SQLiteSortedIndex:
+    """Відсортований індекс сховища SQLite з інтерфейсом SortedProductIndex, що виконується запитами."""
+
+    # Поле індексу -> вираз SQL і умова для рядків, що мають це поле
+    EXPRESSIONS = {
+        'quantity': ('quantity', 'TRUE'),
+        'cost': ('cost', 'TRUE'),
+        'expiry_date': ('expires_at', f'kind = {_KIND_FOOD} AND expires_at IS NOT NULL'),
+        'volume': ('length * width * height', f'kind = {_KIND_NON_FOOD}'),
+        'girth': ('2 * (length + width + height - max(length, width, height))', f'kind = {_KIND_NON_FOOD}'),
+    }
+
+    def __init__(self, store, field):
+        self._store = store
+        self.field = field
+        self._expression, self._condition = self.EXPRESSIONS[field]
+
+    def __len__(self):
+        return self._store._connection.execute(f"SELECT COUNT(*) FROM products WHERE {self._condition}").fetchone()[0]
+
+    def __iter__(self):
+        return self.range()
+
+    def _select(self, lower=None, upper=None, include_lower=True, include_upper=True, reverse=False, limit=-1):
+        conditions, parameters = [self._condition], []
+        if lower is not None:
+            conditions.append(f"{self._expression} {'>=' if include_lower else '>'} ?")
+            parameters.append(lower)
+        if upper is not None:
+            conditions.append(f"{self._expression} {'<=' if include_upper else '<'} ?")
+            parameters.append(upper)
+        order = 'DESC' if reverse else 'ASC'
+        # Однакові значення впорядковуються за позицією у сховищі, як номери додавання у SortedProductIndex
+        rows = self._store._connection.execute(
+            f"SELECT id, kind FROM products WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {self._expression} {order}, position {order} LIMIT ?", (*parameters, limit)).fetchall()
+        return [self._store._view(row, kind) for row, kind in rows]
+
+    def range(self, lower=None, upper=None, include_lower=True, include_upper=True, reverse=False):
+        """Перебирає продукти зі значенням поля між lower та upper."""
+        return iter(self._select(lower, upper, include_lower, include_upper, reverse))
+
+    def smallest(self, k):
+        """Повертає k продуктів з найменшим значенням поля."""
+        return self._select(limit=k)
+
+    def largest(self, k):
+        """Повертає k продуктів з найбільшим значенням поля."""
+        return self._select(reverse=True, limit=k)
+
+
+class _SQLiteRollups:
+    """Підсумки запасів сховища SQLite з інтерфейсом Rollups, що рахуються агрегатними запитами з індексами."""
+
+    COLUMNS = {'name': 'name', 'producer': 'producer', 'purpose': 'purpose', 'category': 'kind'}
+    _AGGREGATES = ("COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(cost * quantity), 0.0), "
+                   "COALESCE(SUM(length * width * height * quantity), 0.0)")
+
+    def __init__(self, store):
+        self._store = store
+        self.dimensions = self.COLUMNS
+
+    def totals(self, dimension, key):
+        from indexes import RollupTotals
+        column = self.COLUMNS[dimension]
+        if dimension == 'category':
+            key = {category: kind for kind, category in _KIND_CATEGORIES.items()}.get(key)
+        return RollupTotals(*self._store._connection.execute(
+            f"SELECT {self._AGGREGATES} FROM products WHERE {column} = ?", (key,)).fetchone())
+
+    def _query_groups(self, dimension):
+        column = self.COLUMNS[dimension]
+        rows = self._store._connection.execute(
+            f"SELECT {column}, {self._AGGREGATES} FROM products WHERE {column} IS NOT NULL GROUP BY {column}")
+        return {(_KIND_CATEGORIES[key] if dimension == 'category' else key): list(totals) for key, *totals in rows}
+
+    def is_built(self, dimension):
+        # Запити SQL не потребують побудови
+        return True
+
+    # Rollups.compare порівнює групи кожного виміру
+    _dimension = _query_groups
+
+    def groups(self, dimension):
+        from indexes import RollupTotals
+        return {key: RollupTotals(*totals) for key, totals in self._query_groups(dimension).items()}
+
+    def compare(self, other, rel_tol=1e-9):
+        from indexes import Rollups
+        return Rollups.compare(self, other, rel_tol)
+
+
+# Коди операцій журналу
+OP_ADD, OP_REMOVE, OP_UPDATE, OP_ADJUST, OP_SORT, OP_TAKE_FEFO, OP_TICK = 1, 2, 3, 4, 5, 6, 7
+
+# Файл знімка у каталозі журналу операцій
+LOG_SNAPSHOT_NAME = 'snapshot.bin'
+
+
+def product_to_fields(product):
+    """Перетворює продукт на поля запису журналу операцій."""
+    if isinstance(product, FoodProduct):
+        return ('food', product.name, product.cost, product.quantity, product.producer, product.expiry_date)
+    if isinstance(product, NonFoodProduct):
+        return ('non_food', product.name, product.cost, product.quantity, product.producer,
+                product.dimensions.encode(), product.purpose)
+    return ('product', product.name, product.cost, product.quantity, product.producer)
+
+
+def product_category(product):
+    """Повертає категорію продукту: 'food', 'non_food' або 'product'."""
+    if isinstance(product, FoodProduct):
+        return 'food'
+    if isinstance(product, NonFoodProduct):
+        return 'non_food'
+    return 'product'
+
+
+def product_from_fields(fields):
+    """Створює продукт з полів запису журналу операцій."""
+    kind, *values = fields
+    if kind == 'food':
+        return FoodProduct(*values)
+    if kind == 'non_food':
+        return NonFoodProduct(*values)
+    return Product(*values)
+
+
+REPORT_FORMATS = ("table", "csv", "jsonl")
+REPORT_PAGE_SIZE = 1000  # Кількість рядків в одній сторінці звіту
+# Колонки звітів: заголовок, поле продукту
+FOOD_REPORT_COLUMNS = (("Name", "name"), ("Cost ($)", "cost"), ("Quantity", "quantity"), ("Producer", "producer"),
+                       ("Expiry Date", "expiry_date"))
+NON_FOOD_REPORT_COLUMNS = (("Name", "name"), ("Cost ($)", "cost"), ("Quantity", "quantity"), ("Producer", "producer"),
+                           ("Dimensions (cm)", "dimensions"), ("Purpose", "purpose"))
+
+
+def render_products(products, columns, writer, fmt="table", offset=0, limit=None, page_size=REPORT_PAGE_SIZE):
+    """Потоково виводить продукти у writer (будь-який об'єкт з методом write) і повертає кількість рядків.
+
+    Продукти читаються сторінками по page_size, тож у пам'яті одночасно
+    лише одна сторінка, а перші рядки з'являються одразу. У форматі 'table'
+    кожна сторінка - окрема таблиця; 'csv' та 'jsonl' пишуть рядок за рядком.
+    Після кожної сторінки writer скидається, якщо має метод flush.
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}'. Use one of: {', '.join(REPORT_FORMATS)}.")
+    headers = [header for header, _ in columns]
+    fields = [field for _, field in columns]
+    rows = islice(products, offset, None if limit is None else offset + limit)
+    if fmt == "csv":
+        import csv
+        csv_writer = csv.writer(writer, lineterminator='\n')
+        csv_writer.writerow(headers)
+
+    written = 0
+    while True:
+        page = [[getattr(product, field, None) for field in fields] for product in islice(rows, page_size)]
+        if fmt == "table":
+            from tabulate import tabulate  # Імпорт відкладено до першої таблиці заради швидкого запуску
+            # Порожня таблиця виводиться лише із заголовком, як раніше
+            if page or not written:
+                writer.write(("\n" if written else "") + tabulate(page, headers=headers) + "\n")
+        elif fmt == "csv":
+            csv_writer.writerows(page)
+        else:
+            import json
+            for row in page:
+                writer.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+        written += len(page)
+        if hasattr(writer, 'flush'):
+            writer.flush()
+        if len(page) < page_size:
+            return written
+
+
+# Обмеження значень полів продукту
+INVALID_NAME_CHARS = "#@!"
+COST_RANGE = (0, 2_000_000)
+QUANTITY_RANGE = (0, 50_000)
+EXPIRY_RANGE = (0, None)
+DIMENSIONS_RANGE = (0, 1000)
+SORT_ORDERS = ("asc", "desc")
+
+# Схеми полів продуктів, спільні для введення користувача, рядків файлу і програмного інтерфейсу
+NAME_FIELD = Field('name', str, invalid_chars=INVALID_NAME_CHARS, invalid_msg="Invalid product name. Product name must be text.",
+                   chars_msg="Invalid product name. Product name must contain letters and must not include #, @, or !, and cannot consist solely of numbers.")
+COST_FIELD = Field('cost', float, COST_RANGE, invalid_msg="Invalid cost. Cost must be a number.",
+                   range_msg="Invalid cost. Cost must be between 0 and 2,000,000.")
+QUANTITY_FIELD = Field('quantity', int, QUANTITY_RANGE, invalid_msg="Invalid quantity. Quantity must be a whole number.",
+                       range_msg="Invalid quantity. Quantity must be between 0 and 50,000.")
+PRODUCER_FIELD = Field('producer', str, invalid_chars=INVALID_NAME_CHARS, invalid_msg="Invalid producer name. Producer name must be text.",
+                       chars_msg="Invalid producer name. Producer name must contain letters and must not include #, @, or !, and cannot consist solely of numbers.")
+EXPIRY_FIELD = Field('expiry_date', int, EXPIRY_RANGE,
+                     invalid_msg="Invalid expiry date. Expiry date must be a positive integer.",
+                     range_msg="Invalid expiry date. Expiry date must be a positive integer.")
+DIMENSIONS_FIELD = Field('dimensions', Dimensions.parse, DIMENSIONS_RANGE,
+                         invalid_msg="Invalid dimensions. Use LxWxH, for example 40x30x20.",
+                         range_msg="Invalid dimensions. Dimensions must be between 0 and 1000.")
+QUANTITY_CHANGE_FIELD = Field('quantity', int, invalid_msg="Invalid quantity change. Quantity change must be a whole number.")
+PURPOSE_FIELD = Field('purpose', str,
+                      invalid_msg="Invalid purpose. Purpose must start with a letter and must not consist solely of numbers.")
+PRODUCT_SCHEMA = Schema([NAME_FIELD, COST_FIELD, QUANTITY_FIELD, PRODUCER_FIELD], Product)
+FOOD_SCHEMA = Schema([NAME_FIELD, COST_FIELD, QUANTITY_FIELD, PRODUCER_FIELD, EXPIRY_FIELD], FoodProduct)
+NON_FOOD_SCHEMA = Schema([NAME_FIELD, COST_FIELD, QUANTITY_FIELD, PRODUCER_FIELD, DIMENSIONS_FIELD, PURPOSE_FIELD],
+                         NonFoodProduct)
+CATEGORY_SCHEMAS = {'food': FOOD_SCHEMA, 'non_food': NON_FOOD_SCHEMA, 'product': PRODUCT_SCHEMA}
+LINE_SCHEMAS = {len(FOOD_SCHEMA): FOOD_SCHEMA, len(NON_FOOD_SCHEMA): NON_FOOD_SCHEMA}  # кількість полів рядка -> схема
+SORTED_FIELDS = ("quantity", "cost", "expiry_date", "volume", "girth")  # Поля з відсортованими індексами
+# Виміри поточних підсумків запасів: вимір -> функція, що повертає групу продукту
+ROLLUP_DIMENSIONS = {
+    "name": lambda product: product.name,
+    "producer": lambda product: product.producer,
+    "purpose": lambda product: getattr(product, 'purpose', None),
+    "category": product_category,
+}
+
+
+class WarehouseError(Exception):
+    """Базова помилка операцій складу."""
+
+
+class ProductNotFoundError(WarehouseError, LookupError):
+    """Продукт з вказаною назвою відсутній на складі."""
+
+    def __init__(self, name):
+        super().__init__(f"Product '{name}' not found in warehouse.")
+        self.name = name
+
+    def __reduce__(self):
+        # Помилка передається між процесами (див. sharding), тож відновлюється з назви, а не з повідомлення
+        return type(self), (self.name,)
+
+
+class ValidationError(WarehouseError, ValueError):
+    """Невірне значення аргументу операції складу."""
+
+
+class InvalidQuantityError(ValidationError):
+    """Кількість виходить за допустимі межі."""
+
+
+class BatchError(ValidationError):
+    """Пакет відхилено; errors містить (номер, назва, повідомлення) для рухів запасів або RowError для рядків продуктів."""
+
+    def __init__(self, errors, items="movement(s)"):
+        super().__init__(f"Batch rejected: {len(errors)} invalid {items}.")
+        self.errors = errors
+        self.items = items
+
+    def __reduce__(self):
+        return type(self), (self.errors, self.items)
+
+
+def _field_error(error):
+    """Перетворює FieldError на помилку складу: InvalidQuantityError для кількості, інакше ValidationError."""
+    return (InvalidQuantityError if error.field == 'quantity' else ValidationError)(str(error))
+
+
+def check_field(field, value):
+    """Перетворює і перевіряє значення поля схемою; піднімає ValidationError або InvalidQuantityError."""
+    try:
+        return compile_field(field)(value)
+    except FieldError as e:
+        raise _field_error(e) from None
+
+
+def _schema_values(product):
+    """Повертає схему категорії продукту і поточні значення її полів у продукті."""
+    schema = CATEGORY_SCHEMAS[product_category(product)]
+    return schema, [getattr(product, field.name) for field in schema.fields]
+
+
+def validate_product(product):
+    """Перевіряє поля продукту схемою його категорії і записує в продукт перетворені значення.
+
+    Наприклад, вартість '5' стає 5.0, тож далі продукт містить лише числа
+    потрібних типів. Піднімає ValidationError або InvalidQuantityError.
+    """
+    schema, values = _schema_values(product)
+    try:
+        converted = schema.validate(values)
+    except FieldError as e:
+        raise _field_error(e) from None
+    for field, value, original in zip(schema.fields, converted, values):
+        if value is not original:
+            setattr(product, field.name, value)
+
 
 class Warehouse:
    """Клас для управління складом та продуктами."""
 
 
-   def __init__(self):
-       self.products = []
+   def __init__(self, store=None):
+       # За замовчуванням продукти зберігаються як об'єкти у ProductStore;
+       # склад веде терміни придатності за годинником свого сховища
+       store = store if store is not None else ProductStore()
+       self.clock = getattr(store, 'clock', None) or ExpiryClock()
+       self.products = store
+       self._oplog = None
+       self._compaction = None
 
 
-   def show_product_groups(self):
-       """Відображає групи харчових та непродовольчих продуктів на складі."""
-       # Розподіл продуктів за категоріями
-       food_products = [product for product in self.products if isinstance(product, FoodProduct)]
-       non_food_products = [product for product in self.products if isinstance(product, NonFoodProduct)]
+   @property
+   def products(self):
+       """Сховище продуктів складу."""
+       return self._products
+
+
+   @products.setter
+   def products(self, products):
+       # Вторинні індекси старого сховища відписуються і будуються заново при першому зверненні
+       for index in getattr(self, '_indexes', {}).values():
+           self._products.unsubscribe(index)
+       self._indexes = {}
+
+
+       # Будь-яку послідовність продуктів загортаємо у сховище з індексом
+       if not isinstance(products, BaseProductStore):
+           products = ProductStore(products, self.clock)
+       elif products.clock is not self.clock:
+           products.use_clock(self.clock)
+       self._products = products
+
+
+   def _secondary_index(self, key, factory):
+       """Повертає вторинний індекс, будуючи і підписуючи його на сховище при першому зверненні.
+
+       Якщо сховище має власну заміну індексу (BaseProductStore.native_index), використовується вона.
+       """
+       index = self._indexes.get(key)
+       if index is None:
+           index = self.products.native_index(key)
+           if index is None:
+               index = factory(self.products)
+               self.products.subscribe(index)
+           self._indexes[key] = index
+       return index
+
+
+   def drop_indexes(self, *keys):
+       """Відписує і видаляє вторинні індекси keys (усі, якщо keys не задано), наприклад 'rollups'.
+
+       Індекси будуються заново при першому зверненні, тож так можна виміряти
+       чи примусово повторити їх побудову.
+       """
+       for key in keys or list(self._indexes):
+           index = self._indexes.pop(key, None)
+           if index is not None:
+               self.products.unsubscribe(index)
+
+
+   def _set_field(self, product, field, value):
+       """Змінює поле продукту і повідомляє вторинні індекси."""
+       old_value = getattr(product, field)
+       setattr(product, field, value)
+       self.products.changed(product, field, old_value)
+
+
+   # Програмний інтерфейс складу: методи без введення/виведення, що
+   # повертають результат або піднімають WarehouseError
 
 
+   def add(self, product):
+       """Додає продукт до складу і повертає його."""
+       validate_product(product)
+       self.products.append(product)
+       self._record(OP_ADD, *product_to_fields(product))
+       return product
+
+
+   def find(self, name):
+       """Повертає всі продукти з вказаною назвою (порожній список, якщо їх немає)."""
+       return self.products.find(name)
+
+
+   def get(self, name):
+       """Повертає перший продукт з вказаною назвою або піднімає ProductNotFoundError."""
+       product = self.products.first(name)
+       if product is None:
+           raise ProductNotFoundError(name)
+       return product
+
+
+   def remove(self, name):
+       """Видаляє перший продукт з вказаною назвою і повертає його."""
+       product = self.get(name)
+       self.products.remove(product)
+       self._record(OP_REMOVE, name)
+       return product
+
+
+   def update(self, name, cost=None, quantity=None, dimensions=None):
+       """Змінює вартість, кількість та/або розміри непродовольчого продукту і повертає його.
+
+       Розміри приймаються у будь-якому форматі Dimensions.parse; індекси об'єму
+       і підсумки оновлюються разом з ними.
+       """
+       product = self.get(name)
+       cost = product.cost if cost is None else check_field(COST_FIELD, cost)
+       quantity = product.quantity if quantity is None else check_field(QUANTITY_FIELD, quantity)
+       if dimensions is not None:
+           if not isinstance(product, NonFoodProduct):
+               raise ValidationError(f"Product '{name}' has no dimensions.")
+           dimensions = check_field(DIMENSIONS_FIELD, dimensions)
+           self._set_field(product, 'dimensions', dimensions)
+       self._set_field(product, 'cost', cost)
+       self._set_field(product, 'quantity', quantity)
+       self._record(OP_UPDATE, name, cost, quantity, None if dimensions is None else dimensions.encode())
+       return product
+
+
+   def adjust(self, name, delta):
+       """Змінює кількість продукту на delta і повертає нову кількість."""
+       delta = check_field(QUANTITY_CHANGE_FIELD, delta)
+       product = self.get(name)
+       if product.quantity + delta < 0:
+           raise InvalidQuantityError(f"Invalid quantity change. Only {product.quantity} units of '{name}' in stock.")
+       self._set_field(product, 'quantity', product.quantity + delta)
+       self._record(OP_ADJUST, name, delta)
+       return product.quantity
+
+
+   def take(self, name, quantity, fefo=False):
+       """Бере quantity одиниць продукту зі складу і повертає залишок.
+
+       Якщо fefo увімкнено, одиниці беруться з усіх партій з цією назвою,
+       починаючи з тієї, чий термін придатності спливає першим (first expired,
+       first out), а повертається загальний залишок усіх партій.
+       """
+       quantity = check_field(QUANTITY_FIELD, quantity)
+       if fefo:
+           if not self.find(name):
+               raise ProductNotFoundError(name)
+           total = self.total_quantity(name)
+           if not 1 <= quantity <= total:
+               raise InvalidQuantityError(f"Invalid quantity. Please enter a number between 1 and {total}.")
+           self._take_fefo(name, quantity)
+           self._record(OP_TAKE_FEFO, name, quantity)
+           return total - quantity
+       product = self.get(name)
+       if not 1 <= quantity <= product.quantity:
+           raise InvalidQuantityError(f"Invalid quantity. Please enter a number between 1 and {product.quantity}.")
+       self._set_field(product, 'quantity', product.quantity - quantity)
+       self._record(OP_ADJUST, name, -quantity)
+       return product.quantity
+
+
+   def _take_fefo(self, name, quantity):
+       # Партії без терміну придатності беруться останніми
+       def expiry_key(product):
+           expires_at = getattr(product, 'expires_at', None)
+           return expires_at is None, expires_at or 0
+       lots = sorted(self.find(name), key=expiry_key)
+       for product in lots:
+           taken = min(quantity, product.quantity)
+           if taken:
+               self._set_field(product, 'quantity', product.quantity - taken)
+               quantity -= taken
+           if not quantity:
+               break
+
+
+   def apply_batch(self, movements):
+       """Атомарно застосовує пакет рухів запасів (назва, зміна кількості).
+
+       Усі рухи перевіряються за поточними залишками в порядку пакета: списання
+       має бути від 1 до наявної на той момент кількості, як у take. Якщо хоча б
+       один рух невірний, склад не змінюється і піднімається BatchError з усіма
+       помилками. Повертає словник назва -> нова кількість.
+       """
+       # Один прохід: кількості змінюються одразу, а початкові запам'ятовуються для
+       # відкату; слухачі та журнал отримують по одній зміні на продукт наприкінці
+       first = self.products.first
+       originals = {}  # продукт -> кількість до пакета
+       result = {}  # назва -> нова кількість, у тому ж порядку, що й originals
+       errors = []
+       with self.products.transaction():
+           for index, (name, delta) in enumerate(movements):
+               product = first(name)
+               if product is None:
+                   errors.append((index, name, f"Product '{name}' not found in warehouse."))
+                   continue
+               if type(delta) is not int:
+                   errors.append((index, name, QUANTITY_CHANGE_FIELD.invalid_msg))
+                   continue
+               quantity = product.quantity
+               if quantity + delta < 0:
+                   errors.append((index, name, f"Invalid quantity. Please enter a number between 1 and {quantity}."))
+                   continue
+               if product not in originals:
+                   originals[product] = quantity
+               product.quantity = result[name] = quantity + delta
+           if errors:
+               for product, quantity in originals.items():
+                   product.quantity = quantity
+               raise BatchError(errors)
+
+           changed = self.products.changed
+           for (product, quantity), (name, new_quantity) in zip(originals.items(), result.items()):
+               changed(product, 'quantity', quantity)
+               self._record(OP_ADJUST, name, new_quantity - quantity)
+       return result
+
+
+   def add_rows(self, rows):
+       """Атомарно додає пакет продуктів з рядків полів, як у файлі, і повертає додані продукти.
+
+       Увесь пакет перевіряється одразу; якщо хоча б один рядок невірний, склад
+       не змінюється і піднімається BatchError зі списком RowError для всіх невірних рядків.
+       """
+       report = validate_product_rows(rows, start=0)
+       if report.errors:
+           raise BatchError(report.errors, "row(s)")
+       products = [product for _, product in report.valid]
+       with self.products.transaction():
+           for product in products:
+               self.products.append(product)
+               self._record(OP_ADD, *product_to_fields(product))
+       return products
+
+
+   def total_quantity(self, name):
+       """Повертає загальну кількість продуктів з вказаною назвою.
+
+       Поки підсумки за назвами не побудовані, рахує лише продукти з цією
+       назвою, тож одна команда не будує підсумки по всьому складу.
+       """
+       rollups = self._indexes.get('rollups')
+       if rollups is None or not rollups.is_built('name'):
+           return sum(product.quantity for product in self.products.find(name))
+       return self.stock_totals('name', name).quantity
+
+
+   def search(self, query, mode='prefix', limit=10):
+       """Шукає продукти за словами назви, виробника та призначення і повертає найкращі збіги.
+
+       mode - один з SEARCH_MODES: 'prefix', 'substring' або 'fuzzy' (з помилками).
+       Пошуковий індекс будується при першому зверненні (або в build_search_index)
+       і далі оновлюється разом зі складом.
+       """
+       from search import SEARCH_MODES
+       if mode not in SEARCH_MODES:
+           raise ValidationError(f"Search mode must be one of {', '.join(SEARCH_MODES)}.")
+       return self.build_search_index().search(query, mode, limit)
+
+
+   def build_search_index(self):
+       """Будує пошуковий індекс, якщо його ще немає, і повертає його.
+
+       Побудова займає секунди на сотнях тисяч продуктів, тож інтерактивне
+       меню викликає її одразу після завантаження даних, а не при першому пошуку.
+       """
+       from search import SearchIndex
+       return self._secondary_index('search', SearchIndex)
+
+
+   def rollups(self):
+       """Повертає поточні підсумки запасів за вимірами з ROLLUP_DIMENSIONS.
+
+       Кожен вимір будується при першому запиті до нього (stock_totals,
+       stock_groups), а далі оновлюється при кожній зміні продуктів через
+       методи складу.
+       """
+       from indexes import Rollups
+       return self._secondary_index('rollups', lambda products: Rollups(ROLLUP_DIMENSIONS, products))
+
+
+   def stock_totals(self, dimension, key):
+       """Повертає RollupTotals (продуктів, одиниць, вартість, об'єм) групи, наприклад виробника, за O(1)."""
+       if dimension not in ROLLUP_DIMENSIONS:
+           raise ValidationError(f"Stock can be totalled only by {', '.join(ROLLUP_DIMENSIONS)}.")
+       return self.rollups().totals(dimension, key)
+
+
+   def stock_groups(self, dimension):
+       """Повертає словник група -> RollupTotals для всіх груп виміру."""
+       if dimension not in ROLLUP_DIMENSIONS:
+           raise ValidationError(f"Stock can be totalled only by {', '.join(ROLLUP_DIMENSIONS)}.")
+       return self.rollups().groups(dimension)
+
+
+   def check_rollups(self):
+       """Порівнює поточні підсумки з повним перерахунком і повертає розбіжності.
+
+       Кожна розбіжність - (вимір, група, поточні підсумки, перераховані).
+       """
+       from indexes import Rollups
+       mismatches = self.rollups().compare(Rollups(ROLLUP_DIMENSIONS, self.products))
+       if metrics.enabled:
+           metrics.count('rows_scanned', len(self.products))
+       for dimension, key, actual, expected in mismatches:
+           logging.error(f"Підсумки {dimension}={key!r} розійшлися: {actual} замість {expected}.")
+       return mismatches
+
+
+   def sorted_index(self, field):
+       """Повертає відсортований індекс продуктів за полем з SORTED_FIELDS.
+
+       Індекс будується при першому зверненні, а далі оновлюється при кожному
+       додаванні, видаленні та зміні продукту через методи складу.
+       """
+       if field not in SORTED_FIELDS:
+           raise ValidationError(f"Products can be ordered only by {', '.join(SORTED_FIELDS)}.")
+       from indexes import SortedProductIndex
+       if field == 'expiry_date':
+           # Залишок днів змінюється щодня, тож індекс впорядковує абсолютний день закінчення
+           return self._secondary_index(('sorted', field), lambda products: SortedProductIndex(
+               'expires_at', products, aliases=('expiry_date',)))
+       if field in ('volume', 'girth'):
+           return self._secondary_index(('sorted', field), lambda products: SortedProductIndex(
+               field, products, aliases=('dimensions',)))
+       return self._secondary_index(('sorted', field), lambda products: SortedProductIndex(field, products))
+
+
+   def ordered(self, field, reverse=False):
+       """Перебирає продукти у порядку значення поля без повного сортування."""
+       return self.sorted_index(field).range(reverse=reverse)
+
+
+   def top(self, field, k, largest=True):
+       """Повертає k продуктів з найбільшим (або найменшим) значенням поля."""
+       index = self.sorted_index(field)
+       return index.largest(k) if largest else index.smallest(k)
+
+
+   def products_between(self, field, lower=None, upper=None, include_lower=True, include_upper=True):
+       """Повертає продукти зі значенням поля між lower та upper, наприклад кількістю менше 10."""
+       if field == 'expiry_date':
+           lower = None if lower is None else lower + self.clock.today
+           upper = None if upper is None else upper + self.clock.today
+       return list(self.sorted_index(field).range(lower, upper, include_lower, include_upper))
+
+
+   def fitting_in(self, length, width, height):
+       """Повертає непродовольчі продукти, що поміщаються у контейнер length x width x height.
+
+       Кандидати беруться з індексу об'єму, тож продукти, більші за контейнер
+       за об'ємом, не перевіряються; продукт можна повертати.
+       """
+       bin_dimensions = Dimensions(length, width, height)
+       return [product for product in self.sorted_index('volume').range(upper=bin_dimensions.volume)
+               if product.dimensions.fits_in(bin_dimensions)]
+
+
+   def next_to_expire(self, k):
+       """Повертає k харчових продуктів, чий термін придатності спливає найраніше."""
+       return self.top('expiry_date', k, largest=False)
+
+
+   def expiry_queue(self):
+       """Повертає чергу продуктів, ще не уцінених за терміном придатності."""
+       from indexes import ExpiryQueue
+       return self._secondary_index('expiry_queue', lambda products: ExpiryQueue(products, self.clock))
+
+
+   def apply_expiry_markdowns(self):
+       """Уцінює продукти, термін придатності яких наблизився до EXPIRY_DISCOUNT_DAYS.
+
+       Продукти вилучаються з черги за терміном придатності, тож вартість
+       виклику залежить лише від кількості уцінених продуктів, а не від розміру
+       складу. Уцінені продукти отримують позначку marked_down, яка зберігається
+       разом з ними, тож черга, побудована заново (після перезапуску чи
+       drop_indexes), не уцінює їх удруге. Повертає уцінені продукти.
+       """
+       due = list(self.expiry_queue().pop_expiring(EXPIRY_DISCOUNT_DAYS))
+       for product in due:
+           self._set_field(product, 'cost', product.cost * EXPIRY_DISCOUNT_FACTOR)
+           self._set_field(product, 'marked_down', True)
+       if due and self._oplog is not None:
+           # Уцінки залежать від годинника, який журнал не відтворює, тож стан зберігається знімком
+           self.checkpoint()
+       return due
+
+
+   def tick(self, days=1):
+       """Переводить годинник термінів придатності на days днів і застосовує уцінки.
+
+       Перехід записується в журнал операцій, тож день годинника не втрачається
+       після перезапуску навіть без уцінок.
+       """
+       if days < 0:
+           raise ValidationError("Clock can't go backwards.")
+       self.clock.advance(days)
+       self.products.clock_advanced()
+       self._record(OP_TICK, days)
+       due = self.apply_expiry_markdowns()
+       logging.info(f"День {self.clock.today}: уцінено {len(due)} продуктів.")
+       return due
+
+
+   def sort(self, order="asc"):
+       """Сортує продукти за кількістю: 'asc' за зростанням, 'desc' за спаданням."""
+       if order not in SORT_ORDERS:
+           raise ValidationError("Invalid sorting order. Please enter 'asc' for ascending or 'desc' for descending.")
+       self._sort_by_quantity(order)
+       if metrics.enabled:
+           metrics.count('rows_scanned', len(self.products))
+       self._record(OP_SORT, order)
+
+
+   # Інтерактивний інтерфейс складу поверх програмного
+
+
+   def report(self, category, writer=None, fmt="table", offset=0, limit=None, page_size=REPORT_PAGE_SIZE, **filters):
+       """Потоково виводить продукти категорії 'food' або 'non_food' і повертає кількість рядків.
+
+       writer - файл, термінал (за замовчуванням sys.stdout) або, наприклад,
+       socket.makefile('w'); fmt - один з REPORT_FORMATS. Рядки з offset по
+       offset + limit вибираються після фільтрів поле=значення, наприклад producer='Farm'.
+       """
+       columns = {'food': (FoodProduct, FOOD_REPORT_COLUMNS), 'non_food': (NonFoodProduct, NON_FOOD_REPORT_COLUMNS)}
+       if category not in columns:
+           raise ValidationError("Report category must be 'food' or 'non_food'.")
+       if fmt not in REPORT_FORMATS:
+           raise ValidationError(f"Report format must be one of {', '.join(REPORT_FORMATS)}.")
+       product_class, report_columns = columns[category]
+       scanned = metrics.scanned(self.products) if metrics.enabled else self.products
+       products = (product for product in scanned if isinstance(product, product_class)
+                   and all(getattr(product, field, None) == value for field, value in filters.items()))
+       return render_products(products, report_columns, sys.stdout if writer is None else writer, fmt,
+                              offset, limit, page_size)
+
+
+   def show_product_groups(self, offset=0, limit=None, page_size=REPORT_PAGE_SIZE, **filters):
+       """Відображає групи харчових та непродовольчих продуктів на складі сторінками."""
        # Відображення харчових продуктів
        print("Food Products:")
-       print(tabulate(
-           [(product.name, product.cost, product.quantity, product.producer, product.expiry_date) for product in
-            food_products],
-           headers=["Name", "Cost ($)", "Quantity", "Producer", "Expiry Date"]))
+       self.report('food', offset=offset, limit=limit, page_size=page_size, **filters)
+       if not filters:
+           self._print_category_totals('food')
 
 
        # Відображення непродовольчих продуктів
        print("\nNon-Food Products:")
-       print(tabulate(
-           [(product.name, product.cost, product.quantity, product.producer, product.dimensions, product.purpose) for
-            product in non_food_products],
-           headers=["Name", "Cost ($)", "Quantity", "Producer", "Dimensions (cm)", "Purpose"]))
+       self.report('non_food', offset=offset, limit=limit, page_size=page_size, **filters)
+       if not filters:
+           self._print_category_totals('non_food')
 
 
        print()  # Виводимо порожній рядок для розділення
 
 
-   def load_products_from_file(self, file_path):
-       """Завантажує продукти зі вказаного файлу."""
-       try:
-           with open(file_path, 'r', encoding='utf-8') as file:
-               lines = file.readlines()
+   def _print_category_totals(self, category):
+       """Виводить підсумки категорії з поточних підсумків складу (будується лише вимір категорій)."""
+       totals = self.stock_totals('category', category)
+       print(f"Total: {totals.count} products, {totals.quantity} units, value ${totals.value:.2f}")
 
 
-           # Фільтрація порожніх рядків та коментарів
-           valid_lines = [line.strip() for line in lines if line.strip() and not line.startswith('#')]
+   def load_products_from_file(self, file_path, batch_size=LOAD_BATCH_SIZE, progress=None, workers=None):
+       """Завантажує продукти зі вказаного файлу пакетами.
 
+       Файл читається потоково, тому пам'ять не залежить від його розміру.
+       Якщо workers більше 1, файл розбирається паралельно у пулі процесів;
+       продукти все одно створюються тут, тому прискорення обмежене
+       приблизно 1.5-2x (див. iter_product_batches_parallel).
+       progress(рядків_прочитано, продуктів_завантажено) викликається після кожного пакета.
+       Повертає кількість завантажених продуктів.
+       """
+       loaded = 0
+       lines_read = 0
 
-           for line in valid_lines:
-               data = line.split(',')
-               if len(data) == 5:  # Харчові продукти
-                   name, cost, quantity, producer, expiry_date = data
-                   product = FoodProduct(name, float(cost), int(quantity), producer, int(expiry_date))
-               elif len(data) == 6:  # Непродовольчі продукти
-                   name, cost, quantity, producer, dimensions, purpose = data
-                   product = NonFoodProduct(name, float(cost), int(quantity), producer, float(dimensions), purpose)
-               else:
-                   print(f"Invalid data format: {data}")  # Невірний формат даних
-                   continue
 
+       def report_error(error):
+           # Невірні рядки пропускаються, решта файлу завантажується
+           print(f"Line {error.line_number}: {error}")
 
-               self.products.append(product)
+
+       try:
+           if workers is not None and workers > 1:
+               batches = iter_product_batches_parallel(file_path, workers, on_error=report_error)
+           else:
+               batches = iter_product_batches(file_path, batch_size, on_error=report_error)
+
+
+           for batch, lines_read in batches:
+               self.products.extend(batch)
+               loaded += len(batch)
+               if progress is not None:
+                   progress(lines_read, loaded)
 
 
+           if metrics.enabled:
+               metrics.count('load.lines_read', lines_read)
+               metrics.count('load.bytes_parsed', os.path.getsize(file_path))
+               metrics.count('load.products', loaded)
+           if self._oplog is not None:
+               self.checkpoint()
            print("Products loaded from file.")
        except FileNotFoundError:
            print("File not found.")
        except Exception as e:
            print(f"Error loading products from file: {e}")
+       return loaded
 
 
    def sort_products(self):
@@ -126,11 +2466,18 @@ class Warehouse:
        order = input("Enter sorting order (asc/desc): ").lower()
 
 
-       if order not in ["asc", "desc"]:
-           print("Invalid sorting order. Please enter 'asc' for ascending or 'desc' for descending.")
+       try:
+           self.sort(order)
+       except ValidationError as e:
+           print(e)
            return
 
 
+       print(f"Products sorted in {order}ending order based on quantity.")
+
+
+   def _sort_by_quantity(self, order):
+       """Сортує харчові, а потім непродовольчі продукти за кількістю."""
        # Сортування харчових продуктів
        food_products = [product for product in self.products if isinstance(product, FoodProduct)]
        food_products_sorted = sorted(food_products, key=lambda x: x.quantity, reverse=(order == "desc"))
@@ -141,33 +2488,31 @@ class Warehouse:
        non_food_products_sorted = sorted(non_food_products, key=lambda x: x.quantity, reverse=(order == "desc"))
 
 
-       # Оновлюємо список продуктів у складі
-       self.products = food_products_sorted + non_food_products_sorted
+       # Інші продукти залишаються в кінці у попередньому порядку
+       other_products = [product for product in self.products
+                         if not isinstance(product, (FoodProduct, NonFoodProduct))]
 
 
-       print(f"Products sorted in {order}ending order based on quantity.")
+       # Оновлюємо порядок продуктів у складі
+       self.products.reorder(food_products_sorted + non_food_products_sorted + other_products)
 
 
    def add_product(self):
        """Додає новий продукт до складу."""
        # Запитуємо ім'я продукту
-       name = self.get_valid_input("Enter product name: ", str, invalid_chars="#@!",
-                                   invalid_chars_msg="Invalid product name. Product name must contain letters and must not include #, @, or !, and cannot consist solely of numbers.")
+       name = self.get_valid_input("Enter product name: ", NAME_FIELD)
 
 
        # Запитуємо вартість продукту
-       cost = self.get_valid_input("Enter product cost: ", float, invalid_range=(0, 2_000_000),
-                                   invalid_range_msg="Invalid cost. Cost must be between 0 and 2,000,000.")
+       cost = self.get_valid_input("Enter product cost: ", COST_FIELD)
 
 
        # Запитуємо кількість продукту
-       quantity = self.get_valid_input("Enter product quantity: ", int, invalid_range=(0, 50_000),
-                                       invalid_range_msg="Invalid quantity. Quantity must be between 0 and 50,000.")
+       quantity = self.get_valid_input("Enter product quantity: ", QUANTITY_FIELD)
 
 
        # Запитуємо ім'я виробника
-       producer = self.get_valid_input("Enter product producer: ", str, invalid_chars="#@!",
-                                       invalid_chars_msg="Invalid producer name. Producer name must contain letters and must not include #, @, or !, and cannot consist solely of numbers.")
+       producer = self.get_valid_input("Enter product producer: ", PRODUCER_FIELD)
 
 
        # Запитуємо, чи є це харчовий продукт
@@ -177,51 +2522,51 @@ class Warehouse:
 
        if is_food == "yes":
            # Запитуємо термін придатності
-           expiry_date = self.get_valid_input("Enter expiry date (in days): ", int, invalid_range=(0, None),
-                                              invalid_range_msg="Invalid expiry date. Expiry date must be a positive integer.")
+           expiry_date = self.get_valid_input("Enter expiry date (in days): ", EXPIRY_FIELD)
            # Додаємо харчовий продукт
            product = FoodProduct(name, cost, quantity, producer, expiry_date)
        else:
            # Запитуємо розміри продукту
-           dimensions = self.get_valid_input("Enter product dimensions: ", float, invalid_range=(0, 1000),
-                                             invalid_range_msg="Invalid dimensions. Dimensions must be between 0 and 1000.")
+           dimensions = self.get_valid_input("Enter product dimensions: ", DIMENSIONS_FIELD)
 
 
            # Запитуємо призначення продукту
-           purpose = self.get_valid_input("Enter product purpose: ", str,
-                                          invalid_msg="Invalid purpose. Purpose must start with a letter and must not consist solely of numbers.")
+           purpose = self.get_valid_input("Enter product purpose: ", PURPOSE_FIELD)
 
 
            # Додаємо непродовольчий продукт
            product = NonFoodProduct(name, cost, quantity, producer, dimensions, purpose)
 
 
-       # Додаємо продукт до списку продуктів
-       self.products.append(product)
+       # Додаємо продукт до складу
+       self.add(product)
        print(f"Product '{product.name}' added to warehouse.")
 
 
    def remove_product(self):
        """Видаляє продукт зі складу за назвою."""
        product_name = input("Enter product name to remove: ")
-       product_to_remove = next((product for product in self.products if product.name == product_name), None)
-
-
-       if product_to_remove:
-           self.products.remove(product_to_remove)
+       try:
+           self.remove(product_name)
            print(f"Product '{product_name}' removed from warehouse.")
-       else:
-           print(f"Product '{product_name}' not found in warehouse.")
+       except ProductNotFoundError as e:
+           print(e)
 
 
    def find_product_by_name(self):
        """Знаходить продукт за назвою та відображає його деталі."""
        product_name = input("Enter product name to find: ")
-       found_products = [product for product in self.products if product.name == product_name]
+       found_products = self.find(product_name)
 
 
        if not found_products:
            print(f"Product '{product_name}' not found.")
+           # Підказуємо схожі назви, лише якщо пошуковий індекс уже побудовано:
+           # спершу за початком слів, потім з урахуванням помилок
+           suggestions = 'search' in self._indexes and (
+                   self.search(product_name) or self.search(product_name, mode='fuzzy'))
+           if suggestions:
+               print(f"Did you mean: {', '.join(dict.fromkeys(product.name for product in suggestions))}?")
        else:
            for product in found_products:
                if isinstance(product, FoodProduct):
@@ -235,7 +2580,7 @@ class Warehouse:
    def update_product(self):
        """Оновлює інформацію про продукт у складі."""
        product_name = input("Enter product name to update: ")
-       product_to_update = next((product for product in self.products if product.name == product_name), None)
+       product_to_update = self.products.first(product_name)
 
 
        if not product_to_update:
@@ -247,17 +2592,14 @@ class Warehouse:
 
 
        # Оновлення вартості
-       new_cost = self.get_valid_input("Enter new cost (leave blank to keep current cost): ", float,
-                                       default=product_to_update.cost, invalid_range=(0, 2_000_000),
-                                       invalid_range_msg="Invalid cost. Cost must be between 0 and 2,000,000.")
-       product_to_update.cost = new_cost
+       new_cost = self.get_valid_input("Enter new cost (leave blank to keep current cost): ", COST_FIELD,
+                                       default=product_to_update.cost)
 
 
        # Оновлення кількості
-       new_quantity = self.get_valid_input("Enter new quantity (leave blank to keep current quantity): ", int,
-                                           default=product_to_update.quantity, invalid_range=(0, 50_000),
-                                           invalid_range_msg="Invalid quantity. Quantity must be between 0 and 50,000.")
-       product_to_update.quantity = new_quantity
+       new_quantity = self.get_valid_input("Enter new quantity (leave blank to keep current quantity): ",
+                                           QUANTITY_FIELD, default=product_to_update.quantity)
+       self.update(product_name, new_cost, new_quantity)
 
 
        print(f"Product '{product_name}' updated successfully.")
@@ -266,7 +2608,15 @@ class Warehouse:
    def get_valid_input(self, prompt, dtype, invalid_chars=None, invalid_chars_msg=None, invalid_range=None,
                        invalid_range_msg=None, valid_responses=None, invalid_response_msg=None, invalid_msg=None,
                        default=None):
-       """Універсальний метод для отримання та перевірки введення від користувача."""
+       """Універсальний метод для отримання та перевірки введення від користувача.
+
+       dtype - опис поля схеми (Field) або тип, до якого додаються перевірки з
+       решти аргументів; опис компілюється в перевірку один раз і кешується.
+       """
+       if not isinstance(dtype, Field):
+           dtype = Field(prompt, dtype, invalid_range, invalid_chars, tuple(valid_responses or ()),
+                         invalid_msg, invalid_range_msg, invalid_chars_msg, invalid_response_msg)
+       validate = compile_field(dtype)
        while True:
            value = input(prompt)
            if not value and default is not None:
@@ -274,45 +2624,27 @@ class Warehouse:
 
 
            try:
-               if dtype == int:
-                   value = int(value)
-               elif dtype == float:
-                   value = float(value)
-               elif dtype == str:
-                   pass
-
-
-               # Перевірка наявності невідповідних символів
-               if invalid_chars and any(char in value for char in invalid_chars):
-                   print(invalid_chars_msg)
-                   continue
-
-
-               # Перевірка діапазону
-               if invalid_range:
-                   lower, upper = invalid_range
-                   if (lower is not None and value < lower) or (upper is not None and value > upper):
-                       print(invalid_range_msg)
-                       continue
+               return validate(value)
+           except FieldError as e:
+               print(e)
 
 
-               # Перевірка списку допустимих відповідей
-               if valid_responses and value.lower() not in valid_responses:
-                   print(invalid_response_msg)
-                   continue
-
-
-               return value
-
-
-           except ValueError:
-               print(invalid_msg)
+   def _print_product_details(self, product):
+       """Виводить таблицю з деталями одного продукту."""
+       from tabulate import tabulate
+       if isinstance(product, FoodProduct):
+           print(tabulate([[product.name, product.cost, product.quantity, product.producer, product.expiry_date]],
+                          headers=["Name", "Cost ($)", "Quantity", "Producer", "Expiry Date"]))
+       else:
+           print(tabulate([[product.name, product.cost, product.quantity, product.producer,
+                            getattr(product, 'dimensions', None), getattr(product, 'purpose', None)]],
+                          headers=["Name", "Cost ($)", "Quantity", "Producer", "Dimensions (cm)", "Purpose"]))
 
 
    def change_quantity_of_product(self):
        """Змінює кількість продукту на складі."""
        product_name = input("Enter product name to change quantity: ")
-       product_to_change = next((product for product in self.products if product.name == product_name), None)
+       product_to_change = self.products.first(product_name)
 
 
        if not product_to_change:
@@ -321,21 +2653,23 @@ class Warehouse:
 
 
        print(f"\nProduct '{product_name}' details:")
-       print(tabulate([[product_to_change.name, product_to_change.cost, product_to_change.quantity,
-                        product_to_change.producer, product_to_change.dimensions, product_to_change.purpose]],
-                      headers=["Name", "Cost ($)", "Quantity", "Producer", "Dimensions (cm)", "Purpose"]))
+       self._print_product_details(product_to_change)
 
 
        change_amount = self.get_valid_input("Enter quantity change (positive for increase, negative for decrease): ",
                                             int, invalid_msg="Invalid quantity change. Please enter a valid integer.")
-       product_to_change.quantity += change_amount
+       try:
+           self.adjust(product_name, change_amount)
+       except InvalidQuantityError as e:
+           print(e)
+           return
        print(f"Quantity of '{product_name}' changed by {change_amount}.")
 
 
    def take_product_from_warehouse(self):
        """Бере певну кількість продуктів зі складу."""
        product_name = input("Enter product name taken from warehouse: ")
-       product_to_take = next((product for product in self.products if product.name == product_name), None)
+       product_to_take = self.products.first(product_name)
 
 
        if not product_to_take:
@@ -344,26 +2678,195 @@ class Warehouse:
 
 
        print(f"\nProduct '{product_name}' details:")
-       print(tabulate([[product_to_take.name, product_to_take.cost, product_to_take.quantity, product_to_take.producer,
-                        product_to_take.dimensions, product_to_take.purpose]],
-                      headers=["Name", "Cost ($)", "Quantity", "Producer", "Dimensions (cm)", "Purpose"]))
+       self._print_product_details(product_to_take)
 
 
+       # Харчові продукти беруться з усіх партій, починаючи з найближчого терміну придатності
+       fefo = isinstance(product_to_take, FoodProduct)
+       available = self.total_quantity(product_name) if fefo else product_to_take.quantity
        taken_quantity = self.get_valid_input(
-           f"Enter quantity taken from warehouse (up to {product_to_take.quantity}): ", int,
-           invalid_range=(1, product_to_take.quantity),
-           invalid_range_msg=f"Invalid quantity. Please enter a number between 1 and {product_to_take.quantity}.")
-       product_to_take.quantity -= taken_quantity
+           f"Enter quantity taken from warehouse (up to {available}): ", int,
+           invalid_range=(1, available),
+           invalid_range_msg=f"Invalid quantity. Please enter a number between 1 and {available}.")
+       self.take(product_name, taken_quantity, fefo=fefo)
        print(f"{taken_quantity} units of '{product_name}' taken from warehouse.")
 
 
+   def save_snapshot(self, path):
+       """Зберігає продукти складу у бінарний знімок для швидкого запуску."""
+       save_snapshot(self.products, path)
+
+
+   @classmethod
+   def open_snapshot(cls, path, writable=False):
+       """Створює склад з бінарного знімка, відображеного у пам'ять (див. open_snapshot)."""
+       return cls(open_snapshot(path, writable))
+
+
+   @classmethod
+   def open_durable(cls, directory, **log_options):
+       """Відновлює склад з каталогу журналу операцій і продовжує запис у нього.
+
+       Стан складається з останнього знімка та операцій із сегментів журналу,
+       записаних після нього. Параметри журналу передаються в OperationLog.
+       """
+       snapshot_path = os.path.join(directory, LOG_SNAPSHOT_NAME)
+       if os.path.exists(snapshot_path):
+           store = open_snapshot(snapshot_path)
+           log_position = store.log_position
+       else:
+           store, log_position = None, 0
+       import oplog
+       warehouse = cls(store)
+       if os.path.isdir(directory):
+           warehouse._replay_segments(segment for segment in oplog.list_segments(directory)
+                                      if oplog.segment_number(segment) > log_position)
+       warehouse._oplog = oplog.OperationLog(directory, first_segment=log_position + 1, **log_options)
+       return warehouse
+
+
+   def attach_log(self, directory, **log_options):
+       """Починає записувати зміни складу в журнал операцій у каталозі directory.
+
+       Поточний стан одразу зберігається знімком, тож попередній вміст
+       каталогу журналу замінюється.
+       """
+       import oplog
+       self.close_log()
+       self._oplog = oplog.OperationLog(directory, **log_options)
+       self.checkpoint()
+
+
+   def close_log(self):
+       """Чекає завершення ущільнення, скидає журнал на диск і закриває його."""
+       if self._oplog is None:
+           return
+       self._wait_for_compaction()
+       self._oplog.close()
+       self._oplog = None
+
+
+   def flush_log(self):
+       """Записує буфер журналу операцій на диск, якщо журнал підключений."""
+       if self._oplog is not None:
+           self._oplog.flush()
+
+
+   def _record(self, op, *fields):
+       """Записує зміну у журнал операцій, якщо він підключений."""
+       if self._oplog is None:
+           return
+       self._oplog.append(op, *fields)
+       if self._oplog.rotation_due and (self._compaction is None or not self._compaction.is_alive()):
+           self.compact_log()
+
+
+   def _replay(self, op, fields):
+       """Повторює операцію з журналу над складом."""
+       if op == OP_ADD:
+           self.products.append(product_from_fields(fields))
+       elif op == OP_SORT:
+           self._sort_by_quantity(fields[0])
+       elif op == OP_TAKE_FEFO:
+           self._take_fefo(*fields)
+       elif op == OP_TICK:
+           self.tick(*fields)
+       else:
+           product = self.products.first(fields[0])
+           if product is None:
+               logging.error(f"Операція журналу {op} для відсутнього продукту {fields[0]}.")
+           elif op == OP_REMOVE:
+               self.products.remove(product)
+           elif op == OP_UPDATE:
+               # Записи без розмірів (до появи update(dimensions=)) мають лише три поля
+               if len(fields) > 3 and fields[3] is not None:
+                   self._set_field(product, 'dimensions', Dimensions.parse(fields[3]))
+               self._set_field(product, 'cost', fields[1])
+               self._set_field(product, 'quantity', fields[2])
+           elif op == OP_ADJUST:
+               self._set_field(product, 'quantity', product.quantity + fields[1])
+
+
+   def _replay_segments(self, segments):
+       import oplog
+       for segment in segments:
+           for op, fields in oplog.read_segment(segment):
+               self._replay(op, fields)
+
+
+   def checkpoint(self):
+       """Зберігає поточний стан знімком і видаляє врахований журнал."""
+       self._wait_for_compaction()
+       sealed = self._oplog.rotate()
+       save_snapshot(self.products, os.path.join(self._oplog.directory, LOG_SNAPSHOT_NAME),
+                     log_position=self._oplog.segment - 1)
+       for segment in sealed:
+           os.remove(segment)
+
+
+   def compact_log(self, background=True):
+       """Ущільнює закриті сегменти журналу у знімок.
+
+       Поточний сегмент закривається миттєво, а знімок будується з попереднього
+       знімка та закритих сегментів в окремому потоці, не зачіпаючи склад.
+       """
+       self._wait_for_compaction()
+       directory = self._oplog.directory
+       sealed = self._oplog.rotate()
+       log_position = self._oplog.segment - 1
+
+
+       def compact():
+           snapshot_path = os.path.join(directory, LOG_SNAPSHOT_NAME)
+           scratch = Warehouse(open_snapshot(snapshot_path) if os.path.exists(snapshot_path) else None)
+           scratch._replay_segments(sealed)
+           save_snapshot(scratch.products, snapshot_path, log_position=log_position)
+           for segment in sealed:
+               os.remove(segment)
+
+
+       if background:
+           import threading
+           self._compaction = threading.Thread(target=compact, name='oplog-compaction', daemon=True)
+           self._compaction.start()
+       else:
+           compact()
+
+
+   def _wait_for_compaction(self):
+       if self._compaction is not None:
+           self._compaction.join()
+           self._compaction = None
+
+
+   def reprice_all(self, rules=DEFAULT_REPRICING_RULES):
+       """Переоцінює весь склад за один прохід і повертає RepricingSummary.
+
+       За замовчуванням застосовуються знижка на продукти з малим терміном
+       придатності та надбавка за великі розміри, як у decrease_cost.
+       """
+       summary = self.products.reprice(rules)
+       if metrics.enabled:
+           metrics.count('rows_scanned', summary.checked)
+       if self._oplog is not None:
+           # Масову переоцінку дешевше зберегти знімком, ніж записом на кожен продукт
+           self.checkpoint()
+       logging.info(f"Переоцінено {summary.changed} з {summary.checked} продуктів, "
+                    f"зміна вартості запасів: {summary.value_delta:.2f}.")
+       return summary
+
+
    def get_total_quantity_of_product(self):
        """Показує загальну кількість певного продукту на складі."""
        product_name = input("Enter product name to get total quantity: ")
-       total_quantity = sum(product.quantity for product in self.products if product.name == product_name)
+       total_quantity = self.total_quantity(product_name)
        print(f"Total quantity of '{product_name}' in warehouse: {total_quantity}")
 
 
+# Публічні операції складу вимірюються, коли метрики увімкнено (metrics.enable())
+metrics.instrument(Warehouse)
+
+
 def choose_language():
        """Функція, що дозволяє користувачу вибрати мову інтерфейсу."""
        print("Choose language / Виберіть мову:")
@@ -381,75 +2884,35 @@ def choose_language():
        else:
            print("Invalid choice / Невірний вибір.")
            return choose_language()
-translations = {
-   "en": {
-       "menu": {
-           "header": "~~~ Warehouse Management System ~~~",
-           "load_from_file": "Load products from file",
-           "show_groups": "Show product groups",
-           "add_product": "Add new product",
-           "remove_product": "Remove product",
-           "find_product": "Find product by name",
-           "update_product": "Update product",
-           "sort_products": "Sort products",
-           "exit": "Exit"
-       },
-       "invalid_choice": "Invalid choice. Please enter a number between 1 and 8.",
-       "prompt": {
-           "file_path": "Enter file path: ",
-           "product_name": "Enter product name: ",
-           "product_cost": "Enter product cost: ",
-           "product_quantity": "Enter product quantity: ",
-           "product_producer": "Enter product producer: ",
-           "is_food_product": "Is it a food product? (yes/no): ",
-           "expiry_date": "Enter expiry date (in days): ",
-           "product_dimensions": "Enter product dimensions: ",
-           "product_purpose": "Enter product purpose: ",
-           "change_amount": "Enter quantity change (positive for increase, negative for decrease): ",
-           "taken_quantity": "Enter quantity taken from warehouse: "
-       }
-   },
-   "ua": {
-       "menu": {
-           "header": "~~~ Система управління складом ~~~",
-           "load_from_file": "Завантажити продукти з файлу",
-           "show_groups": "Показати групи продуктів",
-           "add_product": "Додати новий продукт",
-           "remove_product": "Видалити продукт",
-           "find_product": "Знайти продукт за назвою",
-           "update_product": "Оновити продукт",
-           "sort_products": "Сортувати продукти",
-           "exit": "Вийти"
-       },
-       "invalid_choice": "Невірний вибір. Будь ласка, введіть число від 1 до 8.",
-       "prompt": {
-           "file_path": "Введіть шлях до файлу: ",
-           "product_name": "Введіть назву продукту: ",
-           "product_cost": "Введіть вартість продукту: ",
-           "product_quantity": "Введіть кількість продукту: ",
-           "product_producer": "Введіть назву виробника продукту: ",
-           "is_food_product": "Це харчовий продукт? (так/ні): ",
-           "expiry_date": "Введіть термін придатності (в днях): ",
-           "product_dimensions": "Введіть розміри продукту: ",
-           "product_purpose": "Введіть призначення продукту: ",
-           "change_amount": "Введіть зміни в кількості (позитивне для збільшення, негативне для зменшення): ",
-           "taken_quantity": "Введіть кількість, взяту зі складу: "
-       }
-   }
-}
+
+
+
+
+# Мови інтерфейсу; тексти кожної лежать у пакеті locales і завантажуються лише при виборі мови
+LANGUAGES = ("en", "ua")
+
+
+def load_translation(language):
+   """Повертає тексти інтерфейсу вказаної мови, імпортуючи їх при першому зверненні."""
+   if language not in LANGUAGES:
+       raise ValueError(f"Unknown language '{language}'.")
+   return importlib.import_module(f"locales.{language}").TRANSLATION
 
 
 
 
 def main():
    """Основна функція, яка запускає інтерфейс програми."""
+   configure_logging()
+
+
    # Створення об'єкту складу
    warehouse = Warehouse()
 
 
    # Вибір мови
    language = choose_language()
-   translation = translations[language]
+   translation = load_translation(language)
 
 
    while True:
@@ -463,46 +2926,173 @@ def main():
        print("\t 5.", translation["menu"]["find_product"])
        print("\t 6.", translation["menu"]["update_product"])
        print("\t 7.", translation["menu"]["sort_products"])
-       print("\t 8.", translation["menu"]["exit"])
+       print("\t 8.", translation["menu"]["performance"])
+       print("\t 9.", translation["menu"]["exit"])
 
 
        # Отримання вибору користувача
        choice = input("\n" + translation["invalid_choice"])
 
 
-       # Обробка вибору користувача
-       if choice == "1":
-           # Завантаження продуктів з файлу
-           file_path = input(translation["prompt"]["file_path"])
-           warehouse.load_products_from_file(file_path)
-       elif choice == "2":
-           # Відображення груп продуктів
-           warehouse.show_product_groups()
-       elif choice == "3":
-           # Додавання нового продукту
-           warehouse.add_product()
-       elif choice == "4":
-           # Видалення продукту
-           warehouse.remove_product()
-       elif choice == "5":
-           # Пошук продукту за назвою
-           warehouse.find_product_by_name()
-       elif choice == "6":
-           # Оновлення продукту
-           warehouse.update_product()
-       elif choice == "7":
-           # Сортування продуктів
-           warehouse.sort_products()
-       elif choice == "8":
-           # Вихід з програми
-           print(translation["menu"]["exit"])
-           break
+       # Обробка вибору користувача; у режимі профілювання операції меню (крім меню статистики) профілюються
+       with nullcontext() if choice == "8" else metrics.profiled():
+           if handle_menu_choice(warehouse, translation, choice):
+               break
+
+
+
+
+def handle_menu_choice(warehouse, translation, choice):
+   """Виконує пункт головного меню і повертає True, якщо користувач обрав вихід."""
+   if choice == "1":
+       # Завантаження продуктів з файлу
+       file_path = input(translation["prompt"]["file_path"])
+       warehouse.load_products_from_file(file_path)
+       # Пошуковий індекс для підказок будуємо зараз, а не в першому пошуку
+       warehouse.build_search_index()
+   elif choice == "2":
+       # Відображення груп продуктів
+       warehouse.show_product_groups()
+   elif choice == "3":
+       # Додавання нового продукту
+       warehouse.add_product()
+   elif choice == "4":
+       # Видалення продукту
+       warehouse.remove_product()
+   elif choice == "5":
+       # Пошук продукту за назвою
+       warehouse.find_product_by_name()
+   elif choice == "6":
+       # Оновлення продукту
+       warehouse.update_product()
+   elif choice == "7":
+       # Сортування продуктів
+       warehouse.sort_products()
+   elif choice == "8":
+       # Статистика продуктивності
+       performance_menu(translation)
+   elif choice == "9":
+       # Вихід з програми
+       print(translation["menu"]["exit"])
+       return True
+   else:
+       # Невірний вибір
+       print(translation["invalid_choice"])
+   return False
+
+
+
+
+def performance_menu(translation):
+   """Меню метрик операцій складу та профілювання."""
+   text = translation["performance"]
+   print("\t\t", text["header"])
+   for number, key in enumerate(["toggle_metrics", "show_stats", "save_stats", "toggle_profile", "reset_stats",
+                                 "back"], 1):
+       print(f"\t {number}.", text[key])
+   choice = input("> ")
+
+
+   if choice == "1":
+       if metrics.enabled:
+           metrics.disable()
+           print(text["metrics_disabled"])
+       else:
+           metrics.enable()
+           print(text["metrics_enabled"])
+   elif choice == "2":
+       print(metrics.dump('text'))
+   elif choice == "3":
+       file_path = input(translation["prompt"]["file_path"])
+       try:
+           with open(file_path, 'w', encoding='utf-8') as file:
+               file.write(metrics.dump('json'))
+           print(text["stats_saved"])
+       except OSError as e:
+           print(f"Error saving statistics: {e}")
+   elif choice == "4":
+       if metrics.profiling:
+           print(metrics.stop_profile())
+       else:
+           metrics.start_profile()
+           print(text["profile_started"])
+   elif choice == "5":
+       metrics.reset()
+       print(text["stats_reset"])
+   elif choice != "6":
+       print(translation["invalid_choice"])
+
+
+
+
+def run_command(argv):
+   """Виконує одну команду з аргументів командного рядка без меню і повертає код виходу.
+
+   Для термінала, що запускає програму на кожну операцію, наприклад:
+       python -m main --snapshot warehouse.snap take Apple 3
+   (запуск модулем бере скомпільований байт-код, а python main.py щоразу компілює файл).
+   take та adjust зберігають зміну: нова кількість пишеться прямо у файл знімка,
+   а в каталог --durable операція дописується журналом. Помилки складу виводяться в stderr з кодом 1.
+   """
+   import argparse  # Розбір аргументів потрібен лише в цьому режимі
+   parser = argparse.ArgumentParser(prog="main.py", description="Run one warehouse command and exit.")
+   source = parser.add_mutually_exclusive_group(required=True)
+   source.add_argument("--snapshot", help="binary snapshot; take and adjust update it in place")
+   source.add_argument("--durable", help="operation log directory (see Warehouse.open_durable)")
+   source.add_argument("--file", help="text file with products (read-only commands)")
+   commands = parser.add_subparsers(dest="command", required=True)
+   take = commands.add_parser("take", help="take units and print the remaining quantity")
+   take.add_argument("name")
+   take.add_argument("quantity", type=int)
+   take.add_argument("--fefo", action="store_true", help="take from the lots that expire first")
+   adjust = commands.add_parser("adjust", help="change the quantity and print the new quantity")
+   adjust.add_argument("name")
+   adjust.add_argument("delta", type=int)
+   commands.add_parser("total", help="print the total quantity").add_argument("name")
+   commands.add_parser("find", help="print matching products, one per line").add_argument("name")
+   args = parser.parse_args(argv)
+   if args.file and args.command in ("take", "adjust"):
+       parser.error("take and adjust need --snapshot or --durable to save the change")
+   configure_logging(logging.WARNING)
+
+
+   try:
+       if args.snapshot:
+           # Кількість змінюється прямо у відображеному файлі, без перезапису всього знімка
+           warehouse = Warehouse.open_snapshot(args.snapshot, writable=args.command in ("take", "adjust"))
+       elif args.durable:
+           warehouse = Warehouse.open_durable(args.durable)
+       else:
+           warehouse = Warehouse(ProductStore(iter_products(args.file)))
+   except (OSError, ValueError) as e:
+       print(f"Error opening warehouse: {e}", file=sys.stderr)
+       return 1
+
+
+   try:
+       if args.command == "take":
+           print(warehouse.take(args.name, args.quantity, fefo=args.fefo))
+       elif args.command == "adjust":
+           print(warehouse.adjust(args.name, args.delta))
+       elif args.command == "total":
+           print(warehouse.total_quantity(args.name))
        else:
-           # Невірний вибір
-           print(translation["invalid_choice"])
+           for product in warehouse.find(args.name):
+               print("\t".join(str(value) for value in _schema_values(product)[1]))
+       if args.snapshot and args.command in ("take", "adjust") and not warehouse.products.flush_snapshot():
+           warehouse.save_snapshot(args.snapshot)
+   except WarehouseError as e:
+       print(e, file=sys.stderr)
+       return 1
+   finally:
+       if args.durable:
+           warehouse.close_log()
+   return 0
 
 
 
 
 if __name__ == "__main__":
+   if len(sys.argv) > 1:
+       sys.exit(run_command(sys.argv[1:]))
    main()
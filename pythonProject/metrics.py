@@ -0,0 +1,211 @@
+"""Вбудовані метрики операцій складу.
+
+Метрики вимкнені за замовчуванням і нічого не коштують: методи, що
+вимірюються, підміняються обгортками лише на час metrics.enable(), а лічильники
+у гарячих шляхах перевіряють один атрибут metrics.enabled. Увімкнені метрики
+збирають кількість викликів і гістограми затримок кожної операції та
+лічильники на кшталт прочитаних рядків і розібраних байтів; dump() повертає
+їх текстом або JSON. Режим профілювання накопичує статистику cProfile за
+операціями, виконаними між start_profile() і stop_profile().
+"""
+from bisect import bisect_left
+import functools
+import threading
+import time
+import types
+
+# Верхні межі кошиків гістограми затримок у секундах: від 1 мкс, кожна вдвічі більша
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** power for power in range(28))
+STATS_FORMATS = ('text', 'json')
+
+
+class LatencyHistogram:
+    """Гістограма затримок з кошиками, що ростуть удвічі, з кількістю, сумою, мінімумом і максимумом."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # останній кошик - довші за всі межі
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+
+    def observe(self, seconds):
+        """Додає одне вимірювання."""
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, fraction):
+        """Повертає верхню межу кошика (не більшу за максимум), до якого потрапляє частка fraction вимірювань."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[bucket], self.maximum) if bucket < len(LATENCY_BUCKETS) else self.maximum
+        return self.maximum
+
+    def summary(self):
+        """Повертає словник з кількістю, сумою, середнім, крайніми значеннями і перцентилями."""
+        return {"count": self.count, "total": self.total, "mean": self.total / self.count if self.count else 0.0,
+                "min": self.minimum or 0.0, "max": self.maximum, "p50": self.percentile(0.5),
+                "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "buckets": {f"{bound:g}": count for bound, count in zip(LATENCY_BUCKETS, self.buckets) if count}}
+
+
+class Metrics:
+    """Лічильники та гістограми затримок операцій, що вмикаються під час роботи."""
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}  # назва -> значення
+        self.histograms = {}  # назва операції -> LatencyHistogram
+        self._instrumented = []  # (клас, назва методу, оригінальний метод)
+        self._lock = threading.Lock()
+        self._profiler = None
+
+    def instrument(self, cls, names=None):
+        """Реєструє методи класу для вимірювання; за замовчуванням - усі публічні функції.
+
+        Обгортки встановлюються лише у ввімкненому стані, тож вимкнені метрики
+        не сповільнюють виклики.
+        """
+        if names is None:
+            names = [name for name, value in vars(cls).items() if not name.startswith('_') and isinstance(value, types.FunctionType)]
+        for name in names:
+            entry = (cls, name, vars(cls)[name])
+            self._instrumented.append(entry)
+            if self.enabled:
+                self._wrap(*entry)
+
+    def _wrap(self, cls, name, function):
+        histogram_name = f"{cls.__name__}.{name}"
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(histogram_name, time.perf_counter() - start)
+
+        setattr(cls, name, timed)
+
+    def enable(self):
+        """Вмикає збір метрик."""
+        if not self.enabled:
+            for entry in self._instrumented:
+                self._wrap(*entry)
+            self.enabled = True
+
+    def disable(self):
+        """Вимикає збір метрик; зібрані значення зберігаються до reset()."""
+        if self.enabled:
+            for cls, name, function in self._instrumented:
+                setattr(cls, name, function)
+            self.enabled = False
+
+    def reset(self):
+        """Очищає лічильники й гістограми."""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def count(self, name, amount=1):
+        """Збільшує лічильник name на amount (гарячі шляхи викликають його лише при metrics.enabled)."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Додає затримку операції name до її гістограми."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def scanned(self, products, name='rows_scanned'):
+        """Перебирає products, додаючи кількість перебраних до лічильника name."""
+        scanned = 0
+        try:
+            for product in products:
+                scanned += 1
+                yield product
+        finally:
+            self.count(name, scanned)
+
+    def stats(self):
+        """Повертає словник з лічильниками і підсумками гістограм."""
+        with self._lock:
+            return {"enabled": self.enabled, "counters": dict(sorted(self.counters.items())),
+                    "operations": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}}
+
+    def dump(self, fmt='text'):
+        """Повертає зібрані метрики рядком у форматі 'text' або 'json'."""
+        if fmt not in STATS_FORMATS:
+            raise ValueError(f"Stats format must be one of {', '.join(STATS_FORMATS)}.")
+        stats = self.stats()
+        if fmt == 'json':
+            import json  # Потрібен лише для виводу, тож не сповільнює запуск
+            return json.dumps(stats, indent=2)
+        lines = [f"Metrics {'enabled' if stats['enabled'] else 'disabled'}"]
+        for name, value in stats["counters"].items():
+            lines.append(f"  {name:<36} {value}")
+        if stats["operations"]:
+            lines.append(f"  {'operation':<36} {'calls':>8} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for name, summary in stats["operations"].items():
+            lines.append(f"  {name:<36} {summary['count']:>8} {summary['mean'] * 1e3:>10.3f} "
+                         f"{summary['p50'] * 1e3:>10.3f} {summary['p99'] * 1e3:>10.3f} {summary['max'] * 1e3:>10.3f}")
+        return "\n".join(lines)
+
+    @property
+    def profiling(self):
+        """Чи увімкнено режим профілювання."""
+        return self._profiler is not None
+
+    def start_profile(self):
+        """Вмикає режим профілювання: операції у profiled() накопичують статистику cProfile."""
+        if self._profiler is None:
+            import cProfile  # Профілювальник потрібен рідко, тож не сповільнює запуск
+            self._profiler = cProfile.Profile()
+
+    def profiled(self):
+        """Контекстний менеджер, що профілює свій блок, якщо режим профілювання увімкнено."""
+        return _ProfiledBlock(self._profiler)
+
+    def stop_profile(self, sort='cumulative', limit=30):
+        """Вимикає режим профілювання і повертає найдорожчі функції текстом pstats."""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return ""
+        import io
+        import pstats
+        stream = io.StringIO()
+        try:
+            pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        except TypeError:
+            return "No profile data collected."  # Жодна операція не виконувалась у режимі профілювання
+        return stream.getvalue()
+
+
+class _ProfiledBlock:
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def __enter__(self):
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profiler is not None:
+            self._profiler.disable()
+        return False
+
+
+# Метрики процесу, на які підписані операції складу
+metrics = Metrics()
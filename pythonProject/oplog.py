@@ -0,0 +1,179 @@
+"""Журнал операцій складу з лише дописуванням (write-ahead log).
+
+Кожна операція записується компактним записом: довжина, контрольна сума
+CRC32 і дані (код операції та поля з типовими позначками). Записи
+накопичуються у буфері й скидаються на диск групами з одним fsync, тож
+запис однієї операції коштує мікросекунди. Журнал ділиться на сегменти
+(00000001.log, 00000002.log, ...), щоб старі сегменти можна було
+ущільнювати у фоні, поки нові операції дописуються в поточний.
+"""
+import os
+import struct
+import threading
+import zlib
+
+_RECORD_HEADER = struct.Struct('<II')  # довжина даних, CRC32 даних
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_LENGTH = struct.Struct('<I')
+
+SEGMENT_SUFFIX = '.log'
+
+
+def encode_record(op, fields):
+    """Кодує операцію op (0-255) з полями None, int, float або str у запис журналу."""
+    payload = bytearray((op,))
+    for value in fields:
+        if value is None:
+            payload += b'N'
+        elif isinstance(value, int):
+            payload += b'q' + _INT.pack(value)
+        elif isinstance(value, float):
+            payload += b'd' + _FLOAT.pack(value)
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            payload += b's' + _LENGTH.pack(len(data)) + data
+        else:
+            raise TypeError(f"Unsupported log field type: {type(value).__name__}")
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload):
+    """Розкодовує дані запису у пару (операція, поля)."""
+    fields = []
+    position = 1
+    while position < len(payload):
+        tag = payload[position:position + 1]
+        position += 1
+        if tag == b'N':
+            fields.append(None)
+        elif tag == b'q':
+            fields.append(_INT.unpack_from(payload, position)[0])
+            position += _INT.size
+        elif tag == b'd':
+            fields.append(_FLOAT.unpack_from(payload, position)[0])
+            position += _FLOAT.size
+        elif tag == b's':
+            length = _LENGTH.unpack_from(payload, position)[0]
+            position += _LENGTH.size
+            fields.append(payload[position:position + length].decode('utf-8'))
+            position += length
+        else:
+            raise ValueError(f"Unknown log field tag: {tag!r}")
+    return payload[0], tuple(fields)
+
+
+def read_segment(path):
+    """Генерує записи сегмента; обірваний або пошкоджений хвіст ігнорується."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    position = 0
+    while position + _RECORD_HEADER.size <= len(data):
+        length, checksum = _RECORD_HEADER.unpack_from(data, position)
+        start = position + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break  # Запис не встиг повністю потрапити на диск
+        yield decode_payload(payload)
+        position = start + length
+
+
+def segment_number(path):
+    """Повертає номер сегмента за назвою файлу."""
+    return int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+
+
+def list_segments(directory):
+    """Повертає шляхи сегментів журналу у порядку запису."""
+    names = [name for name in os.listdir(directory)
+             if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()]
+    return [os.path.join(directory, name) for name in sorted(names, key=lambda name: int(name[:-len(SEGMENT_SUFFIX)]))]
+
+
+class OperationLog:
+    """Сегментований журнал операцій з груповим скиданням на диск.
+
+    Записи потрапляють на диск, коли в буфері набирається sync_batch записів
+    або фоновим потоком кожні sync_interval секунд, тож після збою можуть
+    втратитися лише операції останнього інтервалу. flush() скидає буфер одразу.
+    """
+
+    def __init__(self, directory, sync_interval=0.005, sync_batch=512, segment_bytes=64 * 2 ** 20, first_segment=1):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._pending = 0
+        self._written = 0
+
+        # Новий сегмент не дописується після можливо обірваного хвоста старого
+        segments = list_segments(directory)
+        self._segment = max([first_segment - 1] + [segment_number(path) for path in segments]) + 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='oplog-flusher', daemon=True)
+        self._flusher.start()
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{number:08d}{SEGMENT_SUFFIX}")
+
+    @property
+    def segment(self):
+        """Номер поточного сегмента."""
+        return self._segment
+
+    @property
+    def rotation_due(self):
+        """Чи перевищив поточний сегмент розмір segment_bytes."""
+        return self._written >= self.segment_bytes
+
+    def append(self, op, *fields):
+        """Додає операцію до журналу."""
+        record = encode_record(op, fields)
+        with self._lock:
+            self._buffer += record
+            self._pending += 1
+            self._written += len(record)
+            if self._pending >= self.sync_batch:
+                self._sync_locked()
+
+    def flush(self):
+        """Записує буфер на диск і чекає fsync."""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.sync_interval):
+            if self._pending:
+                self.flush()
+
+    def rotate(self):
+        """Закриває поточний сегмент, починає новий і повертає шляхи закритих сегментів."""
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+            sealed = [path for path in list_segments(self.directory) if segment_number(path) <= self._segment]
+            self._segment += 1
+            self._written = 0
+            self._file = open(self._segment_path(self._segment), 'ab')
+        return sealed
+
+    def close(self):
+        """Скидає буфер на диск і зупиняє фоновий потік."""
+        self._stopped.set()
+        self._flusher.join()
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
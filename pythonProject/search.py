@@ -0,0 +1,260 @@
+"""Повнотекстовий пошук продуктів за назвою, виробником та призначенням.
+
+Значення полів діляться на слова (токени) у нижньому регістрі. Відсортований
+список токенів відповідає на запити за префіксом за O(log n + k), як
+префіксне дерево, а інвертований індекс триграм токенів дає кандидатів для
+пошуку підрядка та нечіткого пошуку з відстанню редагування. Індекс, як і
+вторинні індекси складу, підписується на сховище і оновлюється при кожній зміні.
+"""
+import heapq
+import re
+from itertools import islice
+
+from indexes import SortedKeyList
+
+SEARCH_MODES = ('prefix', 'substring', 'fuzzy')
+# Поля, що індексуються, і вага збігу в кожному з них
+SEARCH_FIELDS = (('name', 1.0), ('producer', 0.6), ('purpose', 0.4))
+MAX_MATCHED_TOKENS = 2000  # Межа кількості токенів, що розглядаються для одного слова запиту
+SCAN_MISSES = 64  # Скільки кандидатів поспіль може не підійти, перш ніж списки перетинаються множинами
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Повертає слова тексту в нижньому регістрі."""
+    return _TOKEN.findall(text.casefold()) if text else []
+
+
+def trigrams(token):
+    """Повертає триграми токена, доповненого з обох боків символом '$'."""
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(first, second, limit):
+    """Відстань Левенштейна між рядками або limit + 1, якщо вона більша за limit."""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SearchIndex:
+    """Інвертований індекс слів полів продуктів з пошуком за префіксом, підрядком і нечітким пошуком.
+
+    Списки продуктів зберігаються окремо для кожного поля, тож збіги
+    перебираються від найвагоміших, і пошук зупиняється, щойно решта збігів
+    не може потрапити до limit найкращих. Однакові оцінки впорядковуються
+    за порядком перегляду: спершу продукти вагомішого збігу, далі за порядком
+    додавання, тож межа зупинки не залежить від нічиїх.
+    """
+
+    def __init__(self, products=()):
+        self._indexed = {}  # id(продукту) -> [(токен, номер поля)], за якими він проіндексований
+        self._postings = [{} for _ in SEARCH_FIELDS]  # по полях: токен -> {id(продукту): продукт}
+        self._grams = {}  # триграма -> множина токенів
+        for product in products:
+            self._index_product(product)
+        # Словник токенів і триграм будуємо один раз, а не вставками по одному токену
+        tokens = set().union(*self._postings)
+        self._tokens = SortedKeyList(tokens)
+        for token in tokens:
+            self._add_grams(token)
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def _has_token(self, token):
+        return any(token in postings for postings in self._postings)
+
+    def _add_grams(self, token):
+        for gram in trigrams(token):
+            self._grams.setdefault(gram, set()).add(token)
+
+    def _add_token(self, token):
+        self._tokens.add(token)
+        self._add_grams(token)
+
+    def _drop_token(self, token):
+        self._tokens.remove(token)
+        for gram in trigrams(token):
+            tokens = self._grams[gram]
+            tokens.discard(token)
+            if not tokens:
+                del self._grams[gram]
+
+    def _index_product(self, product, new_token=None):
+        """Додає продукт до списків полів; new_token викликається для токенів, яких ще немає в індексі."""
+        key = id(product)
+        entries = []
+        for bit, (field, _) in enumerate(SEARCH_FIELDS):
+            postings = self._postings[bit]
+            for token in dict.fromkeys(tokenize(getattr(product, field, None))):
+                products = postings.get(token)
+                if products is None:
+                    if new_token is not None and not self._has_token(token):
+                        new_token(token)
+                    products = postings[token] = {}
+                products[key] = product
+                entries.append((token, bit))
+        self._indexed[key] = entries
+
+    def product_added(self, product):
+        self._index_product(product, self._add_token)
+
+    def product_removed(self, product):
+        entries = self._indexed.pop(id(product), None)
+        if entries is None:
+            return
+        for token, bit in entries:
+            postings = self._postings[bit]
+            products = postings[token]
+            del products[id(product)]
+            if not products:
+                del postings[token]
+                if not self._has_token(token):
+                    self._drop_token(token)
+
+    def product_changed(self, product, field, old_value):
+        if any(field == indexed for indexed, _ in SEARCH_FIELDS):
+            self.product_removed(product)
+            self.product_added(product)
+
+    def _prefix_matches(self, word):
+        # Усі токени з префіксом word лежать у відсортованому списку між word і word + найбільший символ
+        tokens = islice(self._tokens.irange(word, word + '\U0010ffff'), MAX_MATCHED_TOKENS)
+        # Повний збіг важить найбільше, коротші продовження - більше за довші
+        return {token: 1.0 if token == word else 0.5 + 0.4 * len(word) / len(token) for token in tokens}
+
+    def _substring_matches(self, word):
+        if len(word) < 3:
+            candidates = self._tokens  # Коротке слово не містить цілої триграми: перебір токенів
+        else:
+            # Кожна триграма слова є і серед триграм токена, що його містить
+            sets = sorted((self._grams.get(word[i:i + 3], set()) for i in range(len(word) - 2)), key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        matches = {}
+        for token in candidates:
+            if word in token:
+                position_bonus = 0.6 if token.startswith(word) else 0.3
+                matches[token] = 1.0 if token == word else position_bonus + 0.3 * len(word) / len(token)
+                if len(matches) >= MAX_MATCHED_TOKENS:
+                    break
+        return matches
+
+    def _fuzzy_matches(self, word):
+        limit = 1 if len(word) <= 8 else 2
+        grams = trigrams(word)
+        # Кожна правка змінює не більше трьох триграм, тож схожий токен має хоча б
+        # required спільних триграм і хоча б одну з len(grams) - required + 1 найрідших
+        required = max(1, len(grams) - 3 * limit)
+        rarest = sorted(grams, key=lambda gram: len(self._grams.get(gram, ())))[:len(grams) - required + 1]
+        matches = {}
+        for token in set().union(*(self._grams.get(gram, ()) for gram in rarest)):
+            if abs(len(token) - len(word)) <= limit and len(trigrams(token) & grams) >= required:
+                distance = edit_distance(word, token, limit)
+                if distance <= limit:
+                    matches[token] = 1.0 - 0.3 * distance
+        return matches
+
+    def _word_postings(self, matches):
+        """Повертає списки продуктів збігів слова як [(оцінка збігу, {id: продукт})] від найвагоміших."""
+        pairs = []
+        for postings, (_, weight) in zip(self._postings, SEARCH_FIELDS):
+            pairs += [(token_score * weight, postings[token]) for token, token_score in matches.items()
+                      if token in postings]
+        pairs.sort(key=lambda pair: -pair[0])
+        return pairs
+
+    def _word_score(self, key, matches, pairs):
+        # Менше з двох: перевірити списки збігів слова чи перебрати токени продукту
+        entries = self._indexed[key]
+        if len(pairs) <= len(entries):
+            return next((score for score, products in pairs if key in products), 0.0)
+        return max(matches.get(token, 0.0) * SEARCH_FIELDS[bit][1] for token, bit in entries)
+
+    def _rest_score(self, key, rest):
+        score = 0.0
+        for pairs, matches in rest:
+            word_score = self._word_score(key, matches, pairs)
+            if not word_score:
+                return 0.0
+            score += word_score
+        return score
+
+    def _candidates(self, products, rest, seen):
+        """Повертає (продукт, оцінка решти слів) продуктів products, що відповідають усім словам rest.
+
+        Продукти перевіряються по одному в порядку списку, тож пошук може
+        зупинитися після перших збігів. Якщо SCAN_MISSES кандидатів поспіль не
+        підійшли, збіги рідкісні: решта списку перетинається зі списками інших
+        слів як множини, а знайдені продукти видаються в тому ж порядку.
+        """
+        misses = 0
+        for key, product in products.items():
+            if key in seen:
+                continue
+            seen.add(key)
+            score = self._rest_score(key, rest)
+            if score or not rest:
+                misses = 0
+                yield product, score
+            else:
+                misses += 1
+                if misses >= SCAN_MISSES:
+                    break
+        else:
+            return
+        keys = products.keys()
+        for pairs, _ in rest:
+            keys = set().union(*(keys & other.keys() for _, other in pairs))
+        keys -= seen
+        for key in filter(keys.__contains__, products) if len(keys) > 1 else keys:
+            seen.add(key)
+            yield products[key], self._rest_score(key, rest)
+
+    def search(self, query, mode='prefix', limit=10):
+        """Повертає до limit продуктів, що відповідають усім словам запиту, від найкращих збігів.
+
+        mode - 'prefix' (слова запиту - початки слів), 'substring' (частини
+        слів) або 'fuzzy' (слова з помилками: одна правка, для слів довших
+        за 8 літер - дві).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}.")
+        match = {'prefix': self._prefix_matches, 'substring': self._substring_matches,
+                 'fuzzy': self._fuzzy_matches}[mode]
+        matched = [match(word) for word in dict.fromkeys(tokenize(query))]
+        if not matched or not all(matched) or limit <= 0:
+            return []
+
+        # Списки перетинаємо від найрідшого слова: його продукти - кандидати, а решту слів
+        # перевіряємо від рідших, тож більшість кандидатів відсіюється першою ж перевіркою
+        words = sorted(((self._word_postings(matches), matches) for matches in matched),
+                       key=lambda word: sum(len(products) for _, products in word[0]))
+        first, rest = words[0][0], words[1:]
+        # Оцінка кожного іншого слова не перевищує його найвагомішого збігу
+        rest_bound = sum(pairs[0][0] for pairs, _ in rest)
+        best = []  # мін-купа (оцінка, -порядковий номер, продукт) з limit найкращих
+        seen = set()
+        for pair_score, products in first:
+            # Пізніші кандидати програють нічиї, тож рівна межа вже не покращить результат
+            if len(best) >= limit and pair_score + rest_bound <= best[0][0]:
+                break
+            for product, score in self._candidates(products, rest, seen):
+                entry = (pair_score + score, -len(seen), product)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry[:2] > best[0][:2]:
+                    heapq.heapreplace(best, entry)
+                if len(best) >= limit and pair_score + rest_bound <= best[0][0]:
+                    break
+        return [product for _, _, product in sorted(best, key=lambda entry: entry[:2], reverse=True)]
@@ -0,0 +1,156 @@
+"""Асинхронний TCP-сервер складу з рядковим протоколом.
+
+Кожен запит - один рядок, поля розділені табуляцією (назви можуть містити
+пробіли), відповідь - "OK\t<результат>" або "ERR\t<тип помилки>\t<повідомлення>":
+
+    FIND\t<назва>               -> OK\t<кількість знайдених>\t<загальна кількість>
+    TOTAL\t<назва>              -> OK\t<загальна кількість>
+    TAKE\t<назва>\t<кількість>  -> OK\t<залишок>
+    ADJUST\t<назва>\t<зміна>    -> OK\t<нова кількість>
+    BATCH\t<назва>=<зміна>\t... -> OK\t<кількість змінених продуктів>
+    PING                        -> OK\tPONG
+
+Запуск: python server.py --file text.txt --port 8765
+"""
+import argparse
+import asyncio
+import zlib
+from contextlib import AsyncExitStack
+
+from main import Warehouse, WarehouseError, configure_logging
+
+
+class StripedLocks:
+    """Набір asyncio.Lock, між якими назви продуктів розподіляються за хешем.
+
+    Операції над різними продуктами потрапляють здебільшого у різні смуги й
+    не чекають одна на одну, а операції над одним продуктом виконуються по черзі.
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    def _stripe(self, name):
+        # crc32 не залежить від PYTHONHASHSEED, тож розподіл відтворюваний
+        return zlib.crc32(name.encode('utf-8')) % len(self._locks)
+
+    def for_name(self, name):
+        """Повертає замок смуги, до якої належить назва."""
+        return self._locks[self._stripe(name)]
+
+    async def acquire_many(self, names, stack):
+        """Захоплює замки всіх смуг для назв у фіксованому порядку, щоб уникнути взаємоблокувань."""
+        for stripe in sorted({self._stripe(name) for name in names}):
+            await stack.enter_async_context(self._locks[stripe])
+
+
+class WarehouseServer:
+    """TCP-сервер, що виконує операції складу з блокуванням на рівні продуктів.
+
+    Якщо до складу підключено журнал операцій і sync_log увімкнено, відповідь
+    надсилається лише після запису змін на диск; очікування fsync виконується
+    у пулі потоків і не блокує запити до інших продуктів.
+    """
+
+    def __init__(self, warehouse, host='127.0.0.1', port=0, stripes=64, sync_log=False):
+        self.warehouse = warehouse
+        self.host = host
+        self.port = port
+        self.sync_log = sync_log
+        self._locks = StripedLocks(stripes)
+        self._server = None
+
+    async def start(self):
+        """Запускає сервер; якщо port дорівнює 0, вибирається вільний порт."""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.execute(line.decode('utf-8').rstrip('\r\n'))
+                writer.write(response.encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def execute(self, request):
+        """Виконує один запит протоколу і повертає рядок відповіді."""
+        command, *args = request.split('\t')
+        command = command.upper()
+        try:
+            if command == 'PING':
+                return 'OK\tPONG'
+            if command == 'FIND':
+                name, = args
+                found = self.warehouse.find(name)
+                return f"OK\t{len(found)}\t{sum(product.quantity for product in found)}"
+            if command == 'TOTAL':
+                name, = args
+                return f"OK\t{self.warehouse.total_quantity(name)}"
+            if command in ('TAKE', 'ADJUST'):
+                name, amount = args
+                async with self._locks.for_name(name):
+                    operation = self.warehouse.take if command == 'TAKE' else self.warehouse.adjust
+                    result = operation(name, int(amount))
+                    await self._sync()
+                return f"OK\t{result}"
+            if command == 'BATCH':
+                movements = []
+                for movement in args:
+                    name, _, delta = movement.rpartition('=')
+                    movements.append((name, int(delta)))
+                async with AsyncExitStack() as stack:
+                    await self._locks.acquire_many([name for name, _ in movements], stack)
+                    result = self.warehouse.apply_batch(movements)
+                    await self._sync()
+                return f"OK\t{len(result)}"
+            return f"ERR\tUnknownCommand\tUnknown command '{command}'."
+        except WarehouseError as e:
+            return f"ERR\t{type(e).__name__}\t{e}"
+        except ValueError:
+            return f"ERR\tProtocolError\tInvalid arguments for '{command}'."
+
+    async def _sync(self):
+        if self.sync_log:
+            await asyncio.get_running_loop().run_in_executor(None, self.warehouse.flush_log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse TCP server")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="text file with products")
+    source.add_argument("--snapshot", help="binary snapshot with products")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.snapshot:
+        warehouse = Warehouse.open_snapshot(args.snapshot)
+    else:
+        warehouse = Warehouse()
+        if args.file:
+            warehouse.load_products_from_file(args.file)
+
+    server = WarehouseServer(warehouse, args.host, args.port)
+    print(f"Serving warehouse on {args.host}:{args.port}")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
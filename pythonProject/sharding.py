@@ -0,0 +1,371 @@
+"""Розподілений між кількома складами (шардами) облік запасів.
+
+ShardedWarehouse ділить продукти між шардами - окремими Warehouse - за
+майданчиком (partition='site', кожен шард - фізичний склад) або за хешем
+назви (partition='hash', усі партії одного продукту потрапляють в один шард).
+Шард може працювати у власному процесі-обробнику, тож кожен процес тримає в
+пам'яті лише свою частину продуктів. Запити до кількох шардів спершу
+розсилаються всім, а потім збираються відповіді, тож шарди виконують їх
+паралельно; результати об'єднуються у батьківському процесі.
+
+Приклад:
+
+    with ShardedWarehouse(['Kyiv', 'Lviv']) as sites:
+        sites.load_products_from_file('kyiv.txt', site='Kyiv')
+        sites.load_products_from_file('lviv.txt', site='Lviv')
+        sites.transfer('Apple', 20, 'Kyiv', 'Lviv')
+        print(sites.total_quantity('Apple'))
+"""
+import multiprocessing
+import zlib
+from functools import partial
+
+from indexes import RollupTotals
+from main import LOAD_BATCH_SIZE, Product, ValidationError, Warehouse, WarehouseError, product_from_fields, \
+    product_to_fields, validate_product_rows
+
+PARTITIONS = ('site', 'hash')
+
+
+def shard_of(name, shards):
+    """Повертає номер шарду для назви продукту; crc32 не залежить від PYTHONHASHSEED."""
+    return zlib.crc32(name.encode('utf-8')) % shards
+
+
+def product_row(product, quantity=None):
+    """Повертає поля продукту у порядку рядка файлу, придатні для Warehouse.add_rows."""
+    _, *row = product_to_fields(product)
+    if quantity is not None:
+        row[2] = quantity
+    return row
+
+
+def _detach(result):
+    """Замінює представлення продуктів колонкових сховищ і SQLite звичайними продуктами для передачі між процесами."""
+    if isinstance(result, Product):
+        return product_from_fields(product_to_fields(result))
+    if isinstance(result, list):
+        return [_detach(item) for item in result]
+    return result
+
+
+def _ingest_lines(warehouse, lines, line_numbers):
+    """Розбирає і додає у склад шарду рядки файлу; невірні рядки пропускаються.
+
+    Повертає (кількість доданих продуктів, [(номер рядка, повідомлення)]).
+    """
+    report = validate_product_rows([line.split(',') for line in lines], start=0)
+    warehouse.products.extend(product for _, product in report.valid)
+    return len(report.valid), [(line_numbers[error.row], error.message) for error in report.errors]
+
+
+def _shard_worker(connection, store_factory):
+    """Цикл процесу-обробника: виконує (метод, аргументи) над своїм складом до отримання None.
+
+    Метод - назва методу Warehouse або функція модуля, що приймає склад першим аргументом.
+    """
+    warehouse = Warehouse(store_factory() if store_factory is not None else None)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, args, kwargs = request
+        try:
+            target = getattr(warehouse, method) if isinstance(method, str) else partial(method, warehouse)
+            reply = (True, _detach(target(*args, **kwargs)))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            connection.send(reply)
+        except Exception as e:
+            # Результат або помилку не вдалося передати (наприклад, їх не можна серіалізувати)
+            connection.send((False, WarehouseError(f"Shard reply for '{method}' failed: {type(e).__name__}: {e}")))
+    connection.close()
+
+
+class _Completed:
+    """Результат виклику, що вже виконався в поточному процесі."""
+
+    def __init__(self, function, args, kwargs):
+        try:
+            self._value, self._failed = function(*args, **kwargs), False
+        except Exception as e:
+            self._value, self._failed = e, True
+
+    def result(self):
+        if self._failed:
+            raise self._value
+        return self._value
+
+
+class _Pending:
+    """Відповідь процесу-обробника, яку ще треба прочитати з каналу."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def result(self):
+        succeeded, value = self._connection.recv()
+        if not succeeded:
+            raise value
+        return value
+
+
+class LocalShard:
+    """Шард у поточному процесі: виклики виконуються одразу."""
+
+    def __init__(self, store_factory=None):
+        self.warehouse = Warehouse(store_factory() if store_factory is not None else None)
+
+    def submit(self, method, *args, **kwargs):
+        target = getattr(self.warehouse, method) if isinstance(method, str) else partial(method, self.warehouse)
+        return _Completed(target, args, kwargs)
+
+    def close(self):
+        pass
+
+
+class ProcessShard:
+    """Шард у процесі-обробнику; submit надсилає запит і не чекає відповіді.
+
+    Відповіді читаються у порядку запитів, тож кожен результат submit треба
+    отримати (result()) до наступного запиту до цього шарду.
+    """
+
+    def __init__(self, store_factory=None, context=None):
+        context = context or multiprocessing.get_context()
+        self._connection, child = context.Pipe()
+        self._process = context.Process(target=_shard_worker, args=(child, store_factory), daemon=True)
+        self._process.start()
+        child.close()
+
+    def submit(self, method, *args, **kwargs):
+        self._connection.send((method, args, kwargs))
+        return _Pending(self._connection)
+
+    def close(self):
+        if self._process.is_alive():
+            self._connection.send(None)
+            self._process.join()
+        self._connection.close()
+
+
+class ShardedWarehouse:
+    """Склад, продукти якого розподілені між кількома шардами Warehouse.
+
+    sites - назви шардів (майданчиків); partition - 'site' (продукт додається
+    у вказаний майданчик) або 'hash' (майданчик визначається хешем назви);
+    processes - чи запускати кожен шард в окремому процесі; store_factory -
+    функція без аргументів, що створює сховище шарду (наприклад, ColumnarProductStore).
+    """
+
+    def __init__(self, sites, partition='site', processes=True, store_factory=None):
+        if partition not in PARTITIONS:
+            raise ValidationError(f"Partition must be one of {', '.join(PARTITIONS)}.")
+        self.sites = list(sites)
+        if not self.sites or len(set(self.sites)) != len(self.sites):
+            raise ValidationError("Sites must be a non-empty list of unique names.")
+        self.partition = partition
+        self._shards = {}
+        try:
+            for site in self.sites:
+                self._shards[site] = ProcessShard(store_factory) if processes else LocalShard(store_factory)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Зупиняє процеси-обробники шардів."""
+        for shard in self._shards.values():
+            shard.close()
+        self._shards = {}
+
+    def call(self, site, method, *args, **kwargs):
+        """Викликає метод Warehouse у шарді site і повертає результат."""
+        return self._shard(site).submit(method, *args, **kwargs).result()
+
+    def fan_out(self, method, *args, sites=None, **kwargs):
+        """Викликає метод Warehouse паралельно в шардах sites (за замовчуванням - у всіх).
+
+        Повертає словник майданчик -> результат; якщо хоча б один шард
+        піднімає помилку, вона пробрасується після збору всіх відповідей.
+        """
+        sites = self.sites if sites is None else sites
+        pending = [(site, self._shard(site).submit(method, *args, **kwargs)) for site in sites]
+        results = {}
+        error = None
+        for site, reply in pending:
+            try:
+                results[site] = reply.result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def _shard(self, site):
+        shard = self._shards.get(site)
+        if shard is None:
+            raise ValidationError(f"Unknown site '{site}'.")
+        return shard
+
+    def site_of(self, name):
+        """Повертає майданчик продукту при розподілі за хешем назви."""
+        return self.sites[shard_of(name, len(self.sites))]
+
+    def _sites_for(self, name, site=None):
+        """Майданчики, у яких може бути продукт з назвою name."""
+        if site is not None:
+            return [site]
+        return [self.site_of(name)] if self.partition == 'hash' else self.sites
+
+    def _target(self, name, site):
+        if self.partition == 'hash':
+            return self.site_of(name)
+        if site is None:
+            raise ValidationError("Site is required when products are partitioned by site.")
+        return site
+
+    def add(self, product, site=None):
+        """Додає продукт у шард майданчика site (або шард за хешем назви) і повертає майданчик."""
+        site = self._target(product.name, site)
+        self.call(site, 'add', product)
+        return site
+
+    def add_rows(self, rows, site=None):
+        """Додає пакет рядків продуктів; при розподілі за хешем рядки розсилаються шардам паралельно.
+
+        Кожен шард додає свою частину атомарно (Warehouse.add_rows). Повертає кількість доданих продуктів.
+        """
+        if self.partition == 'site':
+            return len(self.call(self._target(None, site), 'add_rows', list(rows)))
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.site_of(row[0]), []).append(row)
+        pending = [self._shard(site).submit('add_rows', group) for site, group in groups.items()]
+        return sum(len(reply.result()) for reply in pending)
+
+    def load_products_from_file(self, file_path, site=None, batch_size=LOAD_BATCH_SIZE):
+        """Завантажує продукти з файлу і повертає кількість завантажених.
+
+        При розподілі за майданчиком файл читає процес шарду site. При
+        розподілі за хешем тут з рядків лише виділяються назви, а рядки розсилаються
+        шардам пакетами, а розбирають і перевіряють їх шарди паралельно;
+        невірні рядки пропускаються з повідомленням, як у Warehouse.load_products_from_file.
+        """
+        if self.partition == 'site':
+            return self.call(self._target(None, site), 'load_products_from_file', file_path, batch_size)
+        loaded = 0
+        errors = []
+        batches = {site: ([], []) for site in self.sites}  # майданчик -> (рядки, їхні номери у файлі)
+        pending = {}  # майданчик -> відповідь на попередній пакет
+
+
+        def send(site):
+            nonlocal loaded
+            if site in pending:
+                count, batch_errors = pending.pop(site).result()
+                loaded += count
+                errors.extend(batch_errors)
+            lines, line_numbers = batches[site]
+            if lines:
+                pending[site] = self._shard(site).submit(_ingest_lines, lines, line_numbers)
+                batches[site] = ([], [])
+
+
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                site = self.site_of(line.partition(',')[0])
+                lines, line_numbers = batches[site]
+                lines.append(line)
+                line_numbers.append(line_number)
+                if len(lines) >= batch_size:
+                    send(site)
+        for site in self.sites:
+            send(site)
+        for site in list(pending):
+            send(site)
+        for line_number, message in sorted(errors):
+            print(f"Line {line_number}: {message}")
+        return loaded
+
+    def find(self, name):
+        """Повертає словник майданчик -> продукти з назвою name для майданчиків, де вони є."""
+        return {site: products for site, products in self.fan_out('find', name, sites=self._sites_for(name)).items()
+                if products}
+
+    def take(self, name, quantity, site=None):
+        """Бере quantity одиниць продукту зі складу майданчика site і повертає залишок."""
+        return self.call(self._target(name, site), 'take', name, quantity)
+
+    def transfer(self, name, quantity, source, target):
+        """Переміщує quantity одиниць продукту з майданчика source на target і повертає залишок на source.
+
+        Якщо на target немає продукту з такою назвою, там створюється партія з
+        тими ж полями. Якщо додати на target не вдалося, одиниці повертаються на source.
+        """
+        if self.partition != 'site':
+            raise ValidationError("Transfers are only supported when products are partitioned by site.")
+        if source == target:
+            raise ValidationError("Source and target sites must differ.")
+        self._shard(target)
+        product = self.call(source, 'get', name)
+        remaining = self.call(source, 'take', name, quantity)
+        try:
+            if self.call(target, 'find', name):
+                self.call(target, 'adjust', name, quantity)
+            else:
+                self.call(target, 'add_rows', [product_row(product, quantity)])
+        except WarehouseError:
+            self.call(source, 'adjust', name, quantity)
+            raise
+        return remaining
+
+    def quantities(self, name):
+        """Повертає словник майданчик -> загальна кількість продукту, опитуючи шарди паралельно."""
+        return {site: quantity for site, quantity in
+                self.fan_out('total_quantity', name, sites=self._sites_for(name)).items() if quantity}
+
+    def total_quantity(self, name):
+        """Повертає загальну кількість продукту на всіх майданчиках."""
+        return sum(self.quantities(name).values())
+
+    def stock_totals(self, dimension, key):
+        """Повертає RollupTotals групи key у вимірі dimension, об'єднані з усіх шардів."""
+        return _merge_totals(self.fan_out('stock_totals', dimension, key).values())
+
+    def stock_groups(self, dimension):
+        """Повертає словник група -> RollupTotals для виміру dimension, об'єднаний з усіх шардів."""
+        merged = {}
+        for groups in self.fan_out('stock_groups', dimension).values():
+            for key, totals in groups.items():
+                merged[key] = _merge_totals((merged[key], totals)) if key in merged else totals
+        return merged
+
+    def tick(self, days=1):
+        """Переводить годинник кожного шарду на days днів і повертає словник майданчик -> уцінені продукти."""
+        return self.fan_out('tick', days)
+
+    def product_counts(self):
+        """Повертає словник майданчик -> кількість продуктів у шарді."""
+        return {site: sum(totals.count for totals in groups.values())
+                for site, groups in self.fan_out('stock_groups', 'category').items()}
+
+
+def _merge_totals(totals):
+    count, quantity, value, volume = 0, 0, 0.0, 0.0
+    for item in totals:
+        count += item.count
+        quantity += item.quantity
+        value += item.value
+        volume += item.volume
+    return RollupTotals(count, quantity, value, volume)
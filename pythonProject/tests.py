@@ -1,8 +1,18 @@
+import asyncio
+import json
+import os
+import tempfile
 import unittest
 from io import StringIO
 from unittest.mock import patch
 from tabulate import tabulate
-from main import Product, FoodProduct, NonFoodProduct, Warehouse
+import oplog
+from indexes import Rollups
+from server import WarehouseServer
+from main import Product, FoodProduct, NonFoodProduct, Warehouse, iter_products, ProductParseError, \
+    split_file_chunks, ColumnarProductStore, ExpiryDiscountRule, ProductNotFoundError, InvalidQuantityError, \
+    ValidationError, BatchError, parse_product_line, SQLiteProductStore, \
+    validate_product_rows, COST_FIELD, run_command, load_translation, ROLLUP_DIMENSIONS
 
 
 class TestWarehouseManagementSystem(unittest.TestCase):
@@ -36,7 +46,7 @@ class TestWarehouseManagementSystem(unittest.TestCase):
         self.assertEqual(non_food_product.cost, 15.0)
         self.assertEqual(non_food_product.quantity, 5)
         self.assertEqual(non_food_product.producer, 'NonFoodProducer')
-        self.assertEqual(non_food_product.dimensions, 120)
+        self.assertEqual(non_food_product.dimensions, (120, 0, 0))
         self.assertEqual(non_food_product.purpose, 'Purpose')
 
         # Test decrease_cost method
@@ -67,6 +77,800 @@ class TestWarehouseManagementSystem(unittest.TestCase):
 
         # Other methods in warehouse can be tested in a similar manner
 
+    def test_name_index(self):
+        warehouse = Warehouse()
+        apple = FoodProduct('Apple', 2.0, 100, 'ProducerA', 10)
+        second_apple = FoodProduct('Apple', 2.5, 30, 'ProducerB', 5)
+        chair = NonFoodProduct('Chair', 50.0, 10, 'ProducerB', 120, 'Furniture')
+        warehouse.products.append(apple)
+        warehouse.products.append(chair)
+        warehouse.products.append(second_apple)
+
+        # Test lookups with duplicate names
+        self.assertEqual(warehouse.products.find('Apple'), [apple, second_apple])
+        self.assertIs(warehouse.products.first('Chair'), chair)
+        self.assertEqual(warehouse.products.find('Table'), [])
+
+        # Test that sorting keeps the index consistent
+        with patch('builtins.input', return_value='asc'), patch('sys.stdout', new_callable=StringIO):
+            warehouse.sort_products()
+        self.assertEqual(list(warehouse.products), [second_apple, apple, chair])
+        self.assertIs(warehouse.products.first('Apple'), second_apple)
+
+        # Test removing a product
+        with patch('builtins.input', return_value='Apple'), patch('sys.stdout', new_callable=StringIO):
+            warehouse.remove_product()
+        self.assertEqual(warehouse.products.find('Apple'), [apple])
+        self.assertEqual(len(warehouse.products), 2)
+
+        # Test total quantity over the index
+        with patch('builtins.input', return_value='Apple'), patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            warehouse.get_total_quantity_of_product()
+            self.assertIn("100", mock_stdout.getvalue())
+
+    def test_streaming_loader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'products.txt')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write("# Food\nApple,2.5,100,Farm Fresh,10\nBroken,row\n\n"
+                           "Chair,50,10,Furniture Co.,90,Home\nMilk,2,80,Farmers Coop,3\n")
+
+            # Test the generator API without a warehouse
+            with self.assertRaises(ProductParseError) as context:
+                list(iter_products(file_path))
+            self.assertEqual(context.exception.line_number, 3)
+            errors = []
+            names = [product.name for product in iter_products(file_path, on_error=errors.append)]
+            self.assertEqual(names, ['Apple', 'Chair', 'Milk'])
+            self.assertEqual([error.line_number for error in errors], [3])
+
+            # Test batched loading with progress reporting
+            warehouse = Warehouse()
+            progress = []
+            with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+                loaded = warehouse.load_products_from_file(file_path, batch_size=2,
+                                                           progress=lambda lines, count: progress.append(count))
+                self.assertIn("Line 3", mock_stdout.getvalue())
+            self.assertEqual(loaded, 3)
+            self.assertEqual(progress, [2, 3])
+            self.assertIsInstance(warehouse.products.first('Chair'), NonFoodProduct)
+
+    def test_parallel_loader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'products.txt')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                for i in range(200):
+                    file.write(f"Food{i},1.5,{i},Farm,{i % 30}\n" if i % 3 else f"Item{i},10,{i},Factory,{i},Home\n")
+                file.write("Broken,row\n")
+
+            # Test that chunks cover the whole file on line boundaries
+            chunks = split_file_chunks(file_path, 7)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], os.path.getsize(file_path))
+            with open(file_path, 'rb') as file:
+                data = file.read()
+            self.assertTrue(all(data[start - 1:start] == b'\n' for start, _ in chunks[1:]))
+
+            # Test that parallel loading keeps the order and the 5/6 field dispatch
+            sequential, parallel = Warehouse(), Warehouse()
+            with patch('sys.stdout', new_callable=StringIO):
+                sequential.load_products_from_file(file_path)
+            with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+                parallel.load_products_from_file(file_path, workers=2)
+                self.assertIn("Line 201", mock_stdout.getvalue())
+            self.assertEqual([(type(product), product.name) for product in parallel.products],
+                             [(type(product), product.name) for product in sequential.products])
+
+            # Test that products are built in this process, sharing strings across chunks
+            products = list(parallel.products)
+            self.assertEqual(products[0].dimensions, sequential.products.first('Item0').dimensions)
+            self.assertIs(products[1].producer, products[-1].producer)
+
+            # Test that both loaders split lines only on '\n' and report the same line numbers
+            with open(file_path, 'w', encoding='utf-8', newline='') as file:
+                file.write("Mi\x85lk,2,10,Farm,5\r\nOld\rrow,1,1,Farm,1\nBroken,row\nTea,1,1,Farm,1")
+            for workers in (None, 2):
+                warehouse = Warehouse()
+                lines = []
+                with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+                    warehouse.load_products_from_file(file_path, progress=lambda read, _: lines.append(read),
+                                                      workers=workers)
+                self.assertEqual([product.name for product in warehouse.products], ['Mi\x85lk', 'Old\rrow', 'Tea'])
+                self.assertEqual([line.split(':')[0] for line in mock_stdout.getvalue().splitlines()[:-1]],
+                                 ["Line 3"])
+                self.assertEqual(lines[-1], 4)
+
+    def test_columnar_store(self):
+        warehouse = Warehouse(ColumnarProductStore())
+        warehouse.products.append(FoodProduct('Apple', 2.0, 100, 'ProducerA', 10))
+        warehouse.products.append(NonFoodProduct('Chair', 50.0, 10, 'ProducerB', 120, 'Furniture'))
+        warehouse.products.append(FoodProduct('Milk', 1.5, 40, 'ProducerA', 3))
+
+        # Test that views behave like products
+        apple = warehouse.products.first('Apple')
+        self.assertIsInstance(apple, FoodProduct)
+        self.assertEqual((apple.cost, apple.quantity, apple.producer, apple.expiry_date), (2.0, 100, 'ProducerA', 10))
+        chair = warehouse.products.first('Chair')
+        self.assertEqual((chair.dimensions, chair.purpose), ((120, 0, 0), 'Furniture'))
+        chair.decrease_cost()
+        self.assertAlmostEqual(warehouse.products.first('Chair').cost, 55.0)
+
+        # Test showing product groups and updating through the warehouse
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            warehouse.show_product_groups()
+            self.assertIn("Milk", mock_stdout.getvalue())
+        with patch('builtins.input', side_effect=['Apple', '3', '']), patch('sys.stdout', new_callable=StringIO):
+            warehouse.update_product()
+        self.assertEqual((apple.cost, apple.quantity), (3.0, 100))
+
+        # Test that sorting keeps views valid and removed views stay readable
+        with patch('builtins.input', return_value='desc'), patch('sys.stdout', new_callable=StringIO):
+            warehouse.sort_products()
+        self.assertEqual([product.name for product in warehouse.products], ['Apple', 'Milk', 'Chair'])
+        self.assertEqual(apple.quantity, 100)
+        warehouse.products.remove(apple)
+        self.assertEqual(len(warehouse.products), 2)
+        self.assertNotIn(apple, warehouse.products)
+        self.assertEqual((apple.name, apple.cost), ('Apple', 3.0))
+        self.assertIsNone(warehouse.products.first('Apple'))
+
+    def test_reprice_all(self):
+        for store in (None, ColumnarProductStore()):
+            warehouse = Warehouse(store)
+            warehouse.products.extend([
+                FoodProduct('Milk', 2.0, 10, 'Farm', 0),
+                FoodProduct('Rice', 1.0, 5, 'Market', 12),
+                NonFoodProduct('Table', 100.0, 2, 'Furniture Co.', 120, 'Home'),
+                NonFoodProduct('Phone', 600.0, 5, 'Electronics Inc.', 10, 'Communication'),
+            ])
+
+            # Test the default expiry discount and oversize surcharge rules
+            summary = warehouse.reprice_all()
+            self.assertEqual((summary.checked, summary.changed), (4, 2))
+            self.assertAlmostEqual(warehouse.products.first('Milk').cost, 1.8)
+            self.assertAlmostEqual(warehouse.products.first('Table').cost, 110.0)
+            self.assertAlmostEqual(warehouse.products.first('Rice').cost, 1.0)
+            self.assertAlmostEqual(summary.value_delta, -2.0 + 20.0)
+
+            # Test a custom rule set
+            summary = warehouse.reprice_all([ExpiryDiscountRule(days=12, factor=0.5)])
+            self.assertEqual(summary.changed, 2)
+            self.assertAlmostEqual(warehouse.products.first('Rice').cost, 0.5)
+
+        # Test that "AxBxC" dimensions are parsed once and reused
+        box = NonFoodProduct('Box', 10.0, 4, 'Factory', '20x30x60', 'Storage')
+        self.assertEqual(box.total_size, 110.0)
+        self.assertEqual(Warehouse([box]).reprice_all().changed, 1)
+        box.dimensions = '10x10x10'
+        self.assertEqual(box.total_size, 30.0)
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, 'products.txt')
+            with open(text_path, 'w', encoding='utf-8') as file:
+                file.write("Apple,2.5,100,Farm Fresh,10\nЯблуко,3,20,Ферма,4\n"
+                           "Chair,50,10,Furniture Co.,90,Home\nApple,2.75,5,Orchard,1\n")
+            warehouse = Warehouse()
+            with patch('sys.stdout', new_callable=StringIO):
+                warehouse.load_products_from_file(text_path)
+
+            # Test that a snapshot reproduces the text loader for both product kinds
+            snapshot_path = os.path.join(directory, 'products.snap')
+            warehouse.save_snapshot(snapshot_path)
+            restored = Warehouse.open_snapshot(snapshot_path)
+
+            def rows(products):
+                return [(isinstance(product, FoodProduct), product.name, product.cost, product.quantity,
+                         product.producer, getattr(product, 'expiry_date', None),
+                         getattr(product, 'dimensions', None), getattr(product, 'purpose', None))
+                        for product in products]
+
+            self.assertEqual(rows(restored.products), rows(warehouse.products))
+            self.assertEqual([product.producer for product in restored.products.find('Apple')],
+                             ['Farm Fresh', 'Orchard'])
+
+            # Test that changes to an opened snapshot stay in memory
+            restored.products.first('Chair').quantity = 7
+            restored.products.append(FoodProduct('Milk', 2.0, 80, 'Farmers Coop', 3))
+            restored.save_snapshot(snapshot_path)
+            reopened = Warehouse.open_snapshot(snapshot_path)
+            self.assertEqual(reopened.products.first('Chair').quantity, 7)
+            self.assertEqual(len(reopened.products), 5)
+
+            # Test that other files are rejected
+            with self.assertRaises(ValueError):
+                Warehouse.open_snapshot(text_path)
+
+    def test_operation_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            warehouse = Warehouse.open_durable(directory)
+            with patch('sys.stdout', new_callable=StringIO):
+                with patch('builtins.input', side_effect=['Chair', '50', '10', 'Furniture Co.', 'no', '90', 'Home']):
+                    warehouse.add_product()
+                with patch('builtins.input', side_effect=['Table', '100', '5', 'Furniture Co.', 'no', '120', 'Home']):
+                    warehouse.add_product()
+                with patch('builtins.input', side_effect=['Chair', '4']):
+                    warehouse.take_product_from_warehouse()
+                with patch('builtins.input', side_effect=['Table']):
+                    warehouse.remove_product()
+            warehouse.close_log()
+
+            # Test that the log is replayed on startup
+            recovered = Warehouse.open_durable(directory)
+            self.assertEqual([(product.name, product.quantity) for product in recovered.products], [('Chair', 6)])
+
+            # Test that compaction folds the log into a snapshot
+            with patch('sys.stdout', new_callable=StringIO):
+                with patch('builtins.input', side_effect=['Chair', '-1']):
+                    recovered.change_quantity_of_product()
+            recovered.compact_log()
+            recovered.close_log()
+            self.assertEqual(len(oplog.list_segments(directory)), 1)
+            recovered = Warehouse.open_durable(directory)
+            self.assertEqual(recovered.products.first('Chair').quantity, 5)
+            self.assertIsInstance(recovered.products.first('Chair'), NonFoodProduct)
+            recovered.update('Chair', dimensions='40x40x90')
+            recovered.close_log()
+            recovered = Warehouse.open_durable(directory)
+            self.assertEqual(recovered.get('Chair').dimensions, (40, 40, 90))
+
+            # Test that non-round dimensions keep full precision through add, update and replay
+            lamp = NonFoodProduct('Lamp', 20.0, 3, 'Light Co.', '12.345678x1.0000001x123.4567', 'Home')
+            recovered.add(lamp)
+            self.assertEqual(lamp.dimensions, (12.345678, 1.0000001, 123.4567))
+            recovered.update('Chair', dimensions=(40.123456789, 40, 90))
+            recovered.close_log()
+            recovered = Warehouse.open_durable(directory)
+            self.assertEqual(recovered.get('Lamp').dimensions, (12.345678, 1.0000001, 123.4567))
+            self.assertEqual(recovered.get('Chair').dimensions, (40.123456789, 40, 90))
+            self.assertEqual(str(recovered.get('Lamp').dimensions), '12.3457x1x123.457')
+
+            # Test that a torn record at the end of a segment is ignored
+            recovered.close_log()
+            segment = oplog.list_segments(directory)[-1]
+            with open(segment, 'ab') as file:
+                file.write(oplog.encode_record(1, ('food', 'Milk', 2.0, 80, 'Coop', 3)))
+                file.write(oplog.encode_record(4, ('Chair', 1))[:-2])
+            recovered = Warehouse.open_durable(directory)
+            self.assertEqual(recovered.products.first('Milk').expiry_date, 3)
+            self.assertEqual(recovered.products.first('Chair').quantity, 5)
+            recovered.close_log()
+
+    def test_service_api(self):
+        warehouse = Warehouse()
+        apple = warehouse.add(FoodProduct('Apple', 2.0, 100, 'ProducerA', 10))
+        warehouse.add(FoodProduct('Apple', 2.5, 30, 'ProducerB', 5))
+        warehouse.add(NonFoodProduct('Chair', 50.0, 10, 'ProducerB', 120, 'Furniture'))
+
+        # Test programmatic operations without terminal I/O
+        self.assertIs(warehouse.get('Apple'), apple)
+        self.assertEqual(len(warehouse.find('Apple')), 2)
+        self.assertEqual(warehouse.take('Apple', 40), 60)
+        self.assertEqual(warehouse.adjust('Chair', -3), 7)
+        self.assertEqual(warehouse.total_quantity('Apple'), 90)
+        warehouse.update('Chair', cost=45.0)
+        self.assertEqual((warehouse.get('Chair').cost, warehouse.get('Chair').quantity), (45.0, 7))
+        warehouse.sort('desc')
+        self.assertEqual([product.quantity for product in warehouse.products], [60, 30, 7])
+        self.assertIs(warehouse.remove('Chair').name, 'Chair')
+
+        # Test typed errors
+        with self.assertRaises(ProductNotFoundError):
+            warehouse.take('Chair', 1)
+        with self.assertRaises(InvalidQuantityError):
+            warehouse.take('Apple', 61)
+        with self.assertRaises(InvalidQuantityError):
+            warehouse.adjust('Apple', -61)
+        with self.assertRaises(ValidationError):
+            warehouse.add(FoodProduct('Bad#Name', 1.0, 1, 'Producer', 1))
+        with self.assertRaises(ValidationError):
+            warehouse.sort('up')
+        self.assertEqual(apple.quantity, 60)
+
+    def test_apply_batch(self):
+        warehouse = Warehouse()
+        warehouse.add(FoodProduct('Apple', 2.0, 100, 'ProducerA', 10))
+        warehouse.add(NonFoodProduct('Chair', 50.0, 10, 'ProducerB', 120, 'Furniture'))
+
+        # Test applying a valid batch
+        result = warehouse.apply_batch([('Apple', -30), ('Chair', 5), ('Apple', -70), ('Chair', -15)])
+        self.assertEqual(result, {'Apple': 0, 'Chair': 0})
+        self.assertEqual(warehouse.get('Apple').quantity, 0)
+
+        # Test that an invalid batch changes nothing
+        warehouse.adjust('Apple', 10)
+        with self.assertRaises(BatchError) as context:
+            warehouse.apply_batch([('Apple', -5), ('Table', 1), ('Apple', -6), ('Chair', 3)])
+        self.assertEqual([(index, name) for index, name, _ in context.exception.errors], [(1, 'Table'), (2, 'Apple')])
+        self.assertEqual((warehouse.get('Apple').quantity, warehouse.get('Chair').quantity), (10, 0))
+
+        # Test that indexes follow batch changes and non-integer changes are rejected
+        self.assertEqual(warehouse.stock_totals('name', 'Apple').quantity, 10)
+        self.assertEqual(warehouse.apply_batch([('Apple', -1), ('Chair', 4), ('Apple', -2)]), {'Apple': 7, 'Chair': 4})
+        self.assertEqual(warehouse.stock_totals('name', 'Apple').quantity, 7)
+        self.assertEqual(warehouse.check_rollups(), [])
+        with self.assertRaises(BatchError) as context:
+            warehouse.apply_batch([('Apple', -1), ('Apple', '1')])
+        self.assertEqual([index for index, _, _ in context.exception.errors], [1])
+        self.assertEqual(warehouse.get('Apple').quantity, 7)
+
+    def test_server(self):
+        warehouse = Warehouse()
+        warehouse.add(FoodProduct('Apple', 2.0, 10, 'Farm Fresh', 10))
+        warehouse.add(NonFoodProduct('Office Chair', 50.0, 3, 'Furniture Co.', 90, 'Office'))
+
+        async def session():
+            server = WarehouseServer(warehouse)
+            await server.start()
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            responses = []
+            for request in ["PING", "TAKE\tApple\t4", "ADJUST\tOffice Chair\t2", "TAKE\tApple\t7",
+                            "BATCH\tApple=-1\tOffice Chair=-5", "TOTAL\tApple", "FIND\tPear", "TAKE\tApple"]:
+                writer.write(request.encode('utf-8') + b'\n')
+                await writer.drain()
+                responses.append((await reader.readline()).decode('utf-8').rstrip('\n').split('\t')[:2])
+            writer.close()
+            await writer.wait_closed()
+
+            # Concurrent clients must not oversell the same product
+            results = await asyncio.gather(*(server.execute("TAKE\tApple\t1") for _ in range(10)))
+            await server.close()
+            return responses, results
+
+        responses, results = asyncio.run(session())
+        self.assertEqual(responses, [['OK', 'PONG'], ['OK', '6'], ['OK', '5'], ['ERR', 'InvalidQuantityError'],
+                                     ['OK', '2'], ['OK', '5'], ['OK', '0'], ['ERR', 'ProtocolError']])
+        self.assertEqual(sum(result.startswith('OK') for result in results), 5)
+        self.assertEqual(warehouse.get('Apple').quantity, 0)
+
+    def test_sorted_indexes(self):
+        for store in (None, ColumnarProductStore()):
+            warehouse = Warehouse(store)
+            for name, quantity, cost in [('A', 5, 3.0), ('B', 50, 1.0), ('C', 9, 7.0), ('D', 10, 2.0)]:
+                warehouse.add(FoodProduct(name, cost, quantity, 'Farm', quantity))
+            warehouse.add(NonFoodProduct('E', 4.0, 1, 'Factory', 10, 'Home'))
+
+            # Test range and top-k queries
+            self.assertEqual([product.name for product in warehouse.products_between('quantity', upper=10,
+                                                                                     include_upper=False)],
+                             ['E', 'A', 'C'])
+            self.assertEqual([product.name for product in warehouse.top('cost', 2)], ['C', 'E'])
+            self.assertEqual([product.name for product in warehouse.ordered('expiry_date')], ['A', 'C', 'D', 'B'])
+
+            # Test that the indexes follow additions, updates and removals
+            warehouse.add(FoodProduct('F', 9.0, 0, 'Farm', 1))
+            warehouse.take('B', 45)
+            warehouse.update('A', cost=0.5)
+            warehouse.remove('C')
+            self.assertEqual([product.name for product in warehouse.ordered('quantity')], ['F', 'E', 'B', 'A', 'D'])
+            self.assertEqual([product.name for product in warehouse.top('cost', 2, largest=False)], ['A', 'B'])
+            warehouse.reprice_all([ExpiryDiscountRule(days=1, factor=100)])
+            self.assertEqual(warehouse.top('cost', 1)[0].name, 'F')
+
+    def test_expiry_queue(self):
+        for store in (None, ColumnarProductStore(), SQLiteProductStore()):
+            warehouse = Warehouse(store)
+            warehouse.add(FoodProduct('Milk', 10.0, 5, 'Farm', 3))
+            warehouse.add(FoodProduct('Milk', 10.0, 5, 'Farm', 1))
+            warehouse.add(FoodProduct('Bread', 4.0, 2, 'Bakery', 2))
+            warehouse.add(NonFoodProduct('Chair', 50.0, 1, 'Factory', 10, 'Home'))
+            self.assertEqual([product.expiry_date for product in warehouse.next_to_expire(2)], [1, 2])
+
+            # Test that the clock ages products and marks each one down once
+            self.assertEqual([product.name for product in warehouse.tick()], ['Milk'])
+            self.assertEqual(warehouse.tick(), [warehouse.get('Bread')])
+            self.assertEqual(len(warehouse.tick()), 1)
+            self.assertEqual(warehouse.tick(), [])
+            self.assertEqual([product.cost for product in warehouse.find('Milk')], [9.0, 9.0])
+            self.assertEqual([product.name for product in warehouse.products_between('expiry_date', upper=-2)],
+                             ['Milk', 'Bread'])
+            warehouse.drop_indexes()
+            self.assertEqual(warehouse.tick(0), [])
+            self.assertEqual(warehouse.get('Bread').cost, 3.6)
+
+            # Test that FEFO picking takes from the earliest expiring lot first
+            self.assertEqual(warehouse.take('Milk', 7, fefo=True), 3)
+            self.assertEqual([(product.expiry_date, product.quantity) for product in warehouse.find('Milk')],
+                             [(-1, 3), (-3, 0)])
+            with self.assertRaises(InvalidQuantityError):
+                warehouse.take('Milk', 4, fefo=True)
+
+        # Test that the clock day and markdowns survive a restart from the log and from a snapshot
+        with tempfile.TemporaryDirectory() as directory:
+            warehouse = Warehouse.open_durable(directory)
+            warehouse.add(FoodProduct('Milk', 10.0, 5, 'Farm', 5))
+            warehouse.add(FoodProduct('Cheese', 10.0, 5, 'Farm', 3))
+            self.assertEqual(warehouse.tick(2), [])
+            warehouse.close_log()
+            warehouse = Warehouse.open_durable(directory)
+            self.assertEqual((warehouse.clock.today, warehouse.get('Milk').expiry_date), (2, 3))
+            self.assertEqual([product.name for product in warehouse.tick()], ['Cheese'])
+            warehouse.close_log()
+            for _ in range(2):
+                warehouse = Warehouse.open_durable(directory)
+                self.assertEqual((warehouse.clock.today, warehouse.get('Milk').expiry_date), (3, 2))
+                self.assertEqual(warehouse.tick(0), [])
+                self.assertEqual((warehouse.get('Milk').cost, warehouse.get('Cheese').cost), (10.0, 9.0))
+                warehouse.close_log()
+            snapshot_path = os.path.join(directory, 'snapshot.bin')
+            warehouse.save_snapshot(snapshot_path)
+            reopened = Warehouse.open_snapshot(snapshot_path)
+            self.assertEqual((reopened.clock.today, reopened.get('Milk').expiry_date), (3, 2))
+            self.assertEqual(reopened.tick(0), [])
+            self.assertEqual(reopened.tick(2), [reopened.get('Milk')])
+
+        # Test that each warehouse keeps its own clock
+        first, second = Warehouse(), Warehouse(ColumnarProductStore())
+        first.add(FoodProduct('Milk', 10.0, 5, 'Farm', 3))
+        second.add(FoodProduct('Milk', 10.0, 5, 'Farm', 3))
+        first.tick(2)
+        self.assertEqual((first.get('Milk').expiry_date, second.get('Milk').expiry_date), (1, 3))
+        moved = Warehouse(ColumnarProductStore([first.get('Milk')]))
+        self.assertEqual((moved.clock.today, moved.get('Milk').expiry_date), (0, 1))
+        from sharding import ShardedWarehouse
+        with ShardedWarehouse(['Kyiv', 'Lviv'], processes=False) as sites:
+            for site in sites.sites:
+                sites.add(FoodProduct('Milk', 10.0, 5, 'Farm', 3), site=site)
+            sites.tick(2)
+            self.assertEqual({site: products[0].expiry_date for site, products in sites.find('Milk').items()},
+                             {'Kyiv': 1, 'Lviv': 1})
+
+    def test_rollups(self):
+        for store in (None, ColumnarProductStore()):
+            warehouse = Warehouse(store)
+            warehouse.add(FoodProduct('Milk', 2.0, 10, 'Farm', 5))
+            warehouse.add(FoodProduct('Milk', 3.0, 5, 'Dairy', 9))
+            warehouse.add(NonFoodProduct('Chair', 50.0, 2, 'Farm', 10, 'Home'))
+            self.assertEqual(tuple(warehouse.stock_totals('producer', 'Farm')), (2, 12, 120.0, 0.0))
+            self.assertEqual(warehouse.total_quantity('Milk'), 15)
+
+            # Test that the totals follow every kind of change
+            warehouse.take('Milk', 4)
+            warehouse.update('Chair', cost=40.0)
+            warehouse.remove('Milk')
+            warehouse.add(NonFoodProduct('Desk', 100.0, 1, 'Dairy', 20, 'Office'))
+            warehouse.reprice_all([ExpiryDiscountRule(days=10, factor=0.5)])
+            self.assertEqual(tuple(warehouse.stock_totals('category', 'food')), (1, 5, 7.5, 0.0))
+            self.assertEqual(warehouse.stock_groups('purpose'), {'Home': (1, 2, 80.0, 0.0), 'Office': (1, 1, 100.0, 0.0)})
+            self.assertEqual(tuple(warehouse.stock_totals('name', 'Apple')), (0, 0, 0.0, 0.0))
+            self.assertEqual(warehouse.check_rollups(), [])
+            with self.assertRaises(ValidationError):
+                warehouse.stock_totals('colour', 'red')
+
+            # Test that dropped totals are rebuilt from the current stock
+            rollups = warehouse.rollups()
+            warehouse.drop_indexes('rollups')
+            warehouse.take('Chair', 1)
+            with patch('sys.stdout', new_callable=StringIO):
+                warehouse.show_product_groups(limit=1)
+            self.assertIsNot(warehouse.rollups(), rollups)
+            # Test that the group display totals only categories
+            self.assertTrue(warehouse.rollups().is_built('category'))
+            self.assertFalse(warehouse.rollups().is_built('name'))
+            self.assertEqual(warehouse.stock_totals('purpose', 'Home').quantity, 1)
+            self.assertEqual(rollups.totals('purpose', 'Home').quantity, 2)
+
+            # Test that the products' own price changes reach the totals and the sorted index
+            warehouse.add(FoodProduct('Yogurt', 2.0, 4, 'Farm', 0))
+            warehouse.add(NonFoodProduct('Wardrobe', 95.0, 1, 'Dairy', '100x60x40', 'Home'))
+            warehouse.stock_groups('producer')
+            self.assertEqual([product.name for product in warehouse.ordered('cost')][-2:], ['Wardrobe', 'Desk'])
+            for product in warehouse.products:
+                product.decrease_cost()
+            self.assertEqual(warehouse.rollups().compare(Rollups(ROLLUP_DIMENSIONS, warehouse.products)), [])
+            self.assertEqual([product.name for product in warehouse.ordered('cost')][-2:], ['Desk', 'Wardrobe'])
+
+    def test_streaming_report(self):
+        warehouse = Warehouse()
+        for i in range(5):
+            warehouse.add(FoodProduct(f'Food{i}', 1.5, i, 'Farm' if i % 2 else 'Bakery', i))
+        warehouse.add(NonFoodProduct('Chair', 50.0, 2, 'Factory', 120, 'Home'))
+
+        # Test offset, limit and filters in CSV and JSON Lines
+        output = StringIO()
+        self.assertEqual(warehouse.report('food', output, fmt='csv', offset=1, limit=2), 2)
+        self.assertEqual(output.getvalue().splitlines(),
+                         ['Name,Cost ($),Quantity,Producer,Expiry Date', 'Food1,1.5,1,Farm,1', 'Food2,1.5,2,Bakery,2'])
+        output = StringIO()
+        self.assertEqual(warehouse.report('food', output, fmt='jsonl', producer='Farm'), 2)
+        self.assertEqual(output.getvalue().splitlines()[1],
+                         '{"name": "Food3", "cost": 1.5, "quantity": 3, "producer": "Farm", "expiry_date": 3}')
+
+        # Test that tables are written page by page
+        output = StringIO()
+        self.assertEqual(warehouse.report('food', output, page_size=2), 5)
+        self.assertEqual(output.getvalue().count('Expiry Date'), 3)
+        with self.assertRaises(ValidationError):
+            warehouse.report('food', output, fmt='xml')
+
+    def test_search(self):
+        warehouse = Warehouse()
+        warehouse.add(FoodProduct('Apple Juice', 2.0, 10, 'Organic Farm', 5))
+        warehouse.add(FoodProduct('Pineapple', 3.0, 5, 'Tropic Imports', 9))
+        warehouse.add(NonFoodProduct('Office Chair', 50.0, 2, 'Furniture Co.', 120, 'Office'))
+        warehouse.add(NonFoodProduct('Desk', 80.0, 1, 'Furniture Co.', 150, 'Office'))
+
+        # Test prefix, substring and fuzzy queries with ranked results
+        self.assertEqual([product.name for product in warehouse.search('app')], ['Apple Juice'])
+        self.assertEqual([product.name for product in warehouse.search('apple', mode='substring')],
+                         ['Apple Juice', 'Pineapple'])
+        self.assertEqual([product.name for product in warehouse.search('office')], ['Office Chair', 'Desk'])
+        self.assertEqual([product.name for product in warehouse.search('furnture desk', mode='fuzzy')], ['Desk'])
+
+        # Test that the index follows additions and removals
+        warehouse.remove('Apple Juice')
+        warehouse.add(FoodProduct('Applesauce', 1.0, 3, 'Farm', 30))
+        self.assertEqual([product.name for product in warehouse.search('app')], ['Applesauce'])
+        with patch('builtins.input', return_value='Aplesauce'), patch('sys.stdout', new_callable=StringIO) as output:
+            warehouse.find_product_by_name()
+        self.assertIn("Did you mean: Applesauce?", output.getvalue())
+        with self.assertRaises(ValidationError):
+            warehouse.search('desk', mode='regex')
+
+        # Test that a miss does not build the index, and ties keep the order products were added in
+        warehouse = Warehouse()
+        for number in range(30):
+            warehouse.add(FoodProduct(f'Milk {number}', 1.0, 1, 'Farm Fresh', 5))
+        with patch('builtins.input', return_value='Mlk'), patch('sys.stdout', new_callable=StringIO) as output:
+            warehouse.find_product_by_name()
+        self.assertNotIn("Did you mean", output.getvalue())
+        warehouse.build_search_index()
+        self.assertEqual([product.name for product in warehouse.search('farm fresh', limit=3)],
+                         ['Milk 0', 'Milk 1', 'Milk 2'])
+        self.assertEqual([product.name for product in warehouse.search('milk 29 fresh')], ['Milk 29'])
+
+    def test_dimensions(self):
+        for store in (None, ColumnarProductStore()):
+            warehouse = Warehouse(store)
+            warehouse.add(NonFoodProduct('Box', 5.0, 4, 'Factory', '35x25x10', 'Storage'))
+            warehouse.add(NonFoodProduct('Lamp', 20.0, 2, 'Factory', (15, 15, 45), 'Home'))
+            warehouse.add(NonFoodProduct('Shelf', 60.0, 1, 'Factory', '80 x 30 x 20', 'Storage'))
+            box = warehouse.get('Box')
+            self.assertEqual((box.dimensions, str(box.dimensions)), ((35, 25, 10), '35x25x10'))
+            self.assertEqual((box.volume, box.girth, box.total_size), (8750.0, 70.0, 70.0))
+
+            # Test bin-fit queries and volume totals by purpose
+            self.assertEqual([product.name for product in warehouse.fitting_in(40, 30, 20)], ['Box'])
+            self.assertEqual([product.name for product in warehouse.fitting_in(20, 50, 20)], ['Lamp'])
+            self.assertEqual(warehouse.stock_totals('purpose', 'Storage').volume, 4 * 8750.0 + 48000.0)
+            self.assertIs(warehouse.update('Box', dimensions='10x10x10'), box)
+            self.assertEqual(warehouse.stock_totals('purpose', 'Storage').volume, 4 * 1000.0 + 48000.0)
+            self.assertEqual([product.name for product in warehouse.fitting_in(12, 12, 12)], ['Box'])
+            with self.assertRaises(ValidationError):
+                warehouse.update('Box', dimensions='10x10x5000')
+            self.assertEqual(box.dimensions, (10, 10, 10))
+            self.assertEqual([product.name for product in warehouse.top('volume', 2)], ['Shelf', 'Lamp'])
+            self.assertEqual(warehouse.check_rollups(), [])
+            with self.assertRaises(ValidationError):
+                warehouse.add(NonFoodProduct('Crate', 5.0, 1, 'Factory', '2000x10x10', 'Storage'))
+
+    def test_lean_products(self):
+        food = parse_product_line("Apple,2.5,100,Farm Fresh,10")
+        other = parse_product_line("Chair,50,10,Farm Fresh,40x40x90,Home")
+        chair = NonFoodProduct('Desk', 80.0, 1, 'Furniture Co.', '120x60x75', 'Home')
+
+        # Test that products keep no per-instance dict and share repeated strings
+        for product in (food, other, chair):
+            self.assertFalse(hasattr(product, '__dict__'))
+        self.assertIs(food.producer, other.producer)
+        self.assertIs(other.purpose, chair.purpose)
+        with self.assertRaises(AttributeError):
+            food.dimensions = 10
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, 'products.txt')
+            with open(text_path, 'w', encoding='utf-8') as file:
+                file.write("Apple,2.5,100,Farm Fresh,10\nMilk,1.5,20,Farm Fresh,2\n"
+                           "Chair,50,10,Furniture Co.,40x40x90,Home\nApple,2.75,5,Orchard,1\n")
+            db_path = os.path.join(directory, 'warehouse.db')
+            warehouse = Warehouse(SQLiteProductStore(path=db_path))
+            with patch('sys.stdout', new_callable=StringIO):
+                self.assertEqual(warehouse.load_products_from_file(text_path), 4)
+
+            # Test lookups, movements and aggregates answered by SQL
+            self.assertEqual([product.producer for product in warehouse.find('Apple')], ['Farm Fresh', 'Orchard'])
+            self.assertEqual(warehouse.take('Milk', 5), 15)
+            self.assertEqual(warehouse.apply_batch([('Chair', -2), ('Milk', 1)]), {'Chair': 8, 'Milk': 16})
+            self.assertEqual(tuple(warehouse.stock_totals('producer', 'Farm Fresh')), (2, 116, 274.0, 0.0))
+            self.assertEqual(warehouse.stock_totals('category', 'non_food').volume, 8 * 144000.0)
+            self.assertEqual([product.name for product in warehouse.products_between('expiry_date', upper=2)],
+                             ['Apple', 'Milk'])
+            self.assertEqual(warehouse.check_rollups(), [])
+
+            # Test that removed products stay readable and changes persist in the database
+            removed = warehouse.remove('Milk')
+            self.assertEqual((removed.name, removed.quantity, removed.expiry_date), ('Milk', 16, 2))
+            warehouse.products.close()
+            reopened = Warehouse(SQLiteProductStore(path=db_path))
+            self.assertEqual([(product.name, product.quantity) for product in reopened.products],
+                             [('Apple', 100), ('Chair', 8), ('Apple', 5)])
+            self.assertEqual(reopened.get('Chair').dimensions, (40, 40, 90))
+
+            # Test that the expiry clock survives reopening the database
+            reopened.add(FoodProduct('Milk', 1.5, 20, 'Farm Fresh', 5))
+            reopened.tick(3)
+            reopened.products.close()
+            reopened = Warehouse(SQLiteProductStore(path=db_path))
+            self.assertEqual((reopened.clock.today, reopened.get('Milk').expiry_date), (3, 2))
+            self.assertEqual([product.expiry_date for product in reopened.find('Apple')], [7, -2])
+            reopened.products.close()
+
+    def test_benchmark_suite(self):
+        from benchmarks import run_suite, compare_runs
+        run = run_suite(sizes=(200,), memory=False)
+        cases = [result["case"] for result in run["results"]]
+        self.assertEqual(cases, ["load_products_from_file", "find", "sort_products", "total_quantity_by_name",
+                                 "total_quantity_with_rollup_build", "decrease_cost", "reprice_all",
+                                 "show_product_groups"])
+        self.assertTrue(all(result["rows"] == 200 and result["peak_bytes"] is None for result in run["results"]))
+
+        # Test that a slower case is reported as a regression against the baseline
+        baseline = {"results": [dict(result, seconds=result["seconds"] / 2) for result in run["results"]]}
+        self.assertTrue(all(regressed for _, _, _, regressed in compare_runs(run, baseline)))
+        self.assertFalse(any(regressed for _, _, _, regressed in compare_runs(run, run)))
+
+    def test_metrics(self):
+        from metrics import metrics
+        original_find = Warehouse.find
+        metrics.reset()
+        metrics.enable()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                text_path = os.path.join(directory, 'products.txt')
+                with open(text_path, 'w', encoding='utf-8') as file:
+                    file.write("Apple,2.5,100,Farm Fresh,10\nChair,50,10,Furniture Co.,40x40x90,Home\n")
+                warehouse = Warehouse()
+                with patch('sys.stdout', new_callable=StringIO):
+                    warehouse.load_products_from_file(text_path)
+                    warehouse.report('food', writer=StringIO())
+                self.assertEqual(len(warehouse.find('Apple')), 1)
+                stats = json.loads(metrics.dump('json'))
+                self.assertEqual(stats['counters']['load.bytes_parsed'], os.path.getsize(text_path))
+                self.assertEqual(stats['counters']['load.lines_read'], 2)
+                self.assertEqual(stats['counters']['rows_scanned'], 2)
+                self.assertEqual(stats['operations']['Warehouse.find']['count'], 1)
+                self.assertIn('Warehouse.load_products_from_file', metrics.dump('text'))
+
+                # Test that profiling collects only the profiled blocks
+                metrics.start_profile()
+                with metrics.profiled():
+                    warehouse.sort('desc')
+                self.assertIn('sort', metrics.stop_profile())
+        finally:
+            metrics.disable()
+            metrics.reset()
+
+        # Test that disabling restores the original methods
+        self.assertIs(Warehouse.find, original_find)
+        self.assertEqual(metrics.stats()['operations'], {})
+
+    def test_validation_schema(self):
+        # Test that file rows go through the same field checks as interactive input
+        with self.assertRaises(ValueError) as context:
+            parse_product_line("Apple,2.5,-1,Farm Fresh,10")
+        self.assertEqual(context.exception.field, 'quantity')
+        report = validate_product_rows([("Apple", "2.5", "100", "Farm Fresh", "10"),
+                                        ("Gold", "3000000", "1", "Mine", "40x40x40", "Decor"),
+                                        ("Chair", "50", "10", "Furniture Co.", "40x40x1200", "Home"),
+                                        ("Broken", "row")])
+        self.assertEqual([number for number, _ in report.valid], [1])
+        self.assertEqual([(error.row, error.field) for error in report.errors],
+                         [(2, 'cost'), (3, 'dimensions'), (4, None)])
+
+        # Test that a batch with any invalid row is rejected as a whole with per-row errors
+        warehouse = Warehouse()
+        with self.assertRaises(BatchError) as context:
+            warehouse.add_rows([("Apple", "2.5", "100", "Farm Fresh", "10"), ("Bad@Name", "1", "1", "Farm", "1")])
+        self.assertEqual([(error.row, error.field) for error in context.exception.errors], [(1, 'name')])
+        self.assertEqual(len(warehouse.products), 0)
+        added = warehouse.add_rows([("Apple", "2.5", "100", "Farm Fresh", "10")])
+        self.assertEqual([(product.name, product.quantity) for product in added], [('Apple', 100)])
+        with self.assertRaises(InvalidQuantityError):
+            warehouse.add(FoodProduct('Milk', 1.0, 60_000, 'Farm', 3))
+
+        # Test that text numbers are converted on add and non-numbers are rejected by every operation
+        milk = warehouse.add(FoodProduct('Milk', '5', '3', 'Farm', 2))
+        self.assertEqual((milk.cost, milk.quantity, milk.expiry_date), (5.0, 3, 2))
+        self.assertEqual((type(milk.cost), type(milk.quantity)), (float, int))
+        self.assertEqual(warehouse.take('Milk', '1'), 2)
+        for product in (FoodProduct('Bread', None, 1, 'Bakery', 1), FoodProduct('Bread', 'abc', 1, 'Bakery', 1),
+                        FoodProduct(None, 1.0, 1, 'Bakery', 1), Product('Bread', 1.0, 1, None)):
+            with self.assertRaises(ValidationError):
+                warehouse.add(product)
+        with self.assertRaises(InvalidQuantityError):
+            warehouse.add(FoodProduct('Bread', 1.0, None, 'Bakery', 1))
+        with self.assertRaises(ValidationError) as context:
+            warehouse.update('Milk', cost='abc')
+        self.assertIn("Cost must be a number", str(context.exception))
+        for call in (lambda: warehouse.update('Milk', quantity='abc'), lambda: warehouse.take('Milk', None),
+                     lambda: warehouse.take('Milk', 'abc', fefo=True), lambda: warehouse.adjust('Milk', None),
+                     lambda: warehouse.adjust('Milk', '1.5')):
+            with self.assertRaises(InvalidQuantityError):
+                call()
+        self.assertEqual(warehouse.update('Milk', cost='4.5', quantity='7').cost, 4.5)
+        self.assertEqual(warehouse.adjust('Milk', '-2'), 5)
+        self.assertEqual(len(warehouse.products), 2)
+
+        # Test interactive input with a schema field and with legacy keyword checks
+        with patch('builtins.input', side_effect=['abc', '3000000', '12.5']), \
+                patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            self.assertEqual(warehouse.get_valid_input("Cost: ", COST_FIELD), 12.5)
+        self.assertIn("Cost must be a number", mock_stdout.getvalue())
+        self.assertIn("between 0 and 2,000,000", mock_stdout.getvalue())
+        with patch('builtins.input', side_effect=['maybe', 'Yes']), patch('sys.stdout', new_callable=StringIO):
+            self.assertEqual(warehouse.get_valid_input("Food? ", str, valid_responses=["yes", "no"]), 'Yes')
+
+    def test_sharded_warehouse(self):
+        from sharding import ShardedWarehouse
+        # Test sites in this process: fan-out lookups, transfers and merged aggregates
+        with ShardedWarehouse(['Kyiv', 'Lviv'], processes=False) as sites:
+            sites.add(FoodProduct('Apple', 2.5, 100, 'Farm Fresh', 10), site='Kyiv')
+            sites.add(FoodProduct('Apple', 3.0, 20, 'Orchard', 5), site='Lviv')
+            sites.add(NonFoodProduct('Chair', 50.0, 10, 'Furniture Co.', '40x40x90', 'Home'), site='Lviv')
+            self.assertEqual(sites.quantities('Apple'), {'Kyiv': 100, 'Lviv': 20})
+            self.assertEqual(sites.transfer('Chair', 4, 'Lviv', 'Kyiv'), 6)
+            self.assertEqual(sites.quantities('Chair'), {'Kyiv': 4, 'Lviv': 6})
+            self.assertEqual(sites.find('Chair')['Kyiv'][0].dimensions, (40, 40, 90))
+            self.assertEqual(tuple(sites.stock_totals('producer', 'Farm Fresh')), (1, 100, 250.0, 0.0))
+            self.assertEqual(sites.stock_groups('category')['non_food'].quantity, 10)
+            with self.assertRaises(InvalidQuantityError):
+                sites.transfer('Apple', 500, 'Kyiv', 'Lviv')
+            self.assertEqual(sites.total_quantity('Apple'), 120)
+
+        # Test name-hash shards in worker processes
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, 'products.txt')
+            with open(text_path, 'w', encoding='utf-8') as file:
+                file.write("Apple,2.5,100,Farm Fresh,10\nMilk,1.5,20,Farm Fresh,2\nBroken,row\n"
+                           "Chair,50,10,Furniture Co.,40x40x90,Home\nApple,2.75,5,Orchard,1\n")
+            with ShardedWarehouse(range(3), partition='hash') as shards:
+                with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+                    self.assertEqual(shards.load_products_from_file(text_path), 4)
+                self.assertIn("Line 3", mock_stdout.getvalue())
+                self.assertEqual(sum(shards.product_counts().values()), 4)
+                self.assertEqual(list(shards.quantities('Apple')), [shards.site_of('Apple')])
+                self.assertEqual(shards.total_quantity('Apple'), 105)
+                self.assertEqual(shards.take('Milk', 5), 15)
+                with self.assertRaises(ProductNotFoundError) as context:
+                    shards.take('Pear', 1)
+                self.assertEqual(context.exception.name, 'Pear')
+
+    def test_cli_one_shot(self):
+        from benchmarks import parse_importtime
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_path = os.path.join(directory, 'warehouse.snap')
+            Warehouse(ColumnarProductStore([FoodProduct('Apple', 2.5, 100, 'Farm Fresh', 10),
+                                            FoodProduct('Apple pie', 4.0, 3, 'Bakery', 2),
+                                            NonFoodProduct('Chair', 50.0, 10, 'Furniture Co.', '40x40x90', 'Home')]
+                                           )).save_snapshot(snapshot_path)
+            # Test take and adjust update the snapshot file in place
+            with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+                self.assertEqual(run_command(['--snapshot', snapshot_path, 'take', 'Apple', '30']), 0)
+                self.assertEqual(run_command(['--snapshot', snapshot_path, 'adjust', 'Chair', '-4']), 0)
+                self.assertEqual(run_command(['--snapshot', snapshot_path, 'total', 'Apple']), 0)
+            self.assertEqual(mock_stdout.getvalue().split(), ['70', '6', '70'])
+            restored = Warehouse.open_snapshot(snapshot_path)
+            self.assertEqual([product.quantity for product in restored.products], [70, 3, 6])
+
+            # Test errors go to stderr with exit code 1
+            with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+                self.assertEqual(run_command(['--snapshot', snapshot_path, 'take', 'Pear', '1']), 1)
+                self.assertEqual(run_command(['--snapshot', os.path.join(directory, 'missing'), 'total', 'Apple']), 1)
+            self.assertIn("Pear", mock_stderr.getvalue())
+
+        # Test translations load on demand
+        self.assertEqual(load_translation('ua').keys(), load_translation('en').keys())
+        with self.assertRaises(ValueError):
+            load_translation('de')
+
+        # Test -X importtime output parsing
+        output = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |     _csv\n"
+                  "import time:       300 |        420 |   csv\n"
+                  "import time:      1000 |       1500 | main\n")
+        self.assertEqual(parse_importtime(output), {'_csv': (120, 120, 2), 'csv': (300, 420, 1), 'main': (1000, 1500, 0)})
+
 
 if __name__ == '__main__':
     unittest.main()
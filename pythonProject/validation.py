@@ -0,0 +1,139 @@
+"""Декларативна перевірка полів продуктів.
+
+Схема - послідовність описів полів (Field): тип, межі, заборонені символи,
+допустимі відповіді та повідомлення про помилки. Під час створення схема
+один раз компілюється у функцію, що перетворює і перевіряє весь рядок лише
+потрібними для кожного поля перевірками, без розбору опису на кожному
+виклику. Ті самі схеми перевіряють введення користувача, рядки файлу та
+пакети програмного інтерфейсу.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+# Опис поля: dtype - int, float, str або функція перетворення; range - (нижня, верхня) межа,
+# None - без межі (для кортежів перевіряється кожен елемент); choices - допустимі відповіді
+# без урахування регістру; *_msg - повідомлення про невдале перетворення (для str - значення не рядок),
+# межі, символи, відповідь
+Field = namedtuple('Field', ['name', 'dtype', 'range', 'invalid_chars', 'choices',
+                             'invalid_msg', 'range_msg', 'chars_msg', 'choices_msg'],
+                   defaults=(None, None, None, None, None, None, None))
+# Помилка рядка пакета: номер рядка, поле (None - рядок загалом), значення і повідомлення
+RowError = namedtuple('RowError', ['row', 'field', 'value', 'message'])
+# Результат перевірки пакета: пари (номер рядка, результат) для вірних рядків і RowError для невірних
+ValidationReport = namedtuple('ValidationReport', ['valid', 'errors'])
+
+
+class FieldError(ValueError):
+    """Значення поля не пройшло перевірку."""
+
+    def __init__(self, field, message, value=None):
+        super().__init__(message)
+        self.field = field
+        self.value = value
+
+
+def _field_source(index, field, lines):
+    """Додає до lines перевірки поля index, що працюють зі змінною v{index}."""
+    v = f"v{index}"
+    fail = f"raise FieldError(_fields[{index}].name, _fields[{index}].{{}}, {v})"
+    if field.dtype is str:
+        lines += [f"    if not isinstance({v}, str):",
+                  f"        " + fail.format('invalid_msg')]
+    else:
+        lines += [f"    try:",
+                  f"        {v} = _convert{index}({v})",
+                  f"    except (TypeError, ValueError):",
+                  f"        " + fail.format('invalid_msg') + " from None"]
+    if field.invalid_chars:
+        lines += [f"    if {' or '.join(f'{char!r} in {v}' for char in field.invalid_chars)}:",
+                  f"        " + fail.format('chars_msg')]
+    if field.range:
+        lower, upper = field.range
+        bounds = [f"{lower!r} <= item" if lower is not None else None, f"item <= {upper!r}" if upper is not None else None]
+        condition = " and ".join(bound for bound in bounds if bound) or "True"
+        if field.dtype in (int, float):
+            # Для чисел перевірка без циклу; NaN не проходить жодного порівняння
+            lines += [f"    item = {v}",
+                      f"    if not ({condition}):",
+                      f"        " + fail.format('range_msg')]
+        else:
+            lines += [f"    for item in {v} if isinstance({v}, tuple) else ({v},):",
+                      f"        if not ({condition}):",
+                      f"            " + fail.format('range_msg')]
+    if field.choices:
+        lines += [f"    if {v}.lower() not in _fields[{index}].choices:",
+                  f"        " + fail.format('choices_msg')]
+
+
+def _compile(fields, function_name, factory=None):
+    """Генерує функцію, що перевіряє послідовність значень полів і повертає перетворений кортеж.
+
+    Якщо задано factory, функція одразу повертає factory(*значення) без проміжного кортежу.
+    """
+    names = ", ".join(f"v{index}" for index in range(len(fields)))
+    lines = [f"def {function_name}(values):",
+             f"    {names}, = values"]
+    for index, field in enumerate(fields):
+        _field_source(index, field, lines)
+    lines.append(f"    return _factory({names})" if factory is not None else f"    return ({names},)")
+    namespace = {'FieldError': FieldError, '_fields': tuple(fields), '_factory': factory}
+    namespace.update((f"_convert{index}", field.dtype) for index, field in enumerate(fields))
+    exec("\n".join(lines), namespace)
+    return namespace[function_name]
+
+
+@lru_cache(maxsize=256)
+def compile_field(field):
+    """Повертає функцію, що перетворює і перевіряє одне значення поля або піднімає FieldError."""
+    validate = _compile((field,), 'validate_' + (field.name if field.name.isidentifier() else 'field'))
+    return lambda value: validate((value,))[0]
+
+
+class Schema:
+    """Схема рядка продукту: поля у порядку рядка і фабрика, що створює продукт з перевірених значень."""
+
+    def __init__(self, fields, factory=tuple):
+        self.fields = tuple(fields)
+        self.factory = factory
+
+    def __getattr__(self, name):
+        # validate і create компілюються при першому зверненні: схеми модулів
+        # створюються під час імпорту, а компіляція займає мілісекунди на схему.
+        # Далі функції лежать в атрибутах екземпляра і __getattr__ не викликається
+        if name == 'validate':
+            self.validate = _compile(self.fields, 'validate_row')
+        elif name == 'create':
+            self.create = _compile(self.fields, 'create_row', self.factory)  # перевіряє значення і створює об'єкт фабрикою
+        else:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return self.__dict__[name]
+
+    def __len__(self):
+        return len(self.fields)
+
+    def field(self, name):
+        """Повертає опис поля за назвою."""
+        for field in self.fields:
+            if field.name == name:
+                return field
+        raise KeyError(name)
+
+
+def validate_rows(rows, schemas, start=0):
+    """Перевіряє пакет рядків і повертає ValidationReport з усіма помилками пакета.
+
+    schemas - словник кількість полів -> Schema; рядки нумеруються від start.
+    Вірні рядки потрапляють у звіт як створені схемою об'єкти.
+    """
+    valid = []
+    errors = []
+    for number, values in enumerate(rows, start):
+        schema = schemas.get(len(values))
+        if schema is None:
+            errors.append(RowError(number, None, values, f"Invalid data format: {list(values)}"))
+            continue
+        try:
+            valid.append((number, schema.create(values)))
+        except FieldError as e:
+            errors.append(RowError(number, e.field, e.value, str(e)))
+    return ValidationReport(valid, errors)